@@ -0,0 +1,224 @@
+# alarm_daemon.py (one asyncio alarm daemon for every TaskPilot user)
+#
+# Tracks the task store of every account in USERS_FILE and keeps a single
+# heap of upcoming alarms across all of them. Only pending alarms are held
+# in memory (user, task id, title, fire time). A user's tasks are decrypted
+# only when that user's store has changed, and then only that user's alarms
+# are rebuilt. Notifications go out concurrently, at most MAX_CONCURRENT at
+# a time.
+#
+#   python alarm_daemon.py [--backend json|sqlite]
+
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from encryption import initialize_encryption, decrypt_data, KEY_FILE
+import shared_modules  # the modules below live in the TaskPilot directory (see shared_modules)
+import sqlite_store
+import task_times
+from watcher import StoreWatcher
+
+try:
+    from plyer import notification
+except ImportError:
+    notification = None
+
+USERS_FILE = "storage/users.json"                     # as in taskpilot_gui
+TASK_FILE_TEMPLATE = "storage/tasks_{username}.json"  # as in taskpilot_gui
+FIRE_WINDOW = 60     # an alarm still goes off this long after its due minute starts
+MAX_CONCURRENT = 32  # notifications being delivered at once
+
+def fire_time(record):
+    """Epoch seconds at which a task's alarm goes off, or None"""
+    if record.get("completed"):
+        return None
+    if "due_ts" in record:  # stamped by the GUI on save; no parsing needed
+        return None if record["due_ts"] is None else task_times.to_epoch(record["due_ts"])
+    if not (record.get("due") and record.get("time")):
+        return None
+    try:
+        return datetime.strptime(f"{record['due']} {record['time']}", "%Y-%m-%d %I:%M %p").timestamp()
+    except ValueError:
+        return None
+
+def desktop_notify(user, title):
+    """Default notifier: console line plus a desktop notification if plyer is installed"""
+    print(f"🔔 [{user}] '{title}' is due now!")
+    if notification:
+        notification.notify(title=f"Task Reminder ({user})", message=f"{title} is due now!", timeout=10)
+
+def _stamp(paths):
+    stamps = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamps.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+class AlarmDaemon:
+    """Merged alarm queue over all users' stores"""
+
+    def __init__(self, backend="json", notify=desktop_notify):
+        self.backend = backend
+        self.notify = notify
+        self._heap = []      # (fire time, user, task id); stale entries are skipped when popped
+        self._alarms = {}    # (user, task id) -> (fire time, title) of the live heap entry
+        self._by_user = {}   # user -> task ids with a live alarm
+        self._stamps = {}    # user (or None for the shared sqlite db) -> store stat when last read
+        self._fired = {}     # (user, task id) -> fire time, until its window has passed
+        self._users = set()
+        self._changed = None
+        self._executor = None
+        self._watcher = None
+        self._deliveries = set()
+
+    def store_files(self, users):
+        if self.backend == "sqlite":
+            return [USERS_FILE, KEY_FILE, sqlite_store.DB_FILE, sqlite_store.DB_FILE + "-wal"]
+        return [USERS_FILE, KEY_FILE] + [TASK_FILE_TEMPLATE.format(username=u) for u in sorted(users)]
+
+    def _read_users(self):
+        try:
+            with open(USERS_FILE) as f:
+                return set(json.load(f))
+        except (OSError, ValueError):
+            return set()
+
+    def _pending(self, records, now):
+        alarms = {}
+        for record in records:
+            when = fire_time(record)
+            if when is not None and when + FIRE_WINDOW > now and record.get("id"):
+                alarms[record["id"]] = (when, record.get("title", ""))
+        return alarms
+
+    def _read_user(self, user, now):
+        if self.backend == "sqlite":
+            records = sqlite_store.query_records(owner=user, completed=False,
+                                                 due_from=datetime.fromtimestamp(now).date())
+            return self._pending(records, now)
+        path = TASK_FILE_TEMPLATE.format(username=user)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "rb") as f:
+                return self._pending(json.loads(decrypt_data(f.read())), now)
+        except Exception as e:
+            print(f"⚠️ Could not read the tasks of {user}: {e}")
+            return {}
+
+    def scan(self):
+        """Blocking part of a refresh: {user: alarms} for every user whose store changed"""
+        now = time.time()
+        users = self._read_users()
+        changed = {}
+        key_stamp = _stamp([KEY_FILE])
+        if key_stamp != self._stamps.get(KEY_FILE):  # a new key: everything may read differently
+            self._stamps = {KEY_FILE: key_stamp}
+        if self.backend == "sqlite":
+            stamp = _stamp(self.store_files(()))
+            if stamp != self._stamps.get(None) or users != self._users:
+                self._stamps[None] = stamp
+                changed = {user: self._read_user(user, now) for user in users}
+        else:
+            for user in users:
+                stamp = _stamp([TASK_FILE_TEMPLATE.format(username=user)])
+                if stamp != self._stamps.get(user):
+                    self._stamps[user] = stamp
+                    changed[user] = self._read_user(user, now)
+        return users, changed
+
+    def _apply(self, users, changed):
+        for user in self._users - users:
+            changed[user] = {}
+            self._stamps.pop(user, None)
+        for user, alarms in changed.items():
+            for task_id in self._by_user.get(user, set()) - alarms.keys():
+                del self._alarms[(user, task_id)]
+            for task_id, alarm in alarms.items():
+                key = (user, task_id)
+                if self._alarms.get(key) == alarm or self._fired.get(key) == alarm[0]:
+                    continue
+                self._alarms[key] = alarm
+                heapq.heappush(self._heap, (alarm[0], user, task_id))
+            live = {task_id for task_id in alarms if (user, task_id) in self._alarms}
+            if live:
+                self._by_user[user] = live
+            else:
+                self._by_user.pop(user, None)
+        if users != self._users:
+            self._users = users
+            self._watch()
+
+    def _watch(self):
+        loop = asyncio.get_running_loop()
+        if self._watcher:
+            self._watcher.stop()
+        self._watcher = StoreWatcher(self.store_files(self._users),
+                                     lambda: loop.call_soon_threadsafe(self._changed.set)).start()
+        self._changed.set()  # catch writes made while the new watcher was starting
+
+    # Start delivering every alarm that is due; returns seconds until the next one
+    def _dispatch_due(self):
+        now = time.time()
+        self._fired = {k: when for k, when in self._fired.items() if when + FIRE_WINDOW > now}
+        while self._heap:
+            when, user, task_id = self._heap[0]
+            if when > now:
+                return when - now
+            heapq.heappop(self._heap)
+            key = (user, task_id)
+            alarm = self._alarms.get(key)
+            if alarm is None or alarm[0] != when:
+                continue
+            del self._alarms[key]
+            self._by_user.get(user, set()).discard(task_id)
+            if now < when + FIRE_WINDOW:
+                self._fired[key] = when
+                delivery = asyncio.create_task(self._deliver(user, alarm[1]))
+                self._deliveries.add(delivery)
+                delivery.add_done_callback(self._deliveries.discard)
+        return None
+
+    async def _deliver(self, user, title):
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self.notify, user, title)
+        except Exception as e:
+            print(f"⚠️ Could not notify {user}: {e}")
+
+    async def run(self):
+        self._changed = asyncio.Event()
+        self._executor = ThreadPoolExecutor(MAX_CONCURRENT, thread_name_prefix="alarm-notify")
+        self._changed.set()
+        try:
+            while True:
+                if self._changed.is_set():
+                    self._changed.clear()
+                    self._apply(*await asyncio.to_thread(self.scan))
+                timeout = self._dispatch_due()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._watcher:
+                self._watcher.stop()
+            self._executor.shutdown(wait=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="TaskPilot alarm daemon for all users")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json",
+                        help="where the GUI keeps tasks (taskpilot_gui.STORAGE_BACKEND)")
+    args = parser.parse_args()
+    initialize_encryption()
+    asyncio.run(AlarmDaemon(args.backend).run())
+
+if __name__ == "__main__":
+    main()
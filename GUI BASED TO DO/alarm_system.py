@@ -2,7 +2,11 @@
 import time
 from datetime import datetime
 import platform
-import winsound
+
+if platform.system() == "Windows":
+    import winsound
+else:
+    winsound = None
 from task_data import load_tasks
 from task_utils import parse_task_datetime
 
@@ -1,5 +1,6 @@
 from task_manager import add_task, list_tasks, complete_task, delete_task
-from reports import show_productivity_report
+from reports import show_productivity_report, show_trend_report
+from task_utils import parse_date
 from alarm_system import alarm_system
 import threading
 
@@ -28,8 +29,21 @@ def show_menu():
             cat = input("Enter category: ")
             list_tasks(filter_category=cat)
         elif choice == '6':
-            p = input("Type (daily/weekly): ").strip().lower()
-            show_productivity_report(period=p)
+            p = input("Type (daily/weekly/monthly/range/trend): ").strip().lower()
+            if p == "range":
+                try:
+                    due_from = parse_date(input("From date: ").strip())
+                    due_to = parse_date(input("To date: ").strip())
+                except ValueError as e:
+                    print(f"⚠️ Invalid date format: {e}")
+                    continue
+                show_productivity_report("range", due_from, due_to)
+            elif p == "trend":
+                days = input("Days to show (default 30): ").strip()
+                cat = input("Category (blank for all): ").strip() or None
+                show_trend_report(int(days) if days.isdigit() and int(days) > 0 else 30, cat)
+            else:
+                show_productivity_report(period=p)
         elif choice == '7':
             print("👋 Exiting TaskPilot CLI.")
             break
@@ -37,4 +51,5 @@ def show_menu():
             print("❗ Invalid option. Try again.")
 
 if __name__ == "__main__":
-    threading.Thread(target=alarm_system, daemon=True)._
+    threading.Thread(target=alarm_system, daemon=True).start()
+    show_menu()
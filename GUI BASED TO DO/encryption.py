@@ -1,8 +1,65 @@
 import os
-from cryptography.fernet import Fernet
+import threading
+from cryptography.fernet import Fernet, MultiFernet
 
 KEY_FILE = "storage/key.key"
 
+class KeyRing:
+    """Cached keys and cipher shared by every encrypt/decrypt call.
+
+    The key file holds one key per line, newest first: the newest key
+    encrypts, any key decrypts.
+    """
+
+    def __init__(self, path=KEY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._keys = []
+        self._cipher = None
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _refresh(self):
+        """Re-read the key file only when it has changed on disk"""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            with open(self.path, "rb") as f:
+                keys = [line.strip() for line in f.read().splitlines() if line.strip()]
+            self._cipher = MultiFernet([Fernet(k) for k in keys])
+            self._keys = keys
+            self._stamp = stamp
+
+    def cipher(self):
+        self._refresh()
+        return self._cipher
+
+    def keys(self):
+        self._refresh()
+        return list(self._keys)
+
+    def invalidate(self):
+        with self._lock:
+            self._stamp = None
+
+    def rotate(self):
+        """Put a fresh key in front; older keys stay so existing data still decrypts"""
+        keys = [Fernet.generate_key()] + self.keys()
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"\n".join(keys) + b"\n")
+        os.replace(tmp, self.path)
+        self.invalidate()
+        return keys[0]
+
+keyring = KeyRing()
+
 def initialize_encryption():
     """Initialize encryption key if it doesn't exist"""
     os.makedirs("storage", exist_ok=True)
@@ -12,18 +69,30 @@ def initialize_encryption():
             f.write(key)
 
 def load_key():
-    """Load encryption key from file"""
-    with open(KEY_FILE, "rb") as f:
-        return f.read()
+    """Current (newest) encryption key"""
+    return keyring.keys()[0]
 
 def encrypt_data(data):
     """Encrypt text data"""
-    key = load_key()
-    f = Fernet(key)
-    return f.encrypt(data.encode())
+    return keyring.cipher().encrypt(data.encode())
 
 def decrypt_data(data):
     """Decrypt encrypted data"""
-    key = load_key()
-    f = Fernet(key)
-    return f.decrypt(data).decode()
\ No newline at end of file
+    return keyring.cipher().decrypt(data).decode()
+
+def rotate_token(token):
+    """Re-encrypt a token under the current key without exposing its plaintext"""
+    return keyring.cipher().rotate(token)
+
+def rotate_key(reencrypt=None):
+    """Add a new key, then run `reencrypt` on a background thread.
+
+    `reencrypt` should rewrite the stored data under the new key. Returns
+    the thread, or None.
+    """
+    keyring.rotate()
+    if reencrypt is None:
+        return None
+    worker = threading.Thread(target=reencrypt, daemon=True)
+    worker.start()
+    return worker
\ No newline at end of file
@@ -1,31 +1,81 @@
 from task_data import load_tasks
-from datetime import datetime, timedelta
+import shared_modules  # the modules below live in the TaskPilot directory (see shared_modules)
+from task_stats import ALL
+from analytics import build_stats
+from latency import format_duration
+import task_times
+from datetime import timedelta
 
-def show_productivity_report(period="daily"):
-    tasks = load_tasks()
-    now = datetime.now()
-    completed = 0
-    total = 0
+TREND_WINDOWS = (7, 30)  # days summed into each point of a trend line
 
+# tasks.json keeps no counters next to it, so each report builds the per-day
+# rollup (task_stats) from the tasks once and reads everything from that
+def load_stats():
+    return build_stats(task_times.stamp(task.to_dict()) for task in load_tasks())
+
+# First and last due date (inclusive) covered by each report period
+def report_window(period, today):
     if period == "daily":
-        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif period == "weekly":
-        start = now - timedelta(days=now.weekday())
-        start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        return today, today
+    if period == "weekly":
+        return today - timedelta(days=today.weekday()), today
+    if period == "monthly":
+        return today.replace(day=1), today
+    return None
+
+def _rate(total, completed):
+    return f"{completed}/{total} ({round(completed / total * 100, 2)}%)" if total else "no tasks"
+
+def show_productivity_report(period="daily", due_from=None, due_to=None):
+    today = task_times.to_date(task_times.today())
+    if period == "range":
+        window = (due_from, due_to) if due_from and due_to and due_from <= due_to else None
     else:
-        print("❗ Invalid period. Use 'daily' or 'weekly'.")
+        window = report_window(period, today)
+    if window is None:
+        print("❗ Invalid period. Use 'daily', 'weekly', 'monthly' or 'range' with two dates in order.")
         return
+    stats = load_stats()
+    first, last = (task_times.parse_day(d) for d in window)
+    total, completed = stats.totals(first, last)
 
-    for task in tasks:
-        if task.completed and task.timestamp >= start:
-            completed += 1
-        if task.timestamp >= start:
-            total += 1
-
-    print(f"\n📈 Productivity Report ({period.capitalize()}):")
+    print(f"\n📈 Productivity Report ({period.capitalize()}, {window[0]} to {window[1]}):")
     print(f"✅ Completed Tasks: {completed}")
     print(f"📋 Total Tasks: {total}")
     if total > 0:
         print(f"📊 Completion Rate: {round((completed / total) * 100, 2)}%")
     else:
         print("📊 No tasks in the selected period.")
+    for category, (t, c) in sorted(stats.breakdown("category", first, last).items()):
+        print(f"   📂 {category}: {_rate(t, c)}")
+    high_total, high_completed = stats.totals(first, last, "priority:High")
+    if high_total:
+        print(f"🔴 High priority pending: {high_total - high_completed}")
+
+# Rolling 7- and 30-day completion rates for the last `days` days (weekly
+# points for long ranges) and the current streak
+def show_trend_report(days=30, category=None):
+    stats = load_stats()
+    today = task_times.today()
+    first = today - days + 1
+    key = f"category:{category}" if category else ALL
+    lines = [stats.rolling(first, today, window, key) for window in TREND_WINDOWS]
+    step = 1 if days <= 31 else 7
+
+    print(f"\n📈 {days}-Day Trend{f' for {category}' if category else ''}:")
+    for i in range((days - 1) % step, days, step):
+        rates = ", ".join(f"{window}-day {_rate(line[i][1], line[i][2])}" for window, line in zip(TREND_WINDOWS, lines))
+        print(f"{task_times.to_date(lines[0][i][0]).isoformat()}: {rates}")
+    current, longest = stats.streaks(None, today, key)
+    print(f"🔥 Current streak: {current} day(s), longest ever: {longest} day(s)")
+
+# The Analytics tab's streak line (taskpilot_gui.ProductivityWidget)
+def streak_line(stats, today):
+    current, longest = stats.streaks(None, today)
+    return f"🔥 Streak: {current} day(s) (best: {longest})"
+
+# The Analytics tab's time-to-complete line over tasks completed in the last `days` days
+def latency_line(stats, today, days=30):
+    recent = stats.latency_sketch("latency", today - days + 1, today)
+    return (f"⏱️ Time to complete ({days} days): median {format_duration(recent.quantile(0.5))}, "
+            f"p90 {format_duration(recent.quantile(0.9))}")
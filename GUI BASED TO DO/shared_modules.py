@@ -0,0 +1,15 @@
+# shared_modules.py
+#
+# The storage, scheduling and statistics modules the GUI uses (sqlite_store,
+# task_times, recurrence, watcher, task_stats, analytics, latency, task_ids,
+# utils) exist once, in the TaskPilot directory above this one. Importing
+# this module first makes them importable from here. That directory goes at
+# the end of sys.path, so this directory's own modules of the same name as
+# root ones (encryption, task_manager, reports ...) still win.
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
@@ -2,17 +2,39 @@
 import json
 import os
 from encryption import encrypt_data, decrypt_data
-from task_utils import Task
 
 TASK_FILE = "tasks.json"
 
+class Task:
+    FIELDS = ("title", "category", "due", "time", "completed", "recurring", "priority", "created_at", "completed_at")
+
+    def __init__(self, title, category="General", due=None, time=None, completed=False, recurring=None,
+                 priority=None, created_at=None, completed_at=None):
+        self.title = title
+        self.category = category
+        self.due = due
+        self.time = time
+        self.completed = completed
+        self.recurring = recurring
+        self.priority = priority
+        self.created_at = created_at      # see task_times.now_moment()
+        self.completed_at = completed_at
+
+    @classmethod
+    def from_dict(cls, data):
+        """Task from a saved dict; fields it does not know are left out"""
+        return cls(**{name: data[name] for name in cls.FIELDS if name in data})
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
 def load_tasks():
     if not os.path.exists(TASK_FILE):
         return []
     try:
-        with open(TASK_FILE, 'r') as f:
+        with open(TASK_FILE, 'rb') as f:
             encrypted = f.read()
-            if encrypted.strip() == '':
+            if not encrypted.strip():
                 return []
             data = decrypt_data(encrypted)
             task_dicts = json.loads(data)
@@ -23,9 +45,9 @@ def load_tasks():
 
 def save_tasks(tasks):
     try:
-        data = json.dumps([t.to_dict() for t in tasks], indent=2)
+        data = json.dumps([t.to_dict() for t in tasks], separators=(",", ":"))
         encrypted = encrypt_data(data)
-        with open(TASK_FILE, 'w') as f:
+        with open(TASK_FILE, 'wb') as f:
             f.write(encrypted)
     except Exception as e:
         print(f"❗ Failed to save tasks: {e}")
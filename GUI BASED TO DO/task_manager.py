@@ -13,6 +13,9 @@ else:
 
 from task_data import Task, load_tasks, save_tasks
 from task_utils import parse_date, parse_time, parse_task_datetime
+import shared_modules  # the modules below live in the TaskPilot directory (see shared_modules)
+from recurrence import Rule
+import task_times
 
 # --- Add Task ---
 def add_task():
@@ -20,7 +23,7 @@ def add_task():
     category = input("📂 Category (default: General): ") or "General"
     due_input = input("🗕️ Due Date (YYYY-MM-DD or DD-MM-YYYY or leave blank): ").strip()
     time_input = input("⏰ Due Time (e.g., 12:30 PM / 23:30 / 12.30am or leave blank): ").strip()
-    recurring = input("🔁 Recurring (daily/weekly/none): ").strip().lower() or None
+    recurring = input("🔁 Recurring (daily/weekly/monthly/yearly, e.g. weekly;byday=MO,WE, or none): ").strip().lower() or None
 
     due = None
     time_str = None
@@ -39,24 +42,67 @@ def add_task():
             print(f"⚠️ Invalid time format: {e}")
             return
 
-    if recurring not in ["daily", "weekly"]:
+    if recurring in ("none", "no"):
         recurring = None
+    elif recurring:
+        try:
+            recurring = str(Rule.parse(recurring))
+        except ValueError as e:
+            print(f"⚠️ Invalid recurrence: {e}")
+            return
 
-    task = Task(title, category, due, time_str, False, recurring)
+    task = Task(title, category, due, time_str, False, recurring, created_at=task_times.now_moment())
     tasks = load_tasks()
     tasks.append(task)
     save_tasks(tasks)
     print("✅ Task added successfully.")
 
 # --- View All Tasks ---
-def view_tasks():
+def list_tasks(filter_category=None):
     tasks = load_tasks()
+    if filter_category:
+        tasks = [t for t in tasks if t.category.lower() == filter_category.lower()]
     if not tasks:
         print("❓ No tasks found.")
         return
     print("\n📅 Task List:")
     for idx, task in enumerate(tasks, 1):
-        print(f"{idx}. {task.title} [{task.category}] - Due: {task.due or 'N/A'} {task.time or ''} Recurring: {task.recurring or 'No'}")
+        status = "✅" if task.completed else "❌"
+        print(f"{idx}. {status} {task.title} [{task.category}] - Due: {task.due or 'N/A'} {task.time or ''} Recurring: {task.recurring or 'No'}")
+
+# The task at the 1-based number the user picks from list_tasks(), or None
+def _pick_task(tasks, action):
+    list_tasks()
+    try:
+        idx = int(input(f"Enter task number to {action}: ")) - 1
+    except ValueError:
+        print("❗ Invalid input.")
+        return None
+    if not 0 <= idx < len(tasks):
+        print("❗ Invalid task number.")
+        return None
+    return idx
+
+# --- Complete Task ---
+def complete_task():
+    tasks = load_tasks()
+    idx = _pick_task(tasks, "mark complete")
+    if idx is None:
+        return
+    tasks[idx].completed = True
+    tasks[idx].completed_at = task_times.now_moment()
+    save_tasks(tasks)
+    print("✅ Task marked as complete.")
+
+# --- Delete Task ---
+def delete_task():
+    tasks = load_tasks()
+    idx = _pick_task(tasks, "delete")
+    if idx is None:
+        return
+    removed = tasks.pop(idx)
+    save_tasks(tasks)
+    print(f"🗑️ Deleted: {removed.title}")
 
 # --- Show Upcoming Within Hour ---
 def show_upcoming():
@@ -105,7 +151,7 @@ def main():
         if choice == "1":
             add_task()
         elif choice == "2":
-            view_tasks()
+            list_tasks()
         elif choice == "3":
             show_upcoming()
         elif choice == "4":
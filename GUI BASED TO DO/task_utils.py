@@ -1,20 +1,21 @@
-# utils.py
+# task_utils.py (date and time parsing for the GUI app)
+#
+# The parsers are the CLI's (utils, see shared_modules); here times also read
+# "." as ":" ("12.30pm"), as the GUI always has.
 
 from datetime import datetime
+import shared_modules  # makes utils importable (see shared_modules)
+import utils
+from utils import TIME_FORMATS, parse_date
 
-def parse_date(date_str):
-    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d"):
-        try:
-            return datetime.strptime(date_str, fmt).date()
-        except ValueError:
-            continue
-    raise ValueError(f"Date format not recognized: {date_str}")
+def parse_time(time_str, formats=TIME_FORMATS):
+    """`time_str` as a canonical "HH:MM AM" string ("12.30pm" and "23:30" are fine too)"""
+    return utils.parse_time(time_str, formats, dots=True)
 
-def parse_time(time_str):
-    time_str = time_str.strip().replace('.', ':').upper()
-    for fmt in ("%I:%M %p", "%H:%M", "%I:%M%p"):
-        try:
-            return datetime.strptime(time_str, fmt).strftime("%I:%M %p")
-        except ValueError:
-            continue
-    raise ValueError(f"Time format not recognized: {time_str}")
+def parse_times(values, formats=TIME_FORMATS):
+    """Canonical "HH:MM AM" strings for a column of times, None where one cannot be read"""
+    return utils.parse_times(values, formats, dots=True)
+
+def parse_task_datetime(due, time_str):
+    """The datetime a task is due at, from its due date and time strings"""
+    return datetime.combine(parse_date(due), datetime.strptime(parse_time(time_str), "%I:%M %p").time())
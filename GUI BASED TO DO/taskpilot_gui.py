@@ -13,10 +13,20 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QSystemTrayIcon, QMenu, QSplitter, QStackedWidget)
 from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal, QDate, QTime, QPropertyAnimation, QEasingCurve, QRect
 from PyQt6.QtGui import QFont, QIcon, QPalette, QColor, QPixmap, QPainter, QBrush, QPen
-from encryption import initialize_encryption, encrypt_data, decrypt_data
+from encryption import initialize_encryption, encrypt_data, decrypt_data, KEY_FILE
+import shared_modules  # the modules below live in the TaskPilot directory (see shared_modules)
+import sqlite_store
+from watcher import StoreWatcher
+from task_ids import new_id
+from recurrence import rule_for, advance
+import task_times
+from task_stats import TaskStats
+from analytics import build_stats
+from reports import streak_line, latency_line
 
 USERS_FILE = "storage/users.json"
 TASK_FILE_TEMPLATE = "storage/tasks_{username}.json"
+STORAGE_BACKEND = "json"  # "json": one encrypted file per user, "sqlite": shared indexed sqlite_store.DB_FILE
 
 class UserManager:
     @staticmethod
@@ -278,7 +288,11 @@ Password Requirements:
         self.accept()
 
 class Task:
-    def __init__(self, title, category="General", due=None, time=None, completed=False, recurring=None, priority="Medium"):
+    __slots__ = ("title", "category", "due", "time", "completed", "recurring", "priority", "created_at", "id",
+                 "due_day", "due_ts", "completed_at", "history")
+
+    def __init__(self, title, category="General", due=None, time=None, completed=False, recurring=None, priority="Medium", created_at=None, id=None,
+                 due_day=None, due_ts=None, completed_at=None, history=None):
         self.title = title
         self.category = category
         self.due = due
@@ -286,35 +300,65 @@ class Task:
         self.completed = completed
         self.recurring = recurring
         self.priority = priority
-        self.created_at = datetime.now().isoformat()
+        self.created_at = created_at or datetime.now().isoformat()
+        self.id = id or new_id()
+        if due_day is None and due_ts is None:  # a new task; stored ones come with theirs (see task_times)
+            due_day, due_ts = task_times.stamps(due, time)
+        self.due_day = due_day
+        self.due_ts = due_ts
+        self.completed_at = completed_at  # see task_times.now_moment()
+        self.history = history  # past occurrences of a recurring task (see recurrence.advance)
 
     def to_dict(self):
-        return self.__dict__
+        """A new dict of the task's fields"""
+        return {name: getattr(self, name) for name in self.__slots__}
 
 class TaskManager:
     @staticmethod
+    def store_files(username):
+        """Files whose change means `username`'s tasks changed"""
+        if STORAGE_BACKEND == "sqlite":
+            return [sqlite_store.DB_FILE, sqlite_store.DB_FILE + "-wal", KEY_FILE]
+        return [TASK_FILE_TEMPLATE.format(username=username), KEY_FILE]
 
-    
-
+    @staticmethod
     def save_tasks(tasks, username):
+        """Save, with due_day/due_ts brought up to date with each task's due and time"""
+        tasks = list(tasks)
+        for t in tasks:
+            t.due_day, t.due_ts = task_times.stamps(t.due, t.time)
+        if STORAGE_BACKEND == "sqlite":
+            sqlite_store.save_records([t.to_dict() for t in tasks], owner=username)
+            return
         os.makedirs("storage", exist_ok=True)
         task_file = TASK_FILE_TEMPLATE.format(username=username)
-        with open(task_file, "wb") as f:
-            json_data = json.dumps([t.to_dict() for t in tasks])
-            f.write(encrypt_data(json_data))
+        payload = encrypt_data(json.dumps([t.to_dict() for t in tasks], separators=(",", ":")))
+        tmp = task_file + ".tmp"  # readers (the watcher's reload) never see a half-written file
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, task_file)
 
     @staticmethod
     def load_tasks(username):
-        task_file = TASK_FILE_TEMPLATE.format(username=username)
-        if not os.path.exists(task_file):
-            return []
-        try:
-            with open(task_file, "rb") as f:
-                decrypted = decrypt_data(f.read())
-                data = json.loads(decrypted)
-                return [Task(**t) for t in data]
-        except Exception:
-            return []
+        """Tasks of `username`, or None if their file cannot be read; tasks saved
+        before IDs (or due_day/due_ts) existed get them, saved right away"""
+        if STORAGE_BACKEND == "sqlite":
+            data = sqlite_store.load_records(owner=username)
+        else:
+            task_file = TASK_FILE_TEMPLATE.format(username=username)
+            if not os.path.exists(task_file):
+                return []
+            try:
+                with open(task_file, "rb") as f:
+                    decrypted = decrypt_data(f.read())
+                    data = json.loads(decrypted)
+            except Exception as e:
+                print(f"⚠️ Could not read {task_file} ({str(e) or type(e).__name__})")
+                return None
+        tasks = [Task(**t) for t in data]
+        if any(not t.get("id") or not task_times.is_stamped(t) for t in data):
+            TaskManager.save_tasks(tasks, username)
+        return tasks
         
 
 
@@ -452,10 +496,9 @@ class TaskCard(QFrame):
         # Format dates and times properly
         due_text = "No date"
         if self.task.due:
-            try:
-                due_date = datetime.strptime(self.task.due, "%Y-%m-%d")
-                due_text = due_date.strftime("%B %d, %Y")
-            except:
+            if self.task.due_day is not None:
+                due_text = task_times.to_date(self.task.due_day).strftime("%B %d, %Y")
+            else:
                 due_text = self.task.due
                 
         time_text = "No time"
@@ -464,7 +507,8 @@ class TaskCard(QFrame):
         
         recurring_text = "None"
         if self.task.recurring:
-            recurring_text = self.task.recurring.title()
+            rule = rule_for(self.task.recurring)
+            recurring_text = rule.describe() if rule else self.task.recurring.title()
         
         # Create detail labels with better styling
         category_label = QLabel(f"📂 Category: {self.task.category}")
@@ -513,16 +557,15 @@ class TaskCard(QFrame):
         layout.addWidget(delete_btn, alignment=Qt.AlignmentFlag.AlignRight)
         
     def complete_task(self):
-        self.task.completed = True
         if self.parent_widget:
-            self.parent_widget.refresh_tasks()
+            self.parent_widget.complete_task(self.task.id)
             
     def delete_task(self):
         reply = QMessageBox.question(self, 'Delete Task', 
                                    f'Are you sure you want to delete "{self.task.title}"?',
                                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes and self.parent_widget:
-            self.parent_widget.remove_task(self.task)
+            self.parent_widget.remove_task(self.task.id)
 
 class AddTaskDialog(QDialog):
     def __init__(self, parent=None):
@@ -775,7 +818,7 @@ QComboBox {
         form_layout.addWidget(recurring_lbl, 5, 0)
         
         self.recurring_combo = QComboBox()
-        self.recurring_combo.addItems(["None", "Daily", "Weekly", "Monthly"])
+        self.recurring_combo.addItems(["None", "Daily", "Weekly", "Monthly", "Yearly"])
         self.recurring_combo.setStyleSheet("""
             QComboBox {
                                           padding: 5px;
@@ -963,41 +1006,16 @@ class ProductivityWidget(QWidget):
         """)
         layout.addWidget(self.stats_label)
         
-    def update_stats(self, tasks):
-        today = datetime.today().date()
+    def update_stats(self, stats):
+        """Refresh from a TaskStats; each figure is a sum over a few day buckets"""
+        today = task_times.today()
+        this_month = task_times.to_date(today).replace(day=1)
+        month_start = task_times.parse_day(this_month)
+        next_month = task_times.parse_day((this_month + timedelta(days=32)).replace(day=1))
         
-        # Calculate statistics
-        daily_completed = daily_total = 0
-        weekly_completed = weekly_total = 0
-        monthly_completed = monthly_total = 0
-        
-        for task in tasks:
-            if not task.due:
-                continue
-                
-            try:
-                task_date = datetime.strptime(task.due, "%Y-%m-%d").date()
-                
-                # Daily stats
-                if task_date == today:
-                    daily_total += 1
-                    if task.completed:
-                        daily_completed += 1
-                
-                # Weekly stats
-                if (today - task_date).days <= 7 and task_date <= today:
-                    weekly_total += 1
-                    if task.completed:
-                        weekly_completed += 1
-                
-                # Monthly stats
-                if task_date.month == today.month and task_date.year == today.year:
-                    monthly_total += 1
-                    if task.completed:
-                        monthly_completed += 1
-                        
-            except:
-                continue
+        daily_total, daily_completed = stats.totals(today, today)
+        weekly_total, weekly_completed = stats.totals(today - 7, today)
+        monthly_total, monthly_completed = stats.totals(month_start, next_month - 1)
         
         # Update progress bars
         self.daily_progress.setValue(int((daily_completed / daily_total * 100) if daily_total else 0))
@@ -1005,10 +1023,10 @@ class ProductivityWidget(QWidget):
         self.monthly_progress.setValue(int((monthly_completed / monthly_total * 100) if monthly_total else 0))
         
         # Update statistics text
-        total_tasks = len(tasks)
-        completed_tasks = len([t for t in tasks if t.completed])
+        total_tasks, completed_tasks = stats.totals()
         pending_tasks = total_tasks - completed_tasks
-        high_priority = len([t for t in tasks if t.priority == "High" and not t.completed])
+        high_total, high_completed = stats.totals(key="priority:High")
+        high_priority = high_total - high_completed
         
         stats_text = f"""
 📊 Overall Statistics:
@@ -1021,15 +1039,21 @@ Total Tasks: {total_tasks}
 📅 Today: {daily_completed}/{daily_total} completed
 📊 This Week: {weekly_completed}/{weekly_total} completed
 📈 This Month: {monthly_completed}/{monthly_total} completed
+{streak_line(stats, today)}
+{latency_line(stats, today)}
         """
         
         self.stats_label.setText(stats_text)
 
 class TaskPilotGUI(QMainWindow):
+    store_changed = pyqtSignal()  # emitted from the watcher thread; delivered on the GUI thread
+
     def __init__(self):
         super().__init__()
-        self.tasks = []
+        self.tasks = {}  # task id -> Task, in insertion order
+        self.stats = TaskStats()  # productivity counters over self.tasks
         self.current_user = None
+        self.watcher = None
         
         
 
@@ -1042,10 +1066,10 @@ class TaskPilotGUI(QMainWindow):
              QTimer.singleShot(0, self.load_tasks)  # ✅ this runs load_tasks AFTER UI is ready
 
             
-            # Setup timer for auto-refresh
-            self.timer = QTimer()
-            self.timer.timeout.connect(self.refresh_tasks)
-            self.timer.start(30000)  # Refresh every 30 seconds
+            # Reload when another window or the CLI writes this user's tasks
+            self.store_changed.connect(self.load_tasks)
+            self.watcher = StoreWatcher(TaskManager.store_files(self.current_user),
+                                        self.store_changed.emit).start()
         
     def setup_login(self):
         login_dialog = LoginDialog()
@@ -1079,11 +1103,15 @@ class TaskPilotGUI(QMainWindow):
     # ✅ Create and add tasks tab (important: this defines self.tasks_layout)
        self.tasks_tab = self.create_tasks_tab()
        self.tabs.addTab(self.tasks_tab, "📋 Tasks")
+
+    # Analytics tab, refreshed from self.stats by refresh_tasks
+       self.productivity_tab = ProductivityWidget()
+       self.tabs.addTab(self.productivity_tab, "📈 Analytics")
  
     # ✅ Now safe to call refresh_tasks
        self.refresh_tasks()
 
-    # Optionally add other tabs later (Reports, Settings, etc.)
+    # Optionally add other tabs later (Settings, etc.)
     
     
 
@@ -1108,13 +1136,13 @@ class TaskPilotGUI(QMainWindow):
             return
 
         task = Task(**task_data)
-        self.tasks.append(task)
+        self.tasks[task.id] = task
 
         # ✅ Debug output
         print(f"[DEBUG] Current user: {self.current_user}")
         print(f"[DEBUG] Saving {len(self.tasks)} tasks for {self.current_user}")
 
-        TaskManager.save_tasks(self.tasks, self.current_user)
+        self.save_tasks()
         self.refresh_tasks()
         QMessageBox.information(self, "Success", "Task added successfully!")
 
@@ -1415,8 +1443,18 @@ class TaskPilotGUI(QMainWindow):
 
 
         
+    def save_tasks(self):
+        """Save, without our own write coming back as a change from outside"""
+        TaskManager.save_tasks(self.tasks.values(), self.current_user)
+        if self.watcher:
+            self.watcher.acknowledge()
+
     def load_tasks(self):
-        self.tasks = TaskManager.load_tasks(self.current_user)
+        tasks = TaskManager.load_tasks(self.current_user)
+        if tasks is None:
+            return  # keep the tasks on screen rather than let the next save write an empty list
+        self.tasks = {t.id: t for t in tasks}
+        self.stats = build_stats(t.to_dict() for t in self.tasks.values())
         self.refresh_tasks()
 
 
@@ -1426,6 +1464,8 @@ class TaskPilotGUI(QMainWindow):
     
     
     def refresh_tasks(self):
+     self.productivity_tab.update_stats(self.stats)  # every change to self.tasks ends up here
+
     # Clear existing task cards
      for i in reversed(range(self.tasks_layout.count() - 1)):  # -1 to keep the stretch
         child = self.tasks_layout.itemAt(i).widget()
@@ -1441,7 +1481,7 @@ class TaskPilotGUI(QMainWindow):
 
 
     # Update category filter
-     categories = set(task.category for task in self.tasks)
+     categories = set(task.category for task in self.tasks.values())
      current_category = self.category_filter.currentText()
      self.category_filter.clear()
      self.category_filter.addItem("All Categories")
@@ -1465,7 +1505,7 @@ class TaskPilotGUI(QMainWindow):
         category_filter = self.category_filter.currentText()
         status_filter = self.status_filter.currentText()
         
-        filtered_tasks = self.tasks
+        filtered_tasks = list(self.tasks.values())
         
         if category_filter != "All Categories":
             filtered_tasks = [t for t in filtered_tasks if t.category == category_filter]
@@ -1480,7 +1520,8 @@ class TaskPilotGUI(QMainWindow):
         filtered_tasks.sort(key=lambda t: (
             t.completed,  # Completed tasks last
             priority_order.get(t.priority, 1),  # By priority
-            t.due or "9999-12-31"  # By due date
+            t.due_ts if t.due_ts is not None else  # By due date and time, untimed tasks at the end of their day
+            (t.due_day + 1) * task_times.DAY - 1 if t.due_day is not None else float("inf")
         ))
         
         # Add task cards
@@ -1507,16 +1548,32 @@ class TaskPilotGUI(QMainWindow):
                 return
             
             task = Task(**task_data)
-            self.tasks.append(task)
-            TaskManager.save_tasks(self.tasks, self.current_user)
+            self.tasks[task.id] = task
+            self.save_tasks()
+            self.stats.add(task.to_dict())
             self.refresh_tasks()
             QMessageBox.information(self, "Success", "Task added successfully!")
 
                 
-    def remove_task(self, task):
-        if task in self.tasks:
-            self.tasks.remove(task)
-            TaskManager.save_tasks(self.tasks, self.current_user)
+    def complete_task(self, task_id):
+        """Mark a task done; a recurring one moves on to its next occurrence instead"""
+        task = self.tasks.get(task_id)
+        if task:
+            before = task.to_dict()
+            task.completed = True
+            task.completed_at = task_times.now_moment()
+            changes = advance(task.to_dict(), datetime.now())  # keeps this completion in the history
+            for name, value in (changes or {}).items():
+                setattr(task, name, value)
+            self.save_tasks()
+            self.stats.change(before, task.to_dict())
+            self.refresh_tasks()
+
+    def remove_task(self, task_id):
+        task = self.tasks.pop(task_id, None)
+        if task:
+            self.save_tasks()
+            self.stats.add(task.to_dict(), -1)
             self.refresh_tasks()
     
     def logout(self):
@@ -1524,6 +1581,8 @@ class TaskPilotGUI(QMainWindow):
                                    f'Are you sure you want to logout, {self.current_user}?',
                                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
+            if self.watcher:
+                self.watcher.stop()
             self.close()
             # Restart the application to show login screen
             QApplication.quit()
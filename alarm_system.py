@@ -1,43 +1,109 @@
-from datetime import datetime, timedelta
-from task_manager import load_tasks, save_tasks
-from plyer import notification
+from datetime import datetime
+from task_manager import get_task, update_task, store_version, watched_files, fire_schedule, StoreConflict
+from fire_index import fire_time
+from watcher import StoreWatcher
+from recurrence import advance
+import notifications
+import heapq
+import threading
 import time
-import os
 
-def alarm_system():
-    while True:
-        now = datetime.now()
-        tasks = load_tasks()
-        updated = False
+FIRE_WINDOW = 60  # an alarm still goes off this long after its due minute starts (fire_index.KEEP_PAST)
+
+class AlarmScheduler:
+    """Min-heap of upcoming alarm times that sleeps until the earliest one.
+
+    A StoreWatcher wakes it when the store is written, by this process or
+    any other; the alarms are then only re-read if the store version changed,
+    and from the fire-time index (task_manager.fire_schedule) rather than the
+    store itself. Heap entries that no longer match a task's current fire
+    time are dropped when popped. The index holds no titles; a task is looked
+    up by id when its alarm fires. An alarm that has fired stays in _fired
+    until its window has passed, so a re-read within the window (any write
+    wakes it) does not schedule it again.
+    """
+
+    def __init__(self, dispatcher=None):
+        self.dispatcher = dispatcher or notifications.dispatcher()
+        self._heap = []       # (fire time, task id)
+        self._scheduled = {}  # task id -> fire time of the live heap entry
+        self._fired = {}      # task id -> fire time, until its window has passed
+        self._version = None
+        self._wake = threading.Event()
+        self._stopped = False
+
+    def refresh(self):
+        version = store_version()
+        if version == self._version:
+            return
+        self._version = version
+        now = time.time()
+        current = {task_id: when for when, task_id in fire_schedule().between(now - FIRE_WINDOW + 1, float("inf"))}
+        for task_id in self._scheduled.keys() - current.keys():  # completed, deleted or past
+            del self._scheduled[task_id]
+        self._fired = {task_id: when for task_id, when in self._fired.items() if when + FIRE_WINDOW > now}
+        for task_id, when in current.items():
+            if self._scheduled.get(task_id) != when and self._fired.get(task_id) != when:
+                self._scheduled[task_id] = when
+                heapq.heappush(self._heap, (when, task_id))
 
-        for task in tasks:
-            if not task.completed and task.due and task.time:
+    # Pop and fire every alarm that is due; returns seconds until the next one
+    def _fire_due(self):
+        while self._heap:
+            when, task_id = self._heap[0]
+            now = time.time()
+            if when > now:
+                return when - now
+            heapq.heappop(self._heap)
+            if self._scheduled.get(task_id) != when:
+                continue  # stale: the task changed or went away
+            del self._scheduled[task_id]
+            if now < when + FIRE_WINDOW:
+                self._fired[task_id] = when
+                self._fire(task_id, when)
+        return None
+
+    # Hand the alarm to the notification dispatcher (this never blocks on
+    # the notification itself), then move recurring tasks on to their next
+    # occurrence after this one
+    def _fire(self, task_id, when):
+        task = get_task(task_id)
+        if task is None:
+            return
+        self.dispatcher.submit(task.title, when)
+        if not task.recurring or fire_time(task.to_dict()) != when:
+            return
+        changes = advance(task.to_dict(), datetime.fromtimestamp(when))
+        if changes is None:
+            return
+        try:
+            update_task(task.id, expected=task, **changes)
+        except StoreConflict as e:
+            # changed by another writer; rescheduled from its new state on the next refresh
+            print(f"⚠️ '{task.title}' was not moved to its next occurrence: {e}")
+
+    def run(self):
+        watcher = StoreWatcher(watched_files(), self.wake).start()
+        try:
+            while not self._stopped:
+                timeout = None
                 try:
-                    dt = datetime.strptime(f"{task.due} {task.time}", "%Y-%m-%d %I:%M %p")
-                    if now.strftime("%Y-%m-%d %I:%M %p") == dt.strftime("%Y-%m-%d %I:%M %p"):
-                        print(f"\n🔔 ALARM: '{task.title}' is due now!")
-                        try:
-                            notification.notify(
-                                title="Task Reminder",
-                                message=f"{task.title} is due now!",
-                                timeout=10
-                            )
-                            if os.name == 'nt':
-                                os.system('echo \a')
-                        except:
-                            pass
-
-                        if task.recurring == "daily":
-                            dt += timedelta(days=1)
-                            task.due = dt.strftime("%Y-%m-%d")
-                            updated = True
-                        elif task.recurring == "weekly":
-                            dt += timedelta(weeks=1)
-                            task.due = dt.strftime("%Y-%m-%d")
-                            updated = True
+                    self.refresh()
+                    timeout = self._fire_due()
                 except Exception as e:
                     print(f"⚠️ Error with alarm: {e}")
+                self._wake.wait(timeout)
+                self._wake.clear()
+        finally:
+            watcher.stop()
+
+    def wake(self):
+        """Re-check the store now"""
+        self._wake.set()
 
-        if updated:
-            save_tasks(tasks)
-        time.sleep(30)
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+def alarm_system():
+    AlarmScheduler().run()
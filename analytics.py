@@ -0,0 +1,219 @@
+# analytics.py (columnar task analytics for TaskPilot)
+#
+# TaskColumns holds the fields reports look at as NumPy arrays, one entry
+# per task: the due day as datetime64[D] (NaT without a due date), completed
+# as bool, and priority and category as integer codes into a list of labels
+# (their values as text, as in task_stats keys; -1 when unset). Totals and
+# breakdowns over any range of due days are then boolean masks and bincounts
+# over whole columns instead of a Python loop per task. Completion latencies
+# (see latency) are gathered alongside and bucketed the same way.
+#
+# Its main use is rebuilding the task_stats counters from every task (a full
+# save, a stale sidecar, the GUI loading a user's tasks) as a few grouped
+# counts rather than one dictionary update per task and key. Without NumPy,
+# stats_builder() and build_stats() fall back to plain TaskStats, with the
+# same result.
+
+from collections import Counter
+from task_stats import TaskStats, ALL, past_occurrences
+from latency import Sketch, BOUNDS, METRICS, measures
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NAT = -2 ** 63  # datetime64 NaT as int64
+NO_VALUE = -2 ** 63  # in a latency column: the metric does not apply
+
+class TaskColumns:
+    def __init__(self, due, completed, priority, category, priorities, categories, schedules, finished=None):
+        self.due = due                # datetime64[D], NaT for tasks without a due date
+        self.completed = completed    # bool
+        self.priority = priority      # int32 codes into self.priorities, -1 if unset
+        self.category = category      # int32 codes into self.categories, -1 if unset
+        self.priorities = priorities  # labels, in order of first appearance
+        self.categories = categories
+        self.schedules = schedules    # Counter of "due_day|rule" for recurring tasks
+        # (rows, completion days, {metric: seconds or NO_VALUE}) of the tasks
+        # with latency measures (see latency.measures)
+        self.finished = finished
+
+    @classmethod
+    def from_records(cls, records):
+        """Columns of stamped task records (see task_times)"""
+        builder = ColumnBuilder()
+        for record in records:
+            builder.track(record)
+        return builder.columns()
+
+    def __len__(self):
+        return len(self.completed)
+
+    def _dimension(self, dimension):
+        if dimension == "priority":
+            return self.priority, self.priorities
+        if dimension == "category":
+            return self.category, self.categories
+        raise ValueError(f"Unknown dimension '{dimension}'")
+
+    # Mask of tasks due from day `first` to `last` (due_day integers,
+    # inclusive, None = open); with no bounds at all, every task
+    def _window(self, first, last):
+        if first is None and last is None:
+            return np.ones(len(self), dtype=bool)
+        days = self.due.view(np.int64)
+        mask = ~np.isnat(self.due)
+        if first is not None:
+            mask &= days >= first
+        if last is not None:
+            mask &= days <= last
+        return mask
+
+    def _key_mask(self, key):
+        if key == ALL:
+            return None
+        dimension, _, value = key.partition(":")
+        codes, labels = self._dimension(dimension)
+        if value not in labels:
+            return np.zeros(len(self), dtype=bool)
+        return codes == labels.index(value)
+
+    def totals(self, first=None, last=None, key=ALL):
+        """(total, completed) like TaskStats.totals, from masks over the columns"""
+        mask = self._window(first, last)
+        key_mask = self._key_mask(key)
+        if key_mask is not None:
+            mask &= key_mask
+        return int(mask.sum()), int((mask & self.completed).sum())
+
+    def breakdown(self, dimension, first=None, last=None):
+        """{value: (total, completed)} like TaskStats.breakdown"""
+        codes, labels = self._dimension(dimension)
+        mask = self._window(first, last) & (codes >= 0)
+        totals = np.bincount(codes[mask], minlength=len(labels))
+        completed = np.bincount(codes[mask & self.completed], minlength=len(labels))
+        return {label: (int(totals[i]), int(completed[i]))
+                for i, label in enumerate(labels) if totals[i]}
+
+    def to_stats(self, version=None):
+        """TaskStats with the same counts TaskStats.build would give for these tasks"""
+        stats = TaskStats(version)
+        keys = [ALL] + [f"priority:{p}" for p in self.priorities] + [f"category:{c}" for c in self.categories]
+        # One key slot per task for ALL, and one each for a set priority and category
+        slots = [np.zeros(len(self), dtype=np.int64),
+                 np.where(self.priority >= 0, 1 + self.priority, -1),
+                 np.where(self.category >= 0, 1 + len(self.priorities) + self.category, -1)]
+        slot = np.concatenate(slots)
+        done = np.tile(self.completed, len(slots))
+        day = np.tile(self.due.view(np.int64), len(slots))
+        used = slot >= 0
+        slot, done, day = slot[used], done[used], day[used]
+
+        totals = np.bincount(slot, minlength=len(keys))
+        completed = np.bincount(slot[done], minlength=len(keys))
+        stats.overall = {keys[i]: [int(totals[i]), int(completed[i])] for i in range(len(keys)) if totals[i]}
+
+        dated = day != NAT
+        if dated.any():
+            slot, done, day = slot[dated], done[dated], day[dated]
+            first = day.min()
+            groups, group, totals = np.unique((day - first) * len(keys) + slot,
+                                              return_inverse=True, return_counts=True)
+            completed = np.bincount(group[done], minlength=len(groups))
+            for g, total, complete in zip(groups.tolist(), totals.tolist(), completed.tolist()):
+                offset, key = divmod(g, len(keys))
+                stats.days.setdefault(int(first) + offset, {})[keys[key]] = [total, complete]
+        stats.recurring = dict(self.schedules)
+        if self.finished is not None:
+            self._add_latency(stats, keys)
+        return stats
+
+    # Fill stats.latency like TaskStats.add would: each measured value goes to
+    # the sketch bucket latency.bucket() gives it, grouped by completion day,
+    # key and metric
+    def _add_latency(self, stats, keys):
+        rows, days, values = self.finished
+        slots = [np.zeros(len(rows), dtype=np.int64),
+                 np.where(self.priority[rows] >= 0, 1 + self.priority[rows], -1),
+                 np.where(self.category[rows] >= 0, 1 + len(self.priorities) + self.category[rows], -1)]
+        bounds = np.array(BOUNDS)
+        for metric in METRICS:
+            seconds = values[metric]
+            measured = seconds != NO_VALUE
+            magnitude = np.abs(seconds[measured])
+            # 0 for under a second, else +/-(bucket + 1) by the sign of the value
+            code = np.minimum(np.searchsorted(bounds, magnitude, side="left"), len(bounds) - 1) + 1
+            code = np.where(magnitude < 1, 0, np.where(seconds[measured] < 0, -code, code))
+            slot = np.concatenate([s[measured] for s in slots])
+            code = np.tile(code, len(slots))
+            day = np.tile(days[measured], len(slots))
+            used = slot >= 0
+            groups, counts = np.unique(np.stack([day[used], slot[used], code[used]], axis=1),
+                                       axis=0, return_counts=True)
+            for (finished, key, group), count in zip(groups.tolist(), counts.tolist()):
+                sketch = stats.latency.setdefault(finished, {}).setdefault(keys[key], {}).setdefault(metric, Sketch())
+                if group == 0:
+                    sketch.zero += count
+                else:
+                    (sketch.positive if group > 0 else sketch.negative)[abs(group) - 1] = count
+
+# Collects the columns of records one at a time, so they can be gathered
+# while the records stream past on their way somewhere else
+class ColumnBuilder:
+    def __init__(self):
+        self._days, self._done, self._priority, self._category = [], [], [], []
+        self._priorities, self._categories = {}, {}  # label -> code
+        self._schedules = Counter()
+        self._finished_rows, self._finished_days = [], []
+        self._finished = {metric: [] for metric in METRICS}
+
+    def track(self, record):
+        """Add a task's fields, and its past occurrences like tasks of their own; returns the record"""
+        for past in past_occurrences(record):
+            self.track(past)
+        day = record.get("due_day")
+        self._days.append(NAT if day is None else day)
+        self._done.append(record.get("completed") is True)
+        value = record.get("priority")
+        self._priority.append(-1 if value is None else self._priorities.setdefault(f"{value}", len(self._priorities)))
+        value = record.get("category")
+        self._category.append(-1 if value is None else self._categories.setdefault(f"{value}", len(self._categories)))
+        if day is not None and isinstance(record.get("recurring"), str):
+            self._schedules[f"{day}|{record['recurring']}"] += 1
+        measured = measures(record) if record.get("completed_at") is not None else None
+        if measured:
+            self._finished_rows.append(len(self._done) - 1)
+            self._finished_days.append(measured[0])
+            for metric, column in self._finished.items():
+                column.append(measured[1].get(metric, NO_VALUE))
+        return record
+
+    def columns(self):
+        return TaskColumns(np.array(self._days, dtype=np.int64).view("datetime64[D]"),
+                           np.array(self._done, dtype=bool),
+                           np.array(self._priority, dtype=np.int32),
+                           np.array(self._category, dtype=np.int32),
+                           list(self._priorities), list(self._categories), self._schedules,
+                           (np.array(self._finished_rows, dtype=np.int64),
+                            np.array(self._finished_days, dtype=np.int64),
+                            {metric: np.array(column, dtype=np.int64) for metric, column in self._finished.items()}))
+
+    def stats(self, version=None):
+        return self.columns().to_stats(version)
+
+class _StatsBuilder(TaskStats):
+    def stats(self, version=None):
+        self.version = version
+        return self
+
+def stats_builder():
+    """Something to track() records with (returning each) whose stats() are their TaskStats"""
+    return _StatsBuilder() if np is None else ColumnBuilder()
+
+# Productivity counters for a full list of stamped task records
+def build_stats(records, version=None):
+    builder = stats_builder()
+    for record in records:
+        builder.track(record)
+    return builder.stats(version)
@@ -0,0 +1,261 @@
+# benchmarks.py (performance benchmarks for TaskPilot storage)
+#
+# Every benchmark runs in a throw-away directory with its own key, so it
+# never touches the real storage/ folder.
+#
+#   python benchmarks.py crypto --tasks 100000 1000000 --workers 1 2 4 8
+#   python benchmarks.py memory --tasks 100000 1000000
+#   python benchmarks.py parsing --tasks 10000 100000
+#   python benchmarks.py dates --count 100000
+#   python benchmarks.py analytics --tasks 100000 500000
+
+import _strptime
+import argparse
+import contextlib
+import gc
+import io
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import analytics
+import encryption
+import fire_index
+import reports
+import stream_store
+import task_manager
+import task_stats
+import task_times
+import utils
+from datetime import date, datetime
+from recurrence import task_schedule
+from task_table import TaskTable
+
+@contextmanager
+def scratch_store():
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix="taskpilot-bench-")
+    try:
+        os.chdir(tmp)
+        encryption.initialize_encryption()
+        encryption.keyring.invalidate()
+        yield tmp
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+# Stamped like every written task, so TaskTable derives due_day/due_ts instead of storing them
+def sample_tasks(n):
+    categories = ["Work", "Home", "Study", "Health", "Errands"]
+    for i in range(n):
+        due, time_str = f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"{i % 12 + 1:02d}:{i % 60:02d} PM"
+        due_day, due_ts = task_times.stamps(due, time_str)
+        yield task_manager.Task(
+            f"Task number {i}", categories[i % len(categories)], due, time_str,
+            i % 3 == 0, "weekly" if i % 10 == 0 else None, due_day=due_day, due_ts=due_ts)
+
+# Save/load throughput of the framed store as the crypto pool grows
+def bench_crypto(task_counts, worker_counts):
+    mode, workers = task_manager.STORAGE_MODE, encryption.CRYPTO_WORKERS
+    task_manager.STORAGE_MODE = "stream"
+    print(f"{'tasks':>10} {'workers':>8} {'save s':>8} {'load s':>8} {'load tasks/s':>13} {'speedup':>8}")
+    try:
+        with scratch_store():
+            for n in task_counts:
+                task_manager.save_tasks(sample_tasks(n))
+                baseline = None
+                for w in worker_counts:
+                    encryption.CRYPTO_WORKERS = w
+                    start = time.perf_counter()
+                    task_manager.save_tasks(sample_tasks(n))
+                    saved = time.perf_counter() - start
+                    start = time.perf_counter()
+                    count = sum(1 for _ in stream_store.iter_records())
+                    loaded = time.perf_counter() - start
+                    assert count == n
+                    baseline = baseline or loaded
+                    print(f"{n:>10} {w:>8} {saved:>8.2f} {loaded:>8.2f} {n / loaded:>13,.0f} {baseline / loaded:>7.2f}x")
+    finally:
+        task_manager.STORAGE_MODE, encryption.CRYPTO_WORKERS = mode, workers
+
+# Bytes still allocated by what build() returns
+def _footprint(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return after - before
+
+# Memory held by n tasks as decoded dicts, as Task objects and as a TaskTable
+def bench_memory(task_counts):
+    layouts = [
+        ("dicts", lambda n: [t.to_dict() for t in sample_tasks(n)]),
+        ("Task", lambda n: list(sample_tasks(n))),
+        ("TaskTable", lambda n: TaskTable(sample_tasks(n))),
+    ]
+    print(f"{'tasks':>10} {'layout':>10} {'MiB':>9} {'bytes/task':>11} {'vs dicts':>9}")
+    for n in task_counts:
+        baseline = None
+        for name, build in layouts:
+            size = _footprint(lambda: build(n))
+            baseline = baseline or size
+            print(f"{n:>10} {name:>10} {size / 2**20:>9.1f} {size / n:>11.0f} {size / baseline:>8.2f}x")
+
+# Counts datetime.strptime calls made inside the block
+@contextmanager
+def counting_strptime():
+    counter = {"calls": 0}
+    original = _strptime._strptime_datetime
+    def counted(*args):
+        counter["calls"] += 1
+        return original(*args)
+    _strptime._strptime_datetime = counted
+    try:
+        yield counter
+    finally:
+        _strptime._strptime_datetime = original
+
+# The monthly report loop as it was before due_day: one strptime per task
+def _string_report(records, today):
+    total = 0
+    for task in records:
+        if task.get("due"):
+            task_date = datetime.strptime(task["due"], "%Y-%m-%d").date()
+            total += task_date.month == today.month and task_date.year == today.year
+    return total
+
+# strptime calls (and time) per alarm tick and per report, on records as
+# stored before due_day/due_ts existed and on stamped ones. An alarm tick
+# here is working out every task's fire time and recurrence anchor, which is
+# what refreshing the alarm heap without the fire index costs.
+def bench_parsing(task_counts):
+    print(f"{'tasks':>10} {'work':>11} {'records':>8} {'strptime':>9} {'ms':>9}")
+    today = datetime.now().date()
+    for n in task_counts:
+        stamped = [task_times.stamp(t.to_dict()) for t in sample_tasks(n)]
+        legacy = [{k: v for k, v in r.items() if k not in task_times.FIELDS} for r in stamped]
+        with scratch_store():
+            task_manager.save_tasks(task_manager.Task(**r) for r in stamped)
+            task_manager.view_tasks()  # warm the cache, so the report times the counting only
+            runs = [
+                ("alarm tick", "legacy", lambda: [(fire_index.fire_time(r), task_schedule(r)) for r in legacy]),
+                ("alarm tick", "stamped", lambda: [(fire_index.fire_time(r), task_schedule(r)) for r in stamped]),
+                ("report", "legacy", lambda: _string_report(legacy, today)),
+                ("report", "stamped", lambda: reports.show_productivity_report("monthly")),
+            ]
+            for work, kind, run in runs:
+                with counting_strptime() as counter, contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    run()
+                    elapsed = time.perf_counter() - start
+                print(f"{n:>10} {work:>11} {kind:>8} {counter['calls']:>9} {elapsed * 1000:>9.1f}")
+
+# The strptime loops parse_task_datetime and parse_time used before utils
+def _strptime_date(date_str):
+    for fmt in task_manager.DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(date_str)
+
+def _strptime_time(time_str):
+    for fmt in task_manager.TIME_FORMATS:
+        try:
+            return datetime.strptime(time_str, fmt).strftime("%I:%M %p")
+        except ValueError:
+            continue
+    raise ValueError(time_str)
+
+# Old strptime loops vs. utils, on `count` strings drawn from `distinct`
+# different ones, in every format the CLI accepts (later formats cost the
+# old loops one exception per format tried first)
+def bench_dates(count, distinct):
+    days = [date.fromordinal(date(2025, 1, 1).toordinal() + i % 730) for i in range(distinct)]
+    date_forms = ["%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%m-%d-%Y"]
+    dates = [days[i % distinct].strftime(date_forms[i % 4]) for i in range(count)]
+    time_forms = ["{h12}:{m:02d} {p}", "{h24}:{m:02d}", "{h12}.{m:02d} {p}"]
+    times = [time_forms[i % 3].format(h12=(i % 12) + 1, h24=i % 24, m=i % 60, p="AM" if i % 2 else "PM")
+             for i in range(count)]
+    print(f"{'strings':>10} {'parser':>25} {'ms':>9} {'µs/string':>10}")
+    runs = [
+        ("dates", "strptime loop", lambda: [_strptime_date(d) for d in dates]),
+        ("dates", "utils, empty cache", lambda: [task_manager.parse_task_datetime(d) for d in dates]),
+        ("dates", "utils, warm cache", lambda: [task_manager.parse_task_datetime(d) for d in dates]),
+        ("dates", "utils.parse_dates", lambda: utils.parse_dates(dates, task_manager.DATE_FORMATS)),
+        ("times", "strptime loop", lambda: [_strptime_time(t) for t in times]),
+        ("times", "utils, empty cache", lambda: [task_manager.parse_time(t) for t in times]),
+        ("times", "utils, warm cache", lambda: [task_manager.parse_time(t) for t in times]),
+        ("times", "utils.parse_times", lambda: utils.parse_times(times, task_manager.TIME_FORMATS)),
+    ]
+    for kind, name, run in runs:
+        if "empty" in name:
+            utils._cached_date.cache_clear()
+            utils._cached_time.cache_clear()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{count:>10} {kind + ': ' + name:>25} {elapsed * 1000:>9.1f} {elapsed / count * 1e6:>10.2f}")
+
+# Rebuilding the productivity counters from every task, one dictionary
+# update per task (TaskStats.build) vs. NumPy columns (analytics), and a
+# month's completion rate and category breakdown from each result
+def bench_analytics(task_counts):
+    if analytics.np is None:
+        print("NumPy is not installed; analytics falls back to TaskStats.build")
+    today = task_times.today()
+    print(f"{'tasks':>10} {'counters':>15} {'build ms':>9} {'query ms':>9}")
+    for n in task_counts:
+        records = [task_times.stamp(t.to_dict()) for t in sample_tasks(n)]
+        runs = [("TaskStats.build", task_stats.TaskStats.build), ("analytics", analytics.build_stats)]
+        if analytics.np is not None:
+            runs.append(("columns", analytics.TaskColumns.from_records))
+        for name, build in runs:
+            gc.collect()
+            start = time.perf_counter()
+            stats = build(records)
+            built = time.perf_counter()
+            stats.totals(today - 30, today)
+            stats.breakdown("category", today - 30, today)
+            queried = time.perf_counter()
+            print(f"{n:>10} {name:>15} {(built - start) * 1000:>9.1f} {(queried - built) * 1000:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="TaskPilot benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+    crypto = sub.add_parser("crypto", help="framed store throughput vs. crypto worker count")
+    crypto.add_argument("--tasks", type=int, nargs="+", default=[100_000, 1_000_000])
+    crypto.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    memory = sub.add_parser("memory", help="memory per task: dicts vs. Task objects vs. TaskTable")
+    memory.add_argument("--tasks", type=int, nargs="+", default=[100_000, 1_000_000])
+    parsing = sub.add_parser("parsing", help="strptime calls per alarm tick and per report")
+    parsing.add_argument("--tasks", type=int, nargs="+", default=[10_000, 100_000])
+    dates = sub.add_parser("dates", help="date/time parsing: strptime loops vs. utils")
+    dates.add_argument("--count", type=int, default=100_000)
+    dates.add_argument("--distinct", type=int, default=1_000)
+    bench = sub.add_parser("analytics", help="productivity counters: per-task loop vs. NumPy columns")
+    bench.add_argument("--tasks", type=int, nargs="+", default=[100_000, 500_000])
+    args = parser.parse_args()
+
+    if args.bench == "crypto":
+        bench_crypto(args.tasks, args.workers)
+    elif args.bench == "memory":
+        bench_memory(args.tasks)
+    elif args.bench == "parsing":
+        bench_parsing(args.tasks)
+    elif args.bench == "dates":
+        bench_dates(args.count, args.distinct)
+    elif args.bench == "analytics":
+        bench_analytics(args.tasks)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,63 @@
 import os
-from cryptography.fernet import Fernet
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from cryptography.fernet import Fernet, MultiFernet
 
 KEY_FILE = "storage/key.key"
+CRYPTO_WORKERS = 0  # >1 spreads encrypt_many/decrypt_many over this many processes
+
+# Keys are cached here and shared by every encrypt/decrypt call. The key file
+# holds one key per line, newest first: the newest key encrypts, any key decrypts.
+class KeyRing:
+    def __init__(self, path=KEY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._keys = []
+        self._cipher = None
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    # Re-read the key file only when it has changed on disk
+    def _refresh(self):
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            with open(self.path, "rb") as f:
+                keys = [line.strip() for line in f.read().splitlines() if line.strip()]
+            self._cipher = MultiFernet([Fernet(k) for k in keys])
+            self._keys = keys
+            self._stamp = stamp
+
+    def cipher(self):
+        self._refresh()
+        return self._cipher
+
+    def keys(self):
+        self._refresh()
+        return list(self._keys)
+
+    def invalidate(self):
+        with self._lock:
+            self._stamp = None
+
+    # Put a fresh key in front; older keys stay so existing data still decrypts
+    def rotate(self):
+        keys = [Fernet.generate_key()] + self.keys()
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"\n".join(keys) + b"\n")
+        os.replace(tmp, self.path)
+        self.invalidate()
+        return keys[0]
+
+keyring = KeyRing()
 
 # Initialize encryption key
 def initialize_encryption():
@@ -11,19 +67,90 @@ def initialize_encryption():
         with open(KEY_FILE, "wb") as f:
             f.write(key)
 
-# Load key from file
+# Current (newest) key
 def load_key():
-    with open(KEY_FILE, "rb") as f:
-        return f.read()
+    return keyring.keys()[0]
 
 # Encrypt text data
 def encrypt_data(data):
-    key = load_key()
-    f = Fernet(key)
-    return f.encrypt(data.encode())
+    return keyring.cipher().encrypt(data.encode())
 
 # Decrypt encrypted data
 def decrypt_data(data):
-    key = load_key()
-    f = Fernet(key)
-    return f.decrypt(data).decode()
+    return keyring.cipher().decrypt(data).decode()
+
+# Encrypt / decrypt raw bytes (binary task encodings)
+def encrypt_bytes(data):
+    return keyring.cipher().encrypt(data)
+
+def decrypt_bytes(data):
+    return keyring.cipher().decrypt(data)
+
+# Re-encrypt a token under the current key without exposing its plaintext
+def rotate_token(token):
+    return keyring.cipher().rotate(token)
+
+# Add a new key, then run `reencrypt` (which rewrites the stored data under
+# the new key) on a background thread. Returns that thread, or None.
+def rotate_key(reencrypt=None):
+    keyring.rotate()
+    if reencrypt is None:
+        return None
+    worker = threading.Thread(target=reencrypt, daemon=True)
+    worker.start()
+    return worker
+
+# --- Process-pool bulk encryption (chunked stores) ---
+
+_pool = None
+_pool_config = None
+_pool_lock = threading.Lock()
+_worker_cipher = None
+
+def _init_worker(keys):
+    global _worker_cipher
+    _worker_cipher = MultiFernet([Fernet(k) for k in keys])
+
+def _encrypt_chunk(data):
+    return _worker_cipher.encrypt(data)
+
+def _decrypt_chunk(token):
+    return _worker_cipher.decrypt(token)
+
+# Pool started with the current keys; restarted after a rotation
+def _crypto_pool():
+    global _pool, _pool_config
+    keys = tuple(keyring.keys())
+    with _pool_lock:
+        if _pool is None or _pool_config != (keys, CRYPTO_WORKERS):
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=CRYPTO_WORKERS, initializer=_init_worker, initargs=(keys,))
+            _pool_config = (keys, CRYPTO_WORKERS)
+        return _pool
+
+# Ordered map over the pool with at most 2 chunks per worker in flight,
+# so a lazily produced input is never collected in full
+def _pool_map(fn, chunks):
+    pool = _crypto_pool()
+    in_flight = deque()
+    for chunk in chunks:
+        in_flight.append(pool.submit(fn, chunk))
+        if len(in_flight) >= CRYPTO_WORKERS * 2:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+# Encrypt byte chunks, yielding tokens in input order
+def encrypt_many(chunks):
+    if CRYPTO_WORKERS > 1:
+        return _pool_map(_encrypt_chunk, chunks)
+    cipher = keyring.cipher()
+    return (cipher.encrypt(chunk) for chunk in chunks)
+
+# Decrypt tokens, yielding byte chunks in input order
+def decrypt_many(tokens):
+    if CRYPTO_WORKERS > 1:
+        return _pool_map(_decrypt_chunk, tokens)
+    cipher = keyring.cipher()
+    return (cipher.decrypt(token) for token in tokens)
@@ -0,0 +1,232 @@
+# fire_index.py (next-fire-time sidecar for TaskPilot)
+#
+# INDEX_FILE holds, compressed and encrypted, every pending task whose alarm is still to go
+# off as (fire time, id), sorted by fire time, plus the ids of completed
+# recurring tasks still waiting to be rolled over. Titles are not kept; the
+# alarm looks the task up by id when it fires. Alarms more than KEEP_PAST
+# seconds old are dropped, so the index only grows with what is still ahead,
+# and "what fires next" and "what is due in the next hour" are a decrypt of
+# this file and a bisect instead of a read of every task.
+#
+# A single-task write does not rewrite the index: it appends one encrypted
+# line (store version, id, fire time, roll-over flag) to LOG_FILE, like the
+# task journal. load() replays the log on top of the snapshot, and the log is
+# folded into a new snapshot once it passes COMPACT_THRESHOLD, on a full save
+# of the store and on re-encryption.
+#
+# The index records the store version (task_manager.VERSION_FILE) it matches.
+# task_manager updates it on every write it makes; if some other writer
+# bumped the version without doing so, readers rebuild it from the store.
+
+import bisect
+import json
+import os
+import struct
+import time
+import zlib
+from datetime import datetime
+from encryption import encrypt_bytes, decrypt_bytes
+import task_times
+
+INDEX_FILE = "storage/tasks.fireindex"
+LOG_FILE = INDEX_FILE + ".log"
+COMPACT_THRESHOLD = 256 * 1024  # log size (bytes) at which it is folded into the snapshot
+KEEP_PAST = 60  # seconds an alarm stays indexed after its time (alarm_system.FIRE_WINDOW)
+MAGIC = b"TPFI2"
+HEADER = struct.Struct("<QII")  # store version, fire entries, roll-over ids
+ENTRY = struct.Struct("<qH")    # fire time, id length
+
+# Epoch seconds at which a task's alarm goes off, or None if it has no due
+# date and time. Stamped records need no date parsing (see task_times).
+def fire_time(record):
+    if "due_ts" in record:
+        due_ts = record["due_ts"]
+        return None if due_ts is None else task_times.to_epoch(due_ts)
+    if not (record.get("due") and record.get("time")):
+        return None
+    try:
+        return datetime.strptime(f"{record['due']} {record['time']}", "%Y-%m-%d %I:%M %p").timestamp()
+    except ValueError:
+        return None
+
+# What the index holds for a task: (fire time or None, waiting to roll over)
+def _placement(record):
+    if record.get("completed"):
+        return None, bool(record.get("recurring"))
+    when = fire_time(record)
+    return (None if when is None else int(when)), False
+
+class FireIndex:
+    def __init__(self, version=None):
+        self.version = version
+        self._times = []      # fire times, ascending
+        self._entries = []    # (fire time, id), in the same order
+        self._when = {}       # id -> fire time of its entry
+        self.rollover = set() # ids of completed recurring tasks
+
+    @classmethod
+    def build(cls, records, version=None):
+        index = cls(version)
+        for record in records:
+            index.track(record)
+        return index
+
+    def __len__(self):
+        return len(self._entries)
+
+    def track(self, record):
+        """Index a task as it now is (replacing what was indexed for its id); returns the record"""
+        task_id = record.get("id")
+        if task_id:
+            self.place(task_id, *_placement(record))
+        return record
+
+    def place(self, task_id, when, rollover):
+        """Index task_id with an alarm at `when` (None: none) and/or as waiting to roll over"""
+        self.discard(task_id)
+        if rollover:
+            self.rollover.add(task_id)
+        if when is not None and when >= time.time() - KEEP_PAST:
+            i = bisect.bisect_right(self._times, when)
+            self._times.insert(i, when)
+            self._entries.insert(i, (when, task_id))
+            self._when[task_id] = when
+
+    def discard(self, task_id):
+        self.rollover.discard(task_id)
+        when = self._when.pop(task_id, None)
+        if when is None:
+            return
+        i = bisect.bisect_left(self._times, when)
+        while self._entries[i][1] != task_id:
+            i += 1
+        del self._times[i]
+        del self._entries[i]
+
+    def between(self, start, end):
+        """(fire time, id) of the alarms with start <= fire time < end, in order"""
+        return self._entries[bisect.bisect_left(self._times, start):bisect.bisect_left(self._times, end)]
+
+    def next_after(self, start):
+        """The first (fire time, id) at or after `start`, or None"""
+        i = bisect.bisect_left(self._times, start)
+        return self._entries[i] if i < len(self._entries) else None
+
+    def encode(self):
+        entries = self._entries[bisect.bisect_left(self._times, time.time() - KEEP_PAST):]
+        parts = [HEADER.pack(self.version or 0, len(entries), len(self.rollover))]
+        for when, task_id in entries:
+            raw_id = task_id.encode()
+            parts += [ENTRY.pack(when, len(raw_id)), raw_id]
+        for task_id in sorted(self.rollover):
+            raw_id = task_id.encode()
+            parts += [struct.pack("<H", len(raw_id)), raw_id]
+        return MAGIC + zlib.compress(b"".join(parts), 1)
+
+    @classmethod
+    def decode(cls, data):
+        if not data.startswith(MAGIC):
+            raise ValueError("not a fire index")
+        data = zlib.decompress(data[len(MAGIC):])
+        offset = 0
+        version, entries, rollover = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+        index = cls(version)
+        for _ in range(entries):
+            when, id_length = ENTRY.unpack_from(data, offset)
+            offset += ENTRY.size
+            task_id = data[offset:offset + id_length].decode()
+            offset += id_length
+            index._times.append(when)
+            index._entries.append((when, task_id))
+            index._when[task_id] = when
+        for _ in range(rollover):
+            (id_length,) = struct.unpack_from("<H", data, offset)
+            offset += 2
+            index.rollover.add(data[offset:offset + id_length].decode())
+            offset += id_length
+        return index
+
+    # Write a new snapshot and start an empty log on top of it
+    def save(self, version):
+        self.version = version
+        os.makedirs(os.path.dirname(INDEX_FILE), exist_ok=True)
+        for path, payload in ((INDEX_FILE, encrypt_bytes(self.encode())), (LOG_FILE, _log_line([version]))):
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, path)
+
+def _log_line(entry):
+    return encrypt_bytes(json.dumps(entry).encode()) + b"\n"
+
+# The log's entries: [version] for the snapshot it starts from, then
+# [version, id, fire time, roll-over] per change. Reading stops at an
+# unreadable line (a write torn by a crash); what follows is not applied.
+def _read_log():
+    entries = []
+    try:
+        with open(LOG_FILE, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entries.append(json.loads(decrypt_bytes(line.strip())))
+                except Exception:
+                    break
+    except FileNotFoundError:
+        pass
+    return entries
+
+# The store version of the log's last entry, from its tail only; None if
+# there is no log or its last line cannot be read
+def _log_version():
+    try:
+        with open(LOG_FILE, "rb") as f:
+            f.seek(max(0, f.seek(0, os.SEEK_END) - 4096))
+            lines = f.read().split(b"\n")
+        if len(lines) < 2 or lines[-1]:
+            return None  # empty, or a torn last line: leave the rest to a rebuild
+        return json.loads(decrypt_bytes(lines[-2]))[0]
+    except Exception:
+        return None
+
+# The saved index with its log applied, or None if there is none (or it
+# cannot be read)
+def load():
+    try:
+        with open(INDEX_FILE, "rb") as f:
+            index = FireIndex.decode(decrypt_bytes(f.read()))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Could not read {INDEX_FILE} ({str(e) or type(e).__name__}); rebuilding it")
+        return None
+    for entry in _read_log():
+        if entry[0] <= index.version:
+            continue  # already in the snapshot
+        if entry[0] != index.version + 1 or len(entry) != 4:
+            break
+        index.place(*entry[1:])
+        index.version = entry[0]
+    return index
+
+# Mirror one task write that took the store from version - 1 to `version`:
+# `record` is the task as it now is, or None if task_id was deleted. An index
+# that was already behind is left alone for the next reader to rebuild.
+def record_change(version, task_id, record):
+    if _log_version() != version - 1:
+        return
+    when, rollover = (None, False) if record is None else _placement(record)
+    with open(LOG_FILE, "ab") as f:
+        f.write(_log_line([version, task_id, when, rollover]))
+        size = f.tell()
+    if size >= COMPACT_THRESHOLD:
+        index = load()
+        if index is not None and index.version == version:
+            index.save(version)
+
+def reencrypt():
+    index = load()
+    if index is not None:
+        index.save(index.version)
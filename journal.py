@@ -0,0 +1,85 @@
+# journal.py (append-only encrypted mutation log for TaskPilot storage)
+
+import json
+import os
+from encryption import encrypt_data, decrypt_data
+from filelock import store_lock
+
+JOURNAL_FILE = "storage/tasks.journal"
+COMPACT_THRESHOLD = 256 * 1024  # journal size (bytes) that triggers a background compaction
+
+# Guards every write to the journal and to the snapshot it is replayed on top
+# of, across threads and processes
+lock = store_lock
+
+# Append one mutation record: {"op": "add"|"update"|"delete", ...}
+# Each record is its own Fernet token on its own line, so an append never
+# touches the rest of the store. Returns the journal size after the write.
+def append(op):
+    line = encrypt_data(json.dumps(op)) + b"\n"
+    with lock:
+        os.makedirs(os.path.dirname(JOURNAL_FILE), exist_ok=True)
+        with open(JOURNAL_FILE, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+def size():
+    try:
+        return os.path.getsize(JOURNAL_FILE)
+    except OSError:
+        return 0
+
+# Read and decrypt the records starting at byte offset `start`.
+# Returns (ops, end_offset). A record that fails to decrypt (e.g. a write
+# torn by a crash) is skipped instead of discarding the whole journal.
+def read_ops(start=0):
+    if not os.path.exists(JOURNAL_FILE):
+        return [], 0
+    ops = []
+    end = start
+    with lock, open(JOURNAL_FILE, "rb") as f:
+        f.seek(start)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # partial trailing write, leave it for the next reader
+            end += len(line)
+            try:
+                ops.append(json.loads(decrypt_data(line.strip())))
+            except Exception:
+                print("⚠️ Skipping unreadable journal record.")
+    return ops, end
+
+# Apply journal records, in order, on top of a list of task dicts
+def replay(records, ops):
+    for op in ops:
+        kind = op.get("op")
+        try:
+            if kind == "add":
+                records.append(op["task"])
+            elif kind == "update":
+                records[op["index"]].update(op["fields"])
+            elif kind == "delete":
+                records.pop(op["index"])
+        except (IndexError, KeyError):
+            print(f"⚠️ Ignoring journal record that no longer applies: {kind}")
+    return records
+
+def clear():
+    with lock:
+        if os.path.exists(JOURNAL_FILE):
+            os.remove(JOURNAL_FILE)
+
+# Drop everything before `offset`, keeping records appended after it
+def truncate_before(offset):
+    with lock:
+        if not os.path.exists(JOURNAL_FILE):
+            return
+        with open(JOURNAL_FILE, "rb") as f:
+            f.seek(offset)
+            tail = f.read()
+        tmp = JOURNAL_FILE + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(tail)
+        os.replace(tmp, JOURNAL_FILE)
@@ -0,0 +1,140 @@
+# latency.py (completion-latency sketches for TaskPilot)
+#
+# A Sketch summarises durations in seconds with counts in log-spaced
+# buckets, each spanning values within RELATIVE_ERROR of one another, so a
+# quantile read from it is within 1% of the true value while the sketch stays
+# at most a few thousand counters however many values went in. Sketches
+# merge by adding counts and take values back out by subtracting them, which
+# lets task_stats keep one per completion day and add up the days of any
+# range.
+#
+# Two durations are measured for each completed task (see measures()):
+#   latency - completed_at minus created_at: the time to complete
+#   overdue - completed_at minus the due time (due_ts, or the end of the due
+#             day for tasks without a time); negative when finished early
+
+import bisect
+import math
+import task_times
+
+RELATIVE_ERROR = 0.01
+GAMMA = (1 + RELATIVE_ERROR) / (1 - RELATIVE_ERROR)
+MAX_SECONDS = 100 * 366 * task_times.DAY  # longer durations share the last bucket
+# Bucket i holds magnitudes in (BOUNDS[i - 1], BOUNDS[i]]; bucket 0 holds 1 s
+BOUNDS = [GAMMA ** i for i in range(math.ceil(math.log(MAX_SECONDS, GAMMA)) + 1)]
+METRICS = ("latency", "overdue")
+PERCENTILES = (50, 90, 99)
+
+def bucket(magnitude):
+    """Bucket of a duration's magnitude in seconds (at least 1)"""
+    return min(bisect.bisect_left(BOUNDS, magnitude), len(BOUNDS) - 1)
+
+def bucket_value(i):
+    """The magnitude a bucket stands for, within RELATIVE_ERROR of any value in it"""
+    return 1.0 if i == 0 else 2 * BOUNDS[i] / (1 + GAMMA)
+
+def _bump(counts, key, count):
+    total = counts.get(key, 0) + count
+    if total:
+        counts[key] = total
+    else:
+        del counts[key]
+
+class Sketch:
+    __slots__ = ("zero", "positive", "negative")
+
+    def __init__(self):
+        self.zero = 0       # values under a second either way
+        self.positive = {}  # bucket -> count
+        self.negative = {}  # bucket of the magnitude -> count
+
+    def add(self, seconds, count=1):
+        """Count a duration in (count > 0) or take it back out (count < 0)"""
+        if -1 < seconds < 1:
+            self.zero += count
+        else:
+            _bump(self.positive if seconds > 0 else self.negative, bucket(abs(seconds)), count)
+
+    def merge(self, other):
+        """Add another sketch's counts to this one; returns self"""
+        self.zero += other.zero
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for i, count in theirs.items():
+                _bump(mine, i, count)
+        return self
+
+    def __len__(self):
+        return self.zero + sum(self.positive.values()) + sum(self.negative.values())
+
+    def late(self):
+        """How many of the durations are positive"""
+        return sum(self.positive.values())
+
+    def quantile(self, q):
+        """Duration at quantile q (0 to 1), or None for an empty sketch"""
+        count = len(self)
+        if not count:
+            return None
+        rank = q * (count - 1)
+        seen = 0
+        for i in sorted(self.negative, reverse=True):
+            seen += self.negative[i]
+            if seen > rank:
+                return -bucket_value(i)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for i in sorted(self.positive):
+            seen += self.positive[i]
+            if seen > rank:
+                return bucket_value(i)
+        return bucket_value(max(self.positive)) if self.positive else 0.0
+
+    def percentiles(self, percentiles=PERCENTILES):
+        return {p: self.quantile(p / 100) for p in percentiles}
+
+    def to_json(self):
+        return [self.zero, self.positive, self.negative]
+
+    @classmethod
+    def from_json(cls, data):
+        sketch = cls()
+        sketch.zero = data[0]
+        sketch.positive = {int(i): count for i, count in data[1].items()}
+        sketch.negative = {int(i): count for i, count in data[2].items()}
+        return sketch
+
+# (completion day, {metric: seconds}) for a completed task that records when
+# it was completed, else None. Times are wall-clock integers (task_times).
+def measures(record):
+    if record.get("completed") is not True:
+        return None
+    finished = task_times.parse_moment(record.get("completed_at"))
+    if finished is None:
+        return None
+    values = {}
+    created = task_times.parse_moment(record.get("created_at"))
+    if created is not None:
+        values["latency"] = finished - created
+    if record.get("due_ts") is not None:
+        values["overdue"] = finished - record["due_ts"]
+    elif record.get("due_day") is not None:
+        values["overdue"] = finished - (record["due_day"] + 1) * task_times.DAY
+    return finished // task_times.DAY, values
+
+def format_duration(seconds):
+    """A duration for display, e.g. '3d 4h', '2h 15m', '40m', '-1h 5m'"""
+    if seconds is None:
+        return "-"
+    sign = "-" if seconds < 0 else ""
+    seconds = round(abs(seconds))
+    days, rest = divmod(seconds, task_times.DAY)
+    hours, rest = divmod(rest, 3600)
+    minutes = rest // 60
+    if days:
+        return f"{sign}{days}d {hours}h"
+    if hours:
+        return f"{sign}{hours}h {minutes}m"
+    if minutes:
+        return f"{sign}{minutes}m"
+    return f"{sign}{seconds}s"
@@ -1,5 +1,5 @@
-from task_manager import add_task, list_tasks, complete_task, delete_task
-from reports import show_productivity_report
+from task_manager import add_task, list_tasks, complete_task, delete_task, rotate_encryption_key, parse_task_datetime
+from reports import show_productivity_report, show_range_report, show_trend_report, show_latency_report
 from alarm_system import alarm_system
 from encryption import initialize_encryption
 import threading
@@ -14,7 +14,8 @@ def show_menu():
         print("4. Delete Task")
         print("5. Category view")
         print("6. Productivity Report")
-        print("7. Exit")
+        print("7. Rotate Encryption Key")
+        print("8. Exit")
 
         choice = input("👉 Choose: ").strip()
 
@@ -30,9 +31,25 @@ def show_menu():
             cat = input("Enter category: ")
             list_tasks(filter_category=cat)
         elif choice == '6':
-            p = input("Type (daily/weekly): ").strip().lower()
-            show_productivity_report(period=p)
+            p = input("Type (daily/weekly/monthly/range/trend/latency): ").strip().lower()
+            if p in ("range", "latency"):
+                try:
+                    date_from = parse_task_datetime(input("From date: ").strip())
+                    date_to = parse_task_datetime(input("To date: ").strip())
+                except ValueError as e:
+                    print(e)
+                    continue
+                (show_range_report if p == "range" else show_latency_report)(date_from, date_to)
+            elif p == "trend":
+                days = input("Days to show (default 30): ").strip()
+                cat = input("Category (blank for all): ").strip() or None
+                show_trend_report(int(days) if days.isdigit() and int(days) > 0 else 30, cat)
+            else:
+                show_productivity_report(period=p)
         elif choice == '7':
+            rotate_encryption_key()
+            print("🔑 New key in use. Existing tasks are being re-encrypted in the background.")
+        elif choice == '8':
             print("👋 Thankyou for using TaskPilot.")
             break
         else:
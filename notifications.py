@@ -0,0 +1,178 @@
+# notifications.py (non-blocking alarm notifications for TaskPilot)
+#
+# Alarms are handed to a Dispatcher with submit(), which only puts them on a
+# bounded queue. A collector thread takes what has arrived within
+# COALESCE_WINDOW and turns everything due in the same minute into a single
+# notification ("3 tasks due now: ..."). A small pool of worker threads then
+# delivers them through a backend, so a slow backend never holds up the
+# alarm scheduler.
+#
+# If the backend falls behind, new alarms wait in the queue and come out as
+# larger summaries; if the queue itself is full, they are dropped and
+# counted. Lateness (delivery time minus due time) is recorded per alarm;
+# see Dispatcher.stats().
+#
+# Backends have one method, send(title, message):
+#   DesktopBackend - plyer desktop notification (and a bell on Windows)
+#   StdoutBackend  - one line on stdout, for headless servers and tests
+#   LogBackend     - the "taskpilot.alarms" logger
+
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from plyer import notification
+except ImportError:
+    notification = None
+
+BACKEND = "auto"         # "auto", "desktop", "stdout" or "log"
+WORKERS = 2              # backend calls running at once
+QUEUE_SIZE = 1000        # alarms waiting to be grouped; beyond this they are dropped
+COALESCE_WINDOW = 0.25   # seconds to wait for more alarms before sending
+MAX_LISTED = 5           # titles spelled out in a summary
+LATENESS_SAMPLES = 1000  # recent lateness values kept for stats()
+
+class DesktopBackend:
+    def send(self, title, message):
+        print(f"\n🔔 ALARM: {message}")
+        notification.notify(title=title, message=message, timeout=10)
+        if os.name == 'nt':
+            os.system('echo \a')
+
+class StdoutBackend:
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def send(self, title, message):
+        print(f"🔔 {title}: {message}", file=self.stream or sys.stdout, flush=True)
+
+class LogBackend:
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger("taskpilot.alarms")
+
+    def send(self, title, message):
+        self.logger.info("%s: %s", title, message)
+
+def make_backend(name=None):
+    name = name or BACKEND
+    if name == "auto":
+        has_display = os.name == "nt" or sys.platform == "darwin" or \
+            os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")
+        name = "desktop" if notification and has_display else "stdout"
+    if name == "desktop":
+        return DesktopBackend()
+    if name == "log":
+        return LogBackend()
+    return StdoutBackend()
+
+def summarize(titles):
+    if len(titles) == 1:
+        return "Task Reminder", f"{titles[0]} is due now!"
+    listed = ", ".join(titles[:MAX_LISTED])
+    if len(titles) > MAX_LISTED:
+        listed += f" and {len(titles) - MAX_LISTED} more"
+    return f"{len(titles)} tasks due now", listed
+
+class Dispatcher:
+    def __init__(self, backend=None, workers=WORKERS, queue_size=QUEUE_SIZE,
+                 coalesce_window=COALESCE_WINDOW):
+        self.backend = backend or make_backend()
+        self.coalesce_window = coalesce_window
+        self._queue = queue.Queue(queue_size)
+        self._slots = threading.BoundedSemaphore(workers)
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="taskpilot-notify")
+        self._lock = threading.Lock()
+        self._lateness = deque(maxlen=LATENESS_SAMPLES)
+        self.sent = 0
+        self.dropped = 0
+        self.notifications = 0
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def submit(self, title, due):
+        """Queue an alarm for `title`, due at `due` (epoch seconds); never blocks"""
+        try:
+            self._queue.put_nowait((title, due))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _collect(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.coalesce_window
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    # past the window, still take whatever is already waiting
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._dispatch(batch)
+                    return
+                batch.append(item)
+            self._dispatch(batch)
+
+    # One notification per due minute. Waiting for a free worker here is what
+    # makes a backlog pile up in the queue and come out coalesced.
+    def _dispatch(self, batch):
+        groups = {}
+        for title, due in batch:
+            groups.setdefault(int(due // 60), []).append((title, due))
+        for minute in sorted(groups):
+            self._slots.acquire()
+            self._pool.submit(self._send, groups[minute])
+
+    def _send(self, group):
+        try:
+            self.backend.send(*summarize([title for title, _ in group]))
+        except Exception as e:
+            print(f"⚠️ Notification failed: {e}")
+        finally:
+            self._slots.release()
+        done = time.time()
+        with self._lock:
+            self.sent += len(group)
+            self.notifications += 1
+            self._lateness.extend(done - due for _, due in group)
+
+    def stats(self):
+        """Counters plus lateness (seconds from due time to delivery) over recent alarms"""
+        with self._lock:
+            lateness = sorted(self._lateness)
+            stats = {"sent": self.sent, "notifications": self.notifications,
+                     "dropped": self.dropped, "queued": self._queue.qsize()}
+        if lateness:
+            stats.update(lateness_mean=sum(lateness) / len(lateness),
+                         lateness_p95=lateness[min(len(lateness) - 1, int(len(lateness) * 0.95))],
+                         lateness_max=lateness[-1])
+        return stats
+
+    def close(self):
+        """Deliver what is queued, then stop"""
+        self._queue.put(None)
+        self._collector.join()
+        self._pool.shutdown(wait=True)
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def dispatcher():
+    """The process-wide Dispatcher, created on first use"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = Dispatcher()
+        return _dispatcher
@@ -0,0 +1,190 @@
+# record_store.py (record-level encrypted task container for TaskPilot)
+#
+# DATA_FILE holds one Fernet token per task, back to back. INDEX_FILE maps task
+# positions to tokens: a magic header followed by one fixed-size entry per task
+# (offset, length, flags), so any task can be read, rewritten or skipped
+# without decrypting the others.
+#
+# An update appends the new token and patches a single index entry; the old
+# token becomes garbage that compact() reclaims once it outweighs live data.
+
+import json
+import os
+import struct
+from encryption import encrypt_data, decrypt_data, rotate_token
+from filelock import store_lock
+
+DATA_FILE = "storage/tasks.rec"
+INDEX_FILE = "storage/tasks.idx"
+QUARANTINE_FILE = "storage/tasks.rec.corrupt"
+
+MAGIC = b"TPX1"
+ENTRY = struct.Struct("<QIB")  # offset, length, flags
+FLAG_COMPLETED = 0x01
+
+lock = store_lock
+
+def _flags(record):
+    return FLAG_COMPLETED if record.get("completed") else 0
+
+def _read_index():
+    if not os.path.exists(INDEX_FILE):
+        return []
+    with open(INDEX_FILE, "rb") as f:
+        raw = f.read()
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ValueError("unrecognised task index")
+    body = memoryview(raw)[len(MAGIC):]
+    return [ENTRY.unpack_from(body, i) for i in range(0, len(body) - len(body) % ENTRY.size, ENTRY.size)]
+
+def _write_index(entries):
+    tmp = INDEX_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(b"".join(ENTRY.pack(*e) for e in entries))
+    os.replace(tmp, INDEX_FILE)
+
+def _patch_index(position, entry):
+    with open(INDEX_FILE, "r+b") as f:
+        f.seek(len(MAGIC) + position * ENTRY.size)
+        f.write(ENTRY.pack(*entry))
+
+def _append_token(token):
+    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
+    with open(DATA_FILE, "ab") as f:
+        offset = f.seek(0, os.SEEK_END)
+        f.write(token)
+        f.flush()
+        os.fsync(f.fileno())
+    return offset
+
+# Move unreadable records out of the index so positions stay consistent,
+# keeping their ciphertext in QUARANTINE_FILE for manual recovery.
+def _quarantine(entries, bad_positions, data):
+    print(f"⚠️ {len(bad_positions)} unreadable task record(s) moved to {QUARANTINE_FILE}.")
+    with open(QUARANTINE_FILE, "ab") as q:
+        for i in bad_positions:
+            offset, length, _ = entries[i]
+            data.seek(offset)
+            q.write(data.read(length) + b"\n")
+    bad = set(bad_positions)
+    _write_index([e for i, e in enumerate(entries) if i not in bad])
+
+# Yield (position, record) for every task, or only for tasks not marked
+# completed; completed records are skipped without being decrypted.
+def iter_records(pending_only=False):
+    with lock:
+        entries = _read_index()
+        if not entries:
+            return
+        results, bad = [], []
+        with open(DATA_FILE, "rb") as data:
+            for i, (offset, length, flags) in enumerate(entries):
+                if pending_only and flags & FLAG_COMPLETED:
+                    continue
+                data.seek(offset)
+                try:
+                    results.append((i, json.loads(decrypt_data(data.read(length)))))
+                except Exception:
+                    bad.append(i)
+            if bad:
+                _quarantine(entries, bad, data)
+    if bad:
+        # positions after a quarantined record have shifted; read again
+        yield from iter_records(pending_only)
+        return
+    yield from results
+
+def load_records():
+    return [record for _, record in iter_records()]
+
+def read_record(position):
+    with lock:
+        offset, length, _ = _read_index()[position]
+        with open(DATA_FILE, "rb") as data:
+            data.seek(offset)
+            return json.loads(decrypt_data(data.read(length)))
+
+def save_records(records):
+    with lock:
+        os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
+        entries = []
+        tmp = DATA_FILE + ".tmp"
+        with open(tmp, "wb") as f:
+            for record in records:
+                token = encrypt_data(json.dumps(record))
+                entries.append((f.tell(), len(token), _flags(record)))
+                f.write(token)
+        os.replace(tmp, DATA_FILE)
+        _write_index(entries)
+
+# Rewrite DATA_FILE with only the live tokens; nothing is re-encrypted
+def compact():
+    with lock:
+        entries = _read_index()
+        if not entries:
+            return
+        compacted = []
+        tmp = DATA_FILE + ".tmp"
+        with open(DATA_FILE, "rb") as src, open(tmp, "wb") as dst:
+            for offset, length, flags in entries:
+                src.seek(offset)
+                compacted.append((dst.tell(), length, flags))
+                dst.write(src.read(length))
+        os.replace(tmp, DATA_FILE)
+        _write_index(compacted)
+
+# Re-encrypt every record under the current key (after a key rotation)
+def reencrypt():
+    with lock:
+        entries = _read_index()
+        if not entries:
+            return
+        rotated = []
+        tmp = DATA_FILE + ".tmp"
+        with open(DATA_FILE, "rb") as src, open(tmp, "wb") as dst:
+            for offset, length, flags in entries:
+                src.seek(offset)
+                token = rotate_token(src.read(length))
+                rotated.append((dst.tell(), len(token), flags))
+                dst.write(token)
+        os.replace(tmp, DATA_FILE)
+        _write_index(rotated)
+
+def _garbage_ratio(entries):
+    live = sum(length for _, length, _ in entries)
+    total = os.path.getsize(DATA_FILE) if os.path.exists(DATA_FILE) else 0
+    return (total - live) / total if total else 0
+
+# Apply one journal-style mutation ({"op": "add"|"update"|"delete", ...}),
+# touching only the record involved
+def apply(op):
+    with lock:
+        kind = op["op"]
+        if kind == "add":
+            token = encrypt_data(json.dumps(op["task"]))
+            entry = (_append_token(token), len(token), _flags(op["task"]))
+            if not os.path.exists(INDEX_FILE):
+                _write_index([entry])
+            else:
+                with open(INDEX_FILE, "ab") as f:
+                    f.write(ENTRY.pack(*entry))
+            return
+        entries = _read_index()
+        position = op["index"]
+        if not 0 <= position < len(entries):
+            raise IndexError(position)
+        if kind == "update":
+            offset, length, _ = entries[position]
+            with open(DATA_FILE, "rb") as data:
+                data.seek(offset)
+                record = json.loads(decrypt_data(data.read(length)))
+            record.update(op["fields"])
+            token = encrypt_data(json.dumps(record))
+            entries[position] = (_append_token(token), len(token), _flags(record))
+            _patch_index(position, entries[position])
+        elif kind == "delete":
+            del entries[position]
+            _write_index(entries)
+        if _garbage_ratio(entries) > 0.5:
+            compact()
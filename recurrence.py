@@ -0,0 +1,277 @@
+# recurrence.py (recurring task schedules for TaskPilot)
+#
+# A task's "recurring" field holds a rule. The plain names used so far still
+# work ("daily", "weekly", "monthly", and now "yearly"); options can follow
+# after semicolons:
+#
+#   weekly;interval=2;byday=MO,WE;until=2026-12-31
+#   daily;byday=MO,TU,WE,TH,FR
+#   monthly;interval=3
+#
+#   interval - every n-th day/week/month/year (default 1)
+#   byday    - only these weekdays (daily and weekly rules)
+#   until    - last possible date, inclusive
+#   start    - first date of the series (see below)
+#
+# Occurrences are anchored at the task's due date (and time). Monthly and
+# yearly rules keep the anchor's day of the month; in shorter months they
+# fall on the last day instead (Jan 31 -> Feb 28 -> Mar 31, Feb 29 -> Feb 28).
+# Moving such a task on rewrites its due date, so advance() pins the series
+# start in the rule and the anchor stays Jan 31 rather than becoming Feb 28.
+# A start the due date is no longer an occurrence of (the due date was
+# edited) is ignored and the series is anchored at the due date again.
+#
+# advance() also keeps the occurrence it moves past in the task's "history"
+# (its due stamps and when it was created and completed) if it was completed,
+# so completions of recurring tasks stay counted in task_stats after the task
+# has moved on. Occurrences left undone (an alarm rolling the task forward)
+# are not kept, and history only goes back HISTORY_DAYS, the streaks and
+# completion times the dashboard reads; older completions drop out of the
+# counters when the task next moves on.
+#
+# occurrences() is a generator. Given `after`, it computes the first
+# occurrence past it directly from the calendar instead of stepping through
+# every missed period, so a task that is years overdue costs the same as one
+# that is a day overdue.
+
+import calendar
+from datetime import date, datetime, timedelta
+import task_times
+
+FREQUENCIES = ("daily", "weekly", "monthly", "yearly")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+ONE_DAY = timedelta(days=1)
+HISTORY_DAYS = 90  # days of completed occurrences a recurring task keeps in its history
+
+class Rule:
+    __slots__ = ("freq", "interval", "byday", "until", "start")
+
+    def __init__(self, freq, interval=1, byday=(), until=None, start=None):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency '{freq}'. Use one of: {', '.join(FREQUENCIES)}")
+        if interval < 1:
+            raise ValueError("The interval must be at least 1.")
+        if byday and freq not in ("daily", "weekly"):
+            raise ValueError("byday only applies to daily and weekly rules.")
+        if byday and freq == "daily" and interval % 7 == 0:
+            # every n-th day then always lands on the anchor's weekday, so byday
+            # either repeats it or never matches
+            raise ValueError("A daily rule with byday needs an interval that is not a multiple of 7; "
+                             "use a weekly rule instead.")
+        self.freq = freq
+        self.interval = interval
+        self.byday = tuple(sorted(set(byday)))
+        self.until = until
+        self.start = start
+
+    @classmethod
+    def parse(cls, text):
+        """Rule from its text form; raises ValueError if it is not a valid rule"""
+        freq, *options = [part.strip() for part in text.strip().lower().split(";")]
+        kwargs = {}
+        for option in filter(None, options):
+            name, _, value = option.partition("=")
+            name = name.strip()
+            value = value.strip()
+            if name == "interval" and value.isdigit():
+                kwargs["interval"] = int(value)
+            elif name == "byday" and value:
+                try:
+                    kwargs["byday"] = [WEEKDAYS.index(day.strip().upper()) for day in value.split(",")]
+                except ValueError:
+                    raise ValueError(f"Unknown weekday in '{value}'. Use {', '.join(WEEKDAYS)}.") from None
+            elif name in ("until", "start"):
+                kwargs[name] = datetime.strptime(value, "%Y-%m-%d").date()
+            else:
+                raise ValueError(f"Unknown recurrence option '{option}'.")
+        return cls(freq, **kwargs)
+
+    def __str__(self):
+        parts = [self.freq]
+        if self.interval != 1:
+            parts.append(f"interval={self.interval}")
+        if self.byday:
+            parts.append("byday=" + ",".join(WEEKDAYS[day] for day in self.byday))
+        if self.until:
+            parts.append(f"until={self.until.isoformat()}")
+        if self.start:
+            parts.append(f"start={self.start.isoformat()}")
+        return ";".join(parts)
+
+    def __repr__(self):
+        return f"Rule('{self}')"
+
+    def __eq__(self, other):
+        return isinstance(other, Rule) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def describe(self):
+        """Human-readable form, e.g. 'Every 2 weeks on Mon, Wed until 2026-12-31'"""
+        unit = {"daily": "day", "weekly": "week", "monthly": "month", "yearly": "year"}[self.freq]
+        text = self.freq.title() if self.interval == 1 else f"Every {self.interval} {unit}s"
+        if self.byday:
+            text += " on " + ", ".join(calendar.day_abbr[day] for day in self.byday)
+        if self.until:
+            text += f" until {self.until.isoformat()}"
+        return text
+
+    # First occurrence on or after `day` of the series starting at `start`,
+    # or None if the series has ended by then. Never loops over periods.
+    def first_on_or_after(self, start, day):
+        day = max(day, start)
+        n = self.interval
+        if self.freq == "daily":
+            k = -(-(day - start).days // n)
+            found = None
+            for _ in range(7):  # k*n days moves through all reachable weekdays within 7 steps
+                candidate = start + timedelta(days=k * n)
+                if not self.byday or candidate.weekday() in self.byday:
+                    found = candidate
+                    break
+                k += 1
+        elif self.freq == "weekly":
+            weekdays = self.byday or (start.weekday(),)
+            week0 = start - timedelta(days=start.weekday())  # Monday of the anchor week
+            week = (day - week0).days // 7
+            week += -week % n
+            found = None
+            for _ in range(2):
+                monday = week0 + timedelta(weeks=week)
+                found = next((monday + timedelta(days=wd) for wd in weekdays
+                              if monday + timedelta(days=wd) >= day), None)
+                if found:
+                    break
+                week += n
+        else:
+            step = n * (12 if self.freq == "yearly" else 1)
+            month0 = start.year * 12 + start.month - 1
+            k = max(0, -(-(day.year * 12 + day.month - 1 - month0) // step))
+            found = _month_day(month0 + k * step, start.day)
+            if found < day:
+                found = _month_day(month0 + (k + 1) * step, start.day)
+        if found is None or (self.until and found > self.until):
+            return None
+        return found
+
+# The date `day_of_month` of month number `month` (year * 12 + month - 1),
+# moved back to the last day of a shorter month
+def _month_day(month, day_of_month):
+    year, month = divmod(month, 12)
+    return date(year, month + 1, min(day_of_month, calendar.monthrange(year, month + 1)[1]))
+
+def rule_for(recurring):
+    """Rule of a task's "recurring" value, or None if it has no valid rule"""
+    if isinstance(recurring, Rule):
+        return recurring
+    if not recurring or not isinstance(recurring, str):
+        return None
+    try:
+        return Rule.parse(recurring)
+    except ValueError:
+        return None
+
+def occurrences(rule, start, after=None):
+    """Occurrences of `rule` anchored at `start`, in order, one at a time.
+
+    `start` is a date or a datetime and the occurrences are of the same
+    kind, keeping its time of day. With `after` (of the same kind) only
+    occurrences strictly later than it are produced.
+    """
+    rule = rule_for(rule)
+    if rule is None:
+        return
+    timed = isinstance(start, datetime)
+    start_day = start.date() if timed else start
+    day = start_day
+    if after is not None:
+        day = max(day, after.date() if timed else after)
+    day = rule.first_on_or_after(start_day, day)
+    while day is not None:
+        occurrence = datetime.combine(day, start.time()) if timed else day
+        if after is None or occurrence > after:
+            yield occurrence
+        day = rule.first_on_or_after(start_day, day + ONE_DAY)
+
+def next_occurrence(rule, start, after):
+    """First occurrence strictly after `after`, or None once the series has ended"""
+    return next(occurrences(rule, start, after), None)
+
+def occurrences_between(rule, start, first, last):
+    """Occurrences from `first` to `last` inclusive (dates or datetimes, like `start`)"""
+    before = first - (timedelta(microseconds=1) if isinstance(first, datetime) else ONE_DAY)
+    for occurrence in occurrences(rule, start, before):
+        if occurrence > last:
+            return
+        yield occurrence
+
+# A task record's current due date: a datetime if the task has a time and a
+# date otherwise; None without a usable due date
+def _task_due(record):
+    if not record.get("due"):
+        return None
+    if "due_ts" in record:  # stamped records (task_times) need no parsing
+        if record["due_ts"] is not None:
+            return task_times.to_datetime(record["due_ts"])
+        if record.get("due_day") is not None:
+            return task_times.to_date(record["due_day"])
+        return None
+    try:
+        if record.get("time"):
+            return datetime.strptime(f"{record['due']} {record['time']}", "%Y-%m-%d %I:%M %p")
+        return datetime.strptime(record["due"], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+# The schedule of a task record: (rule, anchor) where the anchor is the
+# rule's pinned start if the due date is one of its occurrences and the due
+# date otherwise, with the due time if the task has one; None if the task
+# does not recur or has no usable due date
+def task_schedule(record):
+    rule = rule_for(record.get("recurring"))
+    due = _task_due(record) if rule else None
+    if due is None:
+        return None
+    if rule.start:
+        day = due.date() if isinstance(due, datetime) else due
+        if rule.start <= day and rule.first_on_or_after(rule.start, day) == day:
+            return rule, datetime.combine(rule.start, due.time()) if isinstance(due, datetime) else rule.start
+    return rule, due
+
+def next_due(record, after):
+    """Due date string of a recurring task's first occurrence later than both
+    its current due date and `after` (a datetime); None if it does not recur
+    or its series has ended"""
+    schedule = task_schedule(record)
+    if schedule is None:
+        return None
+    rule, start = schedule
+    due = _task_due(record)
+    if not isinstance(start, datetime):
+        after = after.date()
+    occurrence = next_occurrence(rule, start, max(due, after))
+    return occurrence.strftime("%Y-%m-%d") if occurrence else None
+
+def advance(record, after):
+    """The fields that move a recurring task on to its next occurrence later
+    than both its due date and `after` (see next_due): the new due date, for
+    monthly and yearly rules the rule with the series start pinned, and the
+    current occurrence added to its history if it was completed; the next
+    occurrence opens now. None if it does not recur or its series has ended."""
+    due = next_due(record, after)
+    if due is None:
+        return None
+    rule, start = task_schedule(record)
+    if rule.freq in ("monthly", "yearly"):
+        start = start.date() if isinstance(start, datetime) else start
+        rule = Rule(rule.freq, rule.interval, rule.byday, rule.until, start)
+    history = list(record.get("history") or ())
+    if record.get("completed") is True:
+        due_day, due_ts = task_times.stamps(record.get("due"), record.get("time"))
+        history.append({"due_day": due_day, "due_ts": due_ts, "completed": True,
+                        "created_at": record.get("created_at"), "completed_at": record.get("completed_at")})
+    first = task_times.today() - HISTORY_DAYS + 1
+    history = [past for past in history if past.get("due_day") is not None and past["due_day"] >= first]
+    return {"due": due, "recurring": str(rule), "history": history,
+            "completed": False, "created_at": task_times.now_moment(), "completed_at": None}
@@ -1,25 +1,130 @@
-from task_manager import load_tasks
-from datetime import datetime
+from task_manager import productivity_stats
+from recurrence import occurrences_between
+import task_times
+from task_stats import ALL
+from latency import Sketch, PERCENTILES, format_duration
+from datetime import datetime, timedelta
 
+TREND_WINDOWS = (7, 30)  # days summed into each point of a trend line
+
+# Due-date bounds (inclusive) covered by each report period
+def report_window(period, today):
+    if period == "daily":
+        return today, today
+    if period == "weekly":
+        return today - timedelta(days=7), None
+    if period == "monthly":
+        next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return today.replace(day=1), next_month - timedelta(days=1)
+    return None, None
+
+# How many times recurring tasks come up between two dates (inclusive),
+# counted from each task's current due date on; tasks sharing a schedule are
+# expanded once
+def recurring_occurrences(first, last, stats=None):
+    stats = stats or productivity_stats()
+    count = 0
+    for day, rule, tasks in stats.schedules():
+        start = task_times.to_date(day)
+        count += tasks * sum(1 for _ in occurrences_between(rule, start, first, last))
+    return count
+
+# Summed from the per-day counters (task_stats), so the cost grows with the
+# days in the period rather than with the number of tasks
 def show_productivity_report(period="daily"):
-    tasks = load_tasks()
     today = datetime.today().date()
-    
-    completed = 0
-    total = 0
-    for task in tasks:
-        if not task.due:
-            continue
-        try:
-            task_date = datetime.strptime(task.due, "%Y-%m-%d").date()
-            if (period == "daily" and task_date == today) or \
-               (period == "weekly" and (today - task_date).days <= 7) or \
-                (period == "monthly" and task_date.month == today.month and task_date.year == today.year):
-                total += 1
-                if task.completed:
-                    completed += 1
-        except:
-            continue
-    
+    due_from, due_to = report_window(period, today)
+    stats = productivity_stats()
+    first, last = (task_times.parse_day(d) if d else None for d in (due_from, due_to))
+    total, completed = stats.totals(first, last) if first is not None or last is not None else (0, 0)
+
     print(f"\n📈 {period.capitalize()} Productivity Report")
     print(f"Completed: {completed}/{total} tasks ({(completed/total)*100 if total else 0:.2f}%)")
+    if period in ("daily", "weekly", "monthly"):
+        print(f"🔁 Recurring occurrences this period: {recurring_occurrences(due_from, due_to or today, stats)}")
+
+def _rate(total, completed):
+    return f"{completed}/{total} ({completed / total * 100:.1f}%)" if total else "no tasks"
+
+# Tasks due between two dates (inclusive), with the category breakdown and
+# streaks for the range
+def show_range_report(due_from, due_to):
+    if due_to < due_from:
+        print("❗ The end date is before the start date.")
+        return
+    first, last = task_times.parse_day(due_from), task_times.parse_day(due_to)
+    stats = productivity_stats(first)
+    total, completed = stats.totals(first, last)
+
+    print(f"\n📈 Productivity Report {due_from} to {due_to}")
+    print(f"Completed: {_rate(total, completed)}")
+    for category, (t, c) in sorted(stats.breakdown("category", first, last).items()):
+        print(f"   📂 {category}: {_rate(t, c)}")
+    current, longest = stats.streaks(first, last)
+    print(f"🔥 Streak at {due_to}: {current} day(s), longest in range: {longest} day(s)")
+    print(f"🔁 Recurring occurrences: {recurring_occurrences(due_from, due_to, stats)}")
+
+# Rolling 7- and 30-day completion rates over the last `days` days (one line
+# a day, or a week for long ranges), per-category trends and streaks
+def show_trend_report(days=30, category=None):
+    today = task_times.today()
+    first = today - days + 1
+    stats = productivity_stats(first - max(TREND_WINDOWS) + 1)
+    key = f"category:{category}" if category else ALL
+    lines = [stats.rolling(first, today, window, key) for window in TREND_WINDOWS]
+    step = 1 if days <= 31 else 7
+
+    print(f"\n📈 {days}-Day Trend{f' for {category}' if category else ''}")
+    print(f"{'Day':<12}" + "".join(f"{f'{window}-day':>20}" for window in TREND_WINDOWS))
+    for i in range((days - 1) % step, days, step):
+        day = lines[0][i][0]
+        print(f"{task_times.to_date(day).isoformat():<12}" +
+              "".join(f"{_rate(line[i][1], line[i][2]):>20}" for line in lines))
+
+    if not category:
+        window = TREND_WINDOWS[-1]
+        categories = stats.breakdown("category", first - window + 1, today)
+        if categories:
+            print(f"\n📂 {window}-day completion rate by category, {days} days ago -> today:")
+        for name in sorted(categories):
+            line = stats.rolling(first, today, window, f"category:{name}")
+            (_, t0, c0), (_, t1, c1) = line[0], line[-1]
+            before, now = (c0 / t0 if t0 else None), (c1 / t1 if t1 else None)
+            arrow = "➡️" if before is None or now is None or abs(now - before) < 0.005 else "⬆️" if now > before else "⬇️"
+            print(f"   {arrow} {name}: {_rate(t0, c0)} -> {_rate(t1, c1)}")
+
+    current, longest = stats.streaks(None, today, key)
+    since = "ever" if stats.since is None else f"since {task_times.to_date(stats.since).isoformat()}"
+    print(f"🔥 Current streak: {current} day(s), longest {since}: {longest} day(s)")
+
+def _latency_line(label, latency, overdue):
+    parts = [f"{label} ({len(latency)} timed)"]
+    parts += [f"p{p} {format_duration(v)}" for p, v in latency.percentiles().items()]
+    if overdue:
+        parts.append(f"late {overdue.late()}/{len(overdue)}, p{PERCENTILES[-1]} overdue "
+                     f"{format_duration(overdue.quantile(PERCENTILES[-1] / 100))}")
+    return " | ".join(parts)
+
+# Time to complete (p50/p90/p99) and lateness at completion for tasks
+# completed between two dates, overall and by category and priority, merged
+# from the per-day latency sketches
+def show_latency_report(done_from, done_to):
+    if done_to < done_from:
+        print("❗ The end date is before the start date.")
+        return
+    first, last = task_times.parse_day(done_from), task_times.parse_day(done_to)
+    stats = productivity_stats(first)
+    latency, overdue = (stats.latency_sketch(metric, first, last) for metric in ("latency", "overdue"))
+
+    print(f"\n⏱️ Completion Times {done_from} to {done_to}")
+    if not latency and not overdue:
+        print("No tasks with a recorded completion time in this period.")
+        return
+    print(_latency_line("All", latency, overdue))
+    for dimension in ("category", "priority"):
+        by_value = stats.latency_breakdown("latency", dimension, first, last)
+        late = stats.latency_breakdown("overdue", dimension, first, last)
+        for value in sorted(set(by_value) | set(late)):
+            print(f"   {'📂' if dimension == 'category' else '🔺'} " +
+                  _latency_line(value, by_value.get(value) or Sketch(), late.get(value)))
+
@@ -0,0 +1,187 @@
+# shard_store.py (time-sharded encrypted task store for TaskPilot)
+#
+# Tasks are partitioned by due month ("2025-08"); tasks without a usable due
+# date go to the "undated" shard. Each shard is one encrypted task_codec blob
+# under SHARD_DIR with a random file name. The encrypted MANIFEST_FILE lists
+# the shards in order (months ascending, undated last) with their task count
+# and a digest of their plaintext.
+#
+# Date-bounded reads open only the shards whose month overlaps the window,
+# and writes only rewrite the shards whose contents changed.
+
+import hashlib
+import json
+import os
+import secrets
+from datetime import date
+from encryption import encrypt_data, decrypt_data, encrypt_many, decrypt_many, rotate_token
+import task_codec
+
+SHARD_DIR = "storage/shards"
+MANIFEST_FILE = os.path.join(SHARD_DIR, "manifest")
+UNDATED = "undated"
+
+def shard_key(record):
+    due = record.get("due")
+    if isinstance(due, str) and len(due) == 10:
+        try:
+            date.fromisoformat(due)
+            return due[:7]
+        except ValueError:
+            pass
+    return UNDATED
+
+def _order(key):
+    return (key == UNDATED, key)
+
+def _path(entry):
+    return os.path.join(SHARD_DIR, entry["file"])
+
+def read_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return []
+    with open(MANIFEST_FILE, "rb") as f:
+        return json.loads(decrypt_data(f.read()))["shards"]
+
+def _write_manifest(shards):
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    shards = sorted(shards, key=lambda e: _order(e["key"]))
+    tmp = MANIFEST_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(encrypt_data(json.dumps({"shards": shards})))
+    os.replace(tmp, MANIFEST_FILE)
+    return shards
+
+def _read_shards(entries):
+    def tokens():
+        for entry in entries:
+            with open(_path(entry), "rb") as f:
+                yield f.read()
+    return [task_codec.decode(plain) for plain in decrypt_many(tokens())]
+
+# Encode, encrypt and write the given {key: records} shards, reusing the
+# manifest entry (and file) of shards that already exist. Shards whose
+# plaintext digest is unchanged are not rewritten.
+def _write_shards(shards, manifest):
+    by_key = {e["key"]: e for e in manifest}
+    changed = []
+    for key, records in shards.items():
+        plain = task_codec.encode(records)
+        digest = hashlib.sha256(plain).hexdigest()
+        entry = by_key.get(key) or {"key": key, "file": secrets.token_hex(8) + ".bin"}
+        if entry.get("digest") == digest and os.path.exists(_path(entry)):
+            continue
+        entry.update(count=len(records), digest=digest)
+        by_key[key] = entry
+        changed.append((entry, plain))
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    for (entry, _), token in zip(changed, encrypt_many(plain for _, plain in changed)):
+        tmp = _path(entry) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(token)
+        os.replace(tmp, _path(entry))
+    return by_key
+
+def _drop(entries):
+    for entry in entries:
+        if os.path.exists(_path(entry)):
+            os.remove(_path(entry))
+
+def load_records():
+    manifest = read_manifest()
+    return [record for shard in _read_shards(manifest) for record in shard]
+
+def save_records(records):
+    manifest = read_manifest()
+    shards = {}
+    for record in records:
+        shards.setdefault(shard_key(record), []).append(record)
+    by_key = _write_shards(shards, manifest)
+    _write_manifest([by_key[key] for key in shards])
+    _drop(e for e in manifest if e["key"] not in shards)
+
+def _overlaps(key, due_from, due_to, include_undated):
+    if key == UNDATED:
+        return include_undated
+    if due_from is not None and key < str(due_from)[:7]:
+        return False
+    if due_to is not None and key > str(due_to)[:7]:
+        return False
+    return True
+
+# (position, record) for the tasks in shards overlapping [due_from, due_to]
+# (YYYY-MM-DD, inclusive, None = open). Only those shards are decrypted;
+# filtering inside them is up to the caller.
+def iter_window(due_from=None, due_to=None, include_undated=False):
+    positions = []
+    start = 0
+    for entry in read_manifest():
+        if _overlaps(entry["key"], due_from, due_to, include_undated):
+            positions.append((start, entry))
+        start += entry["count"]
+    shards = _read_shards([entry for _, entry in positions])
+    for (start, _), records in zip(positions, shards):
+        for offset, record in enumerate(records):
+            yield start + offset, record
+
+def _locate(manifest, index):
+    start = 0
+    for entry in manifest:
+        if index < start + entry["count"]:
+            return entry, index - start
+        start += entry["count"]
+    raise IndexError(index)
+
+# Apply one journal-style mutation ({"op": "add"|"update"|"delete", ...});
+# only the one or two shards involved are read and rewritten. Returns the
+# position the added or updated task ends up at (adds and due-date changes
+# put it last in its shard), None for a delete.
+def apply(op):
+    manifest = read_manifest()
+    by_key = {e["key"]: e for e in manifest}
+    kind = op["op"]
+    key = local = None
+    if kind == "add":
+        key = shard_key(op["task"])
+        records = _read_shards([by_key[key]])[0] if key in by_key else []
+        shards = {key: records + [op["task"]]}
+        local = len(records)
+    else:
+        entry, local = _locate(manifest, op["index"])
+        records = _read_shards([entry])[0]
+        shards = {entry["key"]: records}
+        if kind == "delete":
+            records.pop(local)
+        elif kind == "update":
+            record = dict(records[local], **op["fields"])
+            key = shard_key(record)
+            if key == entry["key"]:
+                records[local] = record
+            else:
+                records.pop(local)
+                moved = _read_shards([by_key[key]])[0] if key in by_key else []
+                shards[key] = moved + [record]
+                local = len(moved)
+    by_key = _write_shards(shards, manifest)
+    empty = [e for e in by_key.values() if e["count"] == 0]
+    manifest = _write_manifest([e for e in by_key.values() if e["count"]])
+    _drop(empty)
+    if key is None:
+        return None
+    start = 0
+    for entry in manifest:
+        if entry["key"] == key:
+            return start + local
+        start += entry["count"]
+
+# Re-encrypt every shard and the manifest under the current key
+def reencrypt():
+    manifest = read_manifest()
+    for entry in manifest:
+        with open(_path(entry), "rb") as f:
+            token = rotate_token(f.read())
+        tmp = _path(entry) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(token)
+        os.replace(tmp, _path(entry))
+    _write_manifest(manifest)
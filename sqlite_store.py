@@ -0,0 +1,202 @@
+# sqlite_store.py (indexed SQLite storage engine for TaskPilot)
+#
+# Every task is one row. The full task is kept as a Fernet token in `data`;
+# only the fields needed to answer filters live next to it:
+#   due, time, completed, priority  - plaintext so range/equality queries can use an index
+#   category, owner                 - keyed hashes (HMAC of the lower-cased value), so
+#                                     equality filters are indexed without storing the name
+#   uid                             - the task's id (task_ids), so single-task
+#                                     updates and deletes find their row through an index
+# Row order (id) is the task's position in the list handed to save_records.
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+from datetime import datetime
+from encryption import encrypt_data, decrypt_data, rotate_token
+
+DB_FILE = "storage/tasks.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    owner TEXT,
+    category TEXT,
+    due TEXT,
+    time TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    priority TEXT,
+    uid TEXT,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks (owner, due, time);
+CREATE INDEX IF NOT EXISTS idx_tasks_category ON tasks (owner, category);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (owner, completed);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks (owner, priority);
+"""
+
+_local = threading.local()
+
+# One connection per thread (the alarm thread and the menu both use the store)
+def connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
+        conn = sqlite3.connect(DB_FILE, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _add_uids(conn)
+        _local.index_key = _load_index_key(conn)
+        _local.conn = conn
+    return conn
+
+# Databases from before the uid column get it, filled in from each row's
+# task; rows that cannot be read keep none and are never matched by id
+def _add_uids(conn):
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")  # another process may be doing the same
+        if "uid" not in [column[1] for column in conn.execute("PRAGMA table_info(tasks)")]:
+            conn.execute("ALTER TABLE tasks ADD COLUMN uid TEXT")
+            uids = []
+            for row_id, data in conn.execute("SELECT id, data FROM tasks").fetchall():
+                try:
+                    uids.append((json.loads(decrypt_data(data)).get("id"), row_id))
+                except Exception:
+                    pass
+            conn.executemany("UPDATE tasks SET uid = ? WHERE id = ?", uids)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_uid ON tasks (owner, uid)")
+
+# The HMAC key for category/owner hashes is stored encrypted in `meta`, so it
+# survives encryption key rotation without rebuilding the indexes. It is read
+# on connect, before any write can have a transaction open.
+def _load_index_key(conn):
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")  # another process opening a new database may be creating it too
+        row = conn.execute("SELECT value FROM meta WHERE name = 'index_key'").fetchone()
+        if row:
+            key = bytes.fromhex(decrypt_data(row[0]))
+        else:
+            key = secrets.token_bytes(32)
+            conn.execute("INSERT INTO meta (name, value) VALUES ('index_key', ?)",
+                         (encrypt_data(key.hex()),))
+    return key
+
+def _index_key():
+    connect()
+    return _local.index_key
+
+def _blind(value):
+    if value is None:
+        return None
+    return hmac.new(_index_key(), str(value).lower().encode(), hashlib.sha256).hexdigest()[:32]
+
+def _sort_time(time_str):
+    if not time_str:
+        return None
+    try:
+        return datetime.strptime(time_str, "%I:%M %p").strftime("%H:%M")
+    except ValueError:
+        return time_str
+
+def _row(record, owner):
+    return (
+        _blind(owner),
+        _blind(record.get("category")),
+        record.get("due") or None,
+        _sort_time(record.get("time")),
+        1 if record.get("completed") else 0,
+        record.get("priority"),
+        record.get("id"),
+        encrypt_data(json.dumps(record)),
+    )
+
+def _decode(rows):
+    records = []
+    for (data,) in rows:
+        try:
+            records.append(json.loads(decrypt_data(data)))
+        except Exception:
+            print("⚠️ Skipping unreadable task row.")
+    return records
+
+def load_records(owner=None):
+    rows = connect().execute(
+        "SELECT data FROM tasks WHERE owner IS ? ORDER BY id", (_blind(owner),))
+    return _decode(rows)
+
+def save_records(records, owner=None):
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM tasks WHERE owner IS ?", (_blind(owner),))
+        conn.executemany(
+            "INSERT INTO tasks (owner, category, due, time, completed, priority, uid, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [_row(r, owner) for r in records])
+
+# Indexed filter; only matching rows are decrypted. Dates are YYYY-MM-DD, bounds inclusive.
+def query_records(owner=None, category=None, due_from=None, due_to=None, completed=None, priority=None):
+    sql = ["SELECT data FROM tasks WHERE owner IS ?"]
+    args = [_blind(owner)]
+    if category is not None:
+        sql.append("AND category = ?")
+        args.append(_blind(category))
+    if due_from is not None:
+        sql.append("AND due >= ?")
+        args.append(str(due_from))
+    if due_to is not None:
+        sql.append("AND due <= ?")
+        args.append(str(due_to))
+    if completed is not None:
+        sql.append("AND completed = ?")
+        args.append(1 if completed else 0)
+    if priority is not None:
+        sql.append("AND priority = ?")
+        args.append(priority)
+    sql.append("ORDER BY id")
+    return _decode(connect().execute(" ".join(sql), args))
+
+def _row_id(conn, task_id, owner):
+    row = conn.execute(
+        "SELECT id FROM tasks WHERE owner IS ? AND uid = ?", (_blind(owner), task_id)).fetchone()
+    if row is None:
+        raise KeyError(f"no task with id {task_id}")
+    return row[0]
+
+# Apply one journal-style mutation ({"op": "add"|"update"|"delete", ...}) in
+# place; updates and deletes find their row by the task id in op["id"]
+def apply(op, owner=None):
+    conn = connect()
+    with conn:
+        kind = op["op"]
+        if kind == "add":
+            conn.execute(
+                "INSERT INTO tasks (owner, category, due, time, completed, priority, uid, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", _row(op["task"], owner))
+        elif kind == "update":
+            row_id = _row_id(conn, op["id"], owner)
+            data = conn.execute("SELECT data FROM tasks WHERE id = ?", (row_id,)).fetchone()[0]
+            record = json.loads(decrypt_data(data))
+            record.update(op["fields"])
+            conn.execute(
+                "UPDATE tasks SET owner = ?, category = ?, due = ?, time = ?, completed = ?, "
+                "priority = ?, uid = ?, data = ? WHERE id = ?", _row(record, owner) + (row_id,))
+        elif kind == "delete":
+            conn.execute("DELETE FROM tasks WHERE id = ?", (_row_id(conn, op["id"], owner),))
+
+# Re-encrypt every row (all owners) under the current key (after a key rotation)
+def reencrypt():
+    conn = connect()
+    with conn:
+        rows = conn.execute("SELECT id, data FROM tasks").fetchall()
+        conn.executemany("UPDATE tasks SET data = ? WHERE id = ?",
+                         [(rotate_token(data), row_id) for row_id, data in rows])
+        conn.execute("UPDATE meta SET value = ? WHERE name = 'index_key'",
+                     (encrypt_data(_index_key().hex()),))
@@ -0,0 +1,102 @@
+# stream_store.py (framed, streaming encrypted task store for TaskPilot)
+#
+# STREAM_FILE = MAGIC, then frames of [u32 length][Fernet token]. Each token
+# holds a frame header (sequence number, last-frame flag) followed by up to
+# FRAME_SIZE bytes of newline-separated task JSON. Fernet authenticates every
+# frame; the sequence numbers and the last-frame flag (inside the authenticated
+# payload) catch reordered, dropped or truncated frames.
+#
+# Reading and writing work one frame at a time, so memory is bounded by
+# FRAME_SIZE instead of by the number of tasks. Frame crypto goes through
+# encryption.encrypt_many/decrypt_many, which use a process pool when
+# encryption.CRYPTO_WORKERS > 1.
+
+import json
+import os
+import struct
+from encryption import encrypt_many, decrypt_many
+
+STREAM_FILE = "storage/tasks.tps"
+FRAME_SIZE = 64 * 1024  # plaintext bytes per frame
+
+MAGIC = b"TPS1"
+LENGTH = struct.Struct("<I")
+FRAME_HEADER = struct.Struct("<IB")  # sequence number, last-frame flag
+
+class StreamCorrupted(Exception):
+    pass
+
+def _check(plain, expected_seq):
+    seq, last = FRAME_HEADER.unpack_from(plain)
+    if seq != expected_seq:
+        raise StreamCorrupted(f"frame {seq} found where frame {expected_seq} was expected")
+    return plain[FRAME_HEADER.size:], bool(last)
+
+# Group records into newline-separated JSON payloads of about FRAME_SIZE bytes
+def _payloads(records):
+    batch, size = [], 0
+    for record in records:
+        line = json.dumps(record).encode() + b"\n"
+        if batch and size + len(line) > FRAME_SIZE:
+            yield b"".join(batch)
+            batch, size = [], 0
+        batch.append(line)
+        size += len(line)
+    yield b"".join(batch)
+
+def _tokens(f):
+    while True:
+        head = f.read(LENGTH.size)
+        if not head:
+            return
+        if len(head) < LENGTH.size:
+            raise StreamCorrupted("truncated frame header")
+        (length,) = LENGTH.unpack(head)
+        token = f.read(length)
+        if len(token) < length:
+            raise StreamCorrupted("truncated frame")
+        yield token
+
+# Frame plaintexts (header + payload); one payload is held back so the
+# final frame can be flagged as last
+def _frames(records):
+    seq = 0
+    pending = None
+    for payload in _payloads(records):
+        if pending is not None:
+            yield FRAME_HEADER.pack(seq, 0) + pending
+            seq += 1
+        pending = payload
+    yield FRAME_HEADER.pack(seq, 1) + pending
+
+# Write records (any iterable, consumed lazily) to the store atomically
+def save_records(records):
+    os.makedirs(os.path.dirname(STREAM_FILE), exist_ok=True)
+    tmp = STREAM_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        for token in encrypt_many(_frames(records)):
+            f.write(LENGTH.pack(len(token)) + token)
+    os.replace(tmp, STREAM_FILE)
+
+# Yield task dicts one frame at a time
+def iter_records():
+    if not os.path.exists(STREAM_FILE):
+        return
+    with open(STREAM_FILE, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise StreamCorrupted("not a TaskPilot stream file")
+        seq = 0
+        last = False
+        for plain in decrypt_many(_tokens(f)):
+            if last:
+                raise StreamCorrupted("data after the final frame")
+            payload, last = _check(plain, seq)
+            for line in payload.splitlines():
+                yield json.loads(line)
+            seq += 1
+        if not last:
+            raise StreamCorrupted("stream ends before its final frame")
+
+def load_records():
+    return list(iter_records())
@@ -0,0 +1,281 @@
+# task_codec.py (compact binary encoding for lists of task dicts)
+#
+# Layout (all little-endian), optionally zlib-compressed after the flags byte:
+#   MAGIC, flags, then the body:
+#   u32 count
+#   strings table   - interned category / recurring values
+#   titles          - u32 char lengths + one UTF-8 blob
+#   category codes  - u32 per task, index into strings (0 = None)
+#   due days        - i32 days since 1970-01-01 (NO_DAY = None)
+#   time minutes    - i16 minutes after midnight (-1 = None)
+#   flags           - u8 per task (bit 0 = completed)
+#   recurring codes - u32 per task, like category
+#   ids             - u32 char lengths + one ASCII blob (only with FLAG_IDS;
+#                     older snapshots without it decode to records without ids)
+#   (due_day, due_ts) take no space: with FLAG_STAMPS they are rebuilt from
+#                     the due and time columns (see task_times); values that
+#                     do not match go to extras
+#   created_at, completed_at
+#                   - i64 wall-clock seconds each (NO_MOMENT = None), for
+#                     canonical ISO strings (only with FLAG_MOMENTS)
+#   extras          - JSON object {position: {field: value}} for anything the
+#                     columns above cannot reproduce exactly (other fields,
+#                     non-standard date/time strings, non-bool completed ...)
+
+import json
+import struct
+import zlib
+from array import array
+from datetime import date
+import task_times
+
+MAGIC = b"TPB1"
+FLAG_ZLIB = 0x01
+FLAG_IDS = 0x02
+FLAG_STAMPS = 0x04
+FLAG_MOMENTS = 0x08
+FLAG_COMPLETED = 0x01
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+NO_DAY = -2**31
+NO_TIME = -1
+NO_MOMENT = -2**63
+MOMENTS = ("created_at", "completed_at")
+COLUMNS = ("id", "title", "category", "due", "time", "completed", "recurring", "due_day", "due_ts") + MOMENTS
+
+U32 = struct.Struct("<I")
+
+def is_binary(data):
+    return data[:len(MAGIC)] == MAGIC
+
+# Days since 1970-01-01 for a canonical YYYY-MM-DD string, else None
+def day_number(due):
+    if not isinstance(due, str) or len(due) != 10:
+        return None
+    try:
+        d = date.fromisoformat(due)
+    except ValueError:
+        return None
+    return d.toordinal() - EPOCH_ORDINAL if d.isoformat() == due else None
+
+# Minutes after midnight for a canonical "HH:MM AM" string, else None
+def minute_of_day(time_str):
+    if not isinstance(time_str, str) or len(time_str) != 8:
+        return None
+    seconds = task_times.parse_time(time_str)
+    if seconds is None:
+        return None
+    minute = seconds // 60
+    return minute if time_string(minute) == time_str else None
+
+def day_string(day):
+    return None if day == NO_DAY else date.fromordinal(day + EPOCH_ORDINAL).isoformat()
+
+def time_string(minute):
+    if minute == NO_TIME:
+        return None
+    h, m = divmod(minute, 60)
+    return f"{(h % 12) or 12:02d}:{m:02d} {'AM' if h < 12 else 'PM'}"
+
+# Wall-clock seconds for a canonical "YYYY-MM-DDTHH:MM:SS" string, else None
+def moment_number(text):
+    if not isinstance(text, str) or len(text) != 19:
+        return None
+    seconds = task_times.parse_moment(text)
+    return seconds if seconds is not None and task_times.moment_string(seconds) == text else None
+
+# The (due_day, due_ts) a day and minute column entry stand for
+def _stamps(day, minute):
+    if day == NO_DAY:
+        return None, None
+    return day, None if minute == NO_TIME else day * 86400 + minute * 60
+
+def _pack_strings(strings):
+    blob = "\0".join(strings).encode()
+    return U32.pack(len(strings)) + U32.pack(len(blob)) + blob
+
+def _pack_array(arr):
+    return arr.tobytes()
+
+def _pack_texts(texts):
+    lengths = array("I", (len(t) for t in texts))
+    blob = "".join(texts).encode()
+    return _pack_array(lengths) + U32.pack(len(blob)) + blob
+
+def encode(records, compress=True):
+    strings, codes = [], {}
+    def intern(value):
+        if value is None:
+            return 0
+        if value not in codes:
+            codes[value] = len(strings) + 1
+            strings.append(value)
+        return codes[value]
+
+    titles, ids = [], []
+    categories, recurrings = array("I"), array("I")
+    days, minutes, flags = array("i"), array("h"), bytearray()
+    moments = {field: array("q") for field in MOMENTS}
+    extras = {}
+    day_cache, minute_cache = {}, {}
+
+    for i, record in enumerate(records):
+        extra = {k: v for k, v in record.items() if k not in COLUMNS}
+
+        for field, column in (("title", titles), ("id", ids)):
+            value = record.get(field)
+            if not isinstance(value, str):
+                if field in record:
+                    extra[field] = value
+                value = ""
+            column.append(value)
+
+        for field, column in (("category", categories), ("recurring", recurrings)):
+            value = record.get(field)
+            if value is None or (isinstance(value, str) and "\0" not in value):
+                column.append(intern(value))
+            else:
+                column.append(0)
+                extra[field] = value
+
+        due = record.get("due")
+        if due not in day_cache:
+            day_cache[due] = day_number(due)
+        if due is None:
+            days.append(NO_DAY)
+        elif day_cache[due] is None:
+            days.append(NO_DAY)
+            extra["due"] = due
+        else:
+            days.append(day_cache[due])
+
+        time_str = record.get("time")
+        if time_str not in minute_cache:
+            minute_cache[time_str] = minute_of_day(time_str)
+        if time_str is None:
+            minutes.append(NO_TIME)
+        elif minute_cache[time_str] is None:
+            minutes.append(NO_TIME)
+            extra["time"] = time_str
+        else:
+            minutes.append(minute_cache[time_str])
+
+        for field, derived in zip(("due_day", "due_ts"), _stamps(days[-1], minutes[-1])):
+            value = record.get(field)
+            if field in record and (value != derived or type(value) is not type(derived)):
+                extra[field] = value
+
+        for field, column in moments.items():
+            value = record.get(field)
+            seconds = moment_number(value)
+            column.append(NO_MOMENT if seconds is None else seconds)
+            if seconds is None and value is not None:
+                extra[field] = value
+
+        completed = record.get("completed", False)
+        if not isinstance(completed, bool):
+            extra["completed"] = completed
+        flags.append(FLAG_COMPLETED if completed is True else 0)
+
+        missing = [field for field in COLUMNS if field not in record]
+        if missing:
+            extra["_missing"] = missing
+        if extra:
+            extras[i] = extra
+
+    body = b"".join([
+        U32.pack(len(titles)),
+        _pack_strings(strings),
+        _pack_texts(titles),
+        _pack_array(categories),
+        _pack_array(days),
+        _pack_array(minutes),
+        bytes(flags),
+        _pack_array(recurrings),
+        _pack_texts(ids),
+        *(_pack_array(column) for column in moments.values()),
+        json.dumps(extras, separators=(",", ":")).encode(),
+    ])
+    if compress:
+        return MAGIC + bytes([FLAG_ZLIB | FLAG_IDS | FLAG_STAMPS | FLAG_MOMENTS]) + zlib.compress(body)
+    return MAGIC + bytes([FLAG_IDS | FLAG_STAMPS | FLAG_MOMENTS]) + body
+
+def decode(data):
+    if not is_binary(data):
+        raise ValueError("not a TaskPilot binary task list")
+    body = data[len(MAGIC) + 1:]
+    flags_byte = data[len(MAGIC)]
+    if flags_byte & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    view = memoryview(body)
+    pos = 0
+
+    def take(n):
+        nonlocal pos
+        chunk = view[pos:pos + n]
+        pos += n
+        return chunk
+
+    def take_array(typecode, n):
+        arr = array(typecode)
+        arr.frombytes(take(arr.itemsize * n))
+        return arr
+
+    def take_texts(n):
+        lengths = take_array("I", n)
+        (blob_len,) = U32.unpack(take(4))
+        text = bytes(take(blob_len)).decode()
+        texts, offset = [], 0
+        for length in lengths:
+            texts.append(text[offset:offset + length])
+            offset += length
+        return texts
+
+    (count,) = U32.unpack(take(4))
+    (n_strings,) = U32.unpack(take(4))
+    (blob_len,) = U32.unpack(take(4))
+    blob = bytes(take(blob_len)).decode()
+    strings = [None] + (blob.split("\0") if n_strings else [])
+    titles = take_texts(count)
+    categories = take_array("I", count)
+    days = take_array("i", count)
+    minutes = take_array("h", count)
+    flags = bytes(take(count))
+    recurrings = take_array("I", count)
+    ids = take_texts(count) if flags_byte & FLAG_IDS else None
+    has_stamps = flags_byte & FLAG_STAMPS
+    moments = {field: take_array("q", count) for field in MOMENTS} if flags_byte & FLAG_MOMENTS else {}
+    extras = json.loads(bytes(view[pos:]).decode())
+
+    due_cache = {NO_DAY: None}
+    time_cache = {NO_TIME: None}
+    records = []
+    for i in range(count):
+        day = days[i]
+        if day not in due_cache:
+            due_cache[day] = day_string(day)
+        minute = minutes[i]
+        if minute not in time_cache:
+            time_cache[minute] = time_string(minute)
+        record = {
+            "title": titles[i],
+            "category": strings[categories[i]],
+            "due": due_cache[day],
+            "time": time_cache[minute],
+            "completed": bool(flags[i] & FLAG_COMPLETED),
+            "recurring": strings[recurrings[i]],
+        }
+        if ids is not None:
+            record["id"] = ids[i]
+        if has_stamps:
+            record["due_day"], record["due_ts"] = _stamps(day, minute)
+        for field, column in moments.items():
+            seconds = column[i]
+            record[field] = None if seconds == NO_MOMENT else task_times.moment_string(seconds)
+        extra = extras.get(str(i))
+        if extra:
+            for field in extra.pop("_missing", ()):
+                del record[field]
+            record.update(extra)
+        records.append(record)
+    return records
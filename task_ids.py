@@ -0,0 +1,40 @@
+# task_ids.py (compact unique task IDs)
+#
+# IDs are ULIDs: a 48-bit millisecond timestamp followed by 80 random bits,
+# written as 26 Crockford base32 characters. They are unique without any
+# coordination between processes and sort in creation order.
+
+import os
+import time
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+LENGTH = 26
+
+def _encode(value):
+    chars = []
+    for _ in range(LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+def new_id():
+    return _encode((time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big"))
+
+# The 16 raw bytes behind an ID, or None if `task_id` is not a ULID
+def id_to_bytes(task_id):
+    if not isinstance(task_id, str) or len(task_id) != LENGTH:
+        return None
+    value = 0
+    for ch in task_id:
+        digit = ALPHABET.find(ch)
+        if digit < 0:
+            return None
+        value = value * 32 + digit
+    return value.to_bytes(16, "big") if value < 1 << 128 else None
+
+def id_from_bytes(raw):
+    return _encode(int.from_bytes(raw, "big"))
+
+# Typed IDs are matched case-insensitively, with the usual Crockford look-alikes
+def normalize_id(text):
+    return text.strip().upper().replace("O", "0").replace("I", "1").replace("L", "1")
@@ -2,65 +2,647 @@
 
 import json
 import os
-import time
-from datetime import datetime, timedelta
-from encryption import encrypt_data, decrypt_data
+import threading
+from datetime import datetime
+from encryption import encrypt_bytes, decrypt_bytes, rotate_key, KEY_FILE
+import journal
+import sqlite_store
+import record_store
+import stream_store
+import shard_store
+import fire_index
+import task_stats
+import analytics
+import task_times
+import utils
+import task_codec
+from task_ids import new_id, normalize_id
+from task_table import TaskTable
+from recurrence import Rule, advance
+from filelock import store_lock
 import platform
 
 if platform.system() == "Windows":
     import winsound
 
 TASK_FILE = "storage/tasks.json"
+VERSION_FILE = "storage/tasks.version"  # bumped on every write; see save_tasks(expected_version=...)
+STATS_FILE = "storage/tasks.stats"      # see productivity_stats()
+
+# "journal": each change is appended to journal.JOURNAL_FILE and folded into
+# TASK_FILE by a background compaction. "json": every change rewrites TASK_FILE.
+# "sqlite": tasks live in sqlite_store.DB_FILE and filters run as indexed queries.
+# "records": every task is encrypted on its own in record_store.DATA_FILE.
+# "stream": stream_store.STREAM_FILE, read and written in fixed-size encrypted frames.
+# "sharded": one encrypted shard per due month under shard_store.SHARD_DIR, so
+#            date-bounded reads only decrypt the months they cover.
+STORAGE_MODE = "journal"
+
+# Plaintext format of TASK_FILE snapshots: "binary" (task_codec, optionally
+# zlib-compressed) or "json". Both are read back whatever this is set to.
+TASK_ENCODING = "binary"
+COMPRESS_TASKS = True
+
+# Keep the decoded store in memory (see TaskRepository) instead of decrypting
+# it again on every read. Turn off to keep stream mode's bounded memory.
+CACHE_TASKS = True
 
 class Task:
-    def __init__(self, title, category="General", due=None, time=None, completed=False, recurring=None):
+    __slots__ = ("title", "category", "due", "time", "completed", "recurring", "id", "due_day", "due_ts",
+                 "created_at", "completed_at", "history")
+
+    # due_day / due_ts are integer forms of due and time (see task_times),
+    # filled in whenever the task is written. created_at / completed_at are
+    # wall-clock ISO strings (task_times.now_moment()); for a recurring task
+    # they belong to its current occurrence, and history holds the ones it
+    # has moved past (see recurrence.advance).
+    def __init__(self, title, category="General", due=None, time=None, completed=False, recurring=None, id=None,
+                 due_day=None, due_ts=None, created_at=None, completed_at=None, history=None):
         self.title = title
         self.category = category
         self.due = due
         self.time = time
         self.completed = completed
         self.recurring = recurring
+        self.id = id or new_id()
+        self.due_day = due_day
+        self.due_ts = due_ts
+        self.created_at = created_at
+        self.completed_at = completed_at
+        self.history = history
 
     def to_dict(self):
-        return self.__dict__
+        return {name: getattr(self, name) for name in self.__slots__}
 
-def save_tasks(tasks):
-    with open(TASK_FILE, "wb") as f:
-        json_data = json.dumps([t.to_dict() for t in tasks])
-        f.write(encrypt_data(json_data))
+def _encode_snapshot(records):
+    if TASK_ENCODING == "binary":
+        return encrypt_bytes(task_codec.encode(records, compress=COMPRESS_TASKS))
+    return encrypt_bytes(json.dumps(records, separators=(",", ":")).encode())
 
-def load_tasks():
+def _decode_snapshot(payload):
+    plain = decrypt_bytes(payload)
+    if task_codec.is_binary(plain):
+        return task_codec.decode(plain)
+    return json.loads(plain)
+
+def _write_snapshot(records):
+    os.makedirs(os.path.dirname(TASK_FILE), exist_ok=True)
+    payload = _encode_snapshot(records)
+    tmp = TASK_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, TASK_FILE)
+
+def _read_snapshot():
     if not os.path.exists(TASK_FILE):
         return []
     with open(TASK_FILE, "rb") as f:
         try:
-            decrypted = decrypt_data(f.read())
-            data = json.loads(decrypted)
-            return [Task(**t) for t in data]
-        except Exception:
-            return []
+            return _decode_snapshot(f.read())
+        except Exception as e:
+            print(f"⚠️ Could not read {TASK_FILE} ({str(e) or type(e).__name__}); moved it to {TASK_FILE}.corrupt")
+    os.replace(TASK_FILE, TASK_FILE + ".corrupt")
+    return []
 
-def parse_task_datetime(date_str):
-    date_formats = [
-        "%Y-%m-%d",  # 2025-08-05
-        "%d-%m-%Y",  # 05-08-2025
-        "%d/%m/%Y",  # 05/08/2025
-        "%m-%d-%Y",  # 08-05-2025
-    ]
-    for fmt in date_formats:
+def _iter_records():
+    if STORAGE_MODE == "sqlite":
+        yield from sqlite_store.load_records()
+    elif STORAGE_MODE == "records":
+        yield from record_store.load_records()
+    elif STORAGE_MODE == "sharded":
+        yield from shard_store.load_records()
+    elif STORAGE_MODE == "stream":
         try:
-            return datetime.strptime(date_str, fmt).date()
-        except ValueError:
-            continue
-    raise ValueError("❌ Invalid date format. Use YYYY-MM-DD, DD-MM-YYYY, DD/MM/YYYY, or MM-DD-YYYY")
-def parse_time(time_str):
-    formats = ["%I:%M %p", "%H:%M", "%I.%M %p"]  # 12:30 PM, 23:30, 12.30 PM
-    for fmt in formats:
+            yield from stream_store.iter_records()
+        except Exception as e:
+            print(f"⚠️ Could not read the rest of {stream_store.STREAM_FILE} ({str(e) or type(e).__name__}); "
+                  f"moved it to {stream_store.STREAM_FILE}.corrupt")
+            os.replace(stream_store.STREAM_FILE, stream_store.STREAM_FILE + ".corrupt")
+    else:
+        with store_lock:
+            records = _read_snapshot()
+            ops, _ = journal.read_ops()
+        yield from journal.replay(records, ops)
+
+def _save_records(records):
+    if STORAGE_MODE == "sqlite":
+        sqlite_store.save_records(list(records))
+    elif STORAGE_MODE == "records":
+        record_store.save_records(records)
+    elif STORAGE_MODE == "stream":
+        stream_store.save_records(records)
+    elif STORAGE_MODE == "sharded":
+        shard_store.save_records(records)
+    else:
+        with store_lock:
+            _write_snapshot(list(records))
+            journal.clear()
+
+def _store_files():
+    if STORAGE_MODE == "sqlite":
+        return [sqlite_store.DB_FILE, sqlite_store.DB_FILE + "-wal"]
+    if STORAGE_MODE == "records":
+        return [record_store.DATA_FILE, record_store.INDEX_FILE]
+    if STORAGE_MODE == "stream":
+        return [stream_store.STREAM_FILE]
+    if STORAGE_MODE == "sharded":
+        return [shard_store.MANIFEST_FILE]
+    return [TASK_FILE, journal.JOURNAL_FILE]
+
+# Files whose change means the tasks (or the key they are encrypted with)
+# changed; see watcher.StoreWatcher
+def watched_files():
+    return _store_files() + [VERSION_FILE, KEY_FILE]
+
+# Tasks written before IDs (or due_day/due_ts) existed get them here, saved
+# straight away so they stay the same on every later read. Returns True if
+# anything was written.
+def _migrate_records(records):
+    if all(r.get("id") and task_times.is_stamped(r) for r in records):
+        return False
+    with store_lock:
+        _save_records(task_times.stamp(dict(r, id=r.get("id") or new_id())) for r in _iter_records())
+        _bump_version()
+    return True
+
+class TaskRepository:
+    """Decoded task records kept in memory between reads.
+
+    The cache is checked against a stat() of the store files (mtime, size,
+    inode), so a reload, and its decrypt, only happens after the store has
+    actually been written, by this process or another one.
+
+    Alongside the records it keeps an id -> position index, built on first
+    lookup, so finding a task by id is a dict lookup instead of a scan.
+    """
+
+    def __init__(self):
+        self._records = None
+        self._signature = None
+        self._index = None
+
+    def _current_signature(self):
+        stamps = []
+        for path in _store_files():
+            try:
+                st = os.stat(path)
+                stamps.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError:
+                stamps.append(None)
+        return (STORAGE_MODE, tuple(stamps))
+
+    def is_fresh(self):
+        return self._records is not None and self._signature == self._current_signature()
+
+    def records(self):
+        if self.is_fresh():
+            return self._records
+        with store_lock:
+            if not self.is_fresh():
+                signature = self._current_signature()
+                records = list(_iter_records())
+                if _migrate_records(records):
+                    signature = self._current_signature()
+                    records = list(_iter_records())
+                self._records, self._signature, self._index = records, signature, None
+            return self._records
+
+    def position(self, task_id):
+        """Current position of the task with this id, or None"""
+        with store_lock:
+            records = self.records()
+            if self._index is None:
+                self._index = {r.get("id"): i for i, r in enumerate(records)}
+            return self._index.get(task_id)
+
+    def snapshot(self):
+        """New Task objects over the cached records; editing them does not touch the cache"""
+        return [Task(**t) for t in self.records()]
+
+    def replace(self, records):
+        """Adopt records just written by this process"""
+        with store_lock:
+            self._records = records
+            self._signature = self._current_signature()
+            self._index = None
+
+    def apply(self, op, position=None):
+        """Mirror a mutation this process just wrote, if the cache was current before it.
+        `position` is where the store put an added or updated task, if not
+        last (add) or where it was (update)."""
+        with store_lock:
+            if self._records is None or self._signature is None:
+                return
+            if op["op"] == "add":
+                op = dict(op, task=dict(op["task"]))
+            elif op["op"] == "update" and 0 <= op["index"] < len(self._records):
+                # copy, not update in place: LazyTaskList views may share the old dict
+                self._records[op["index"]] = dict(self._records[op["index"]])
+            journal.replay(self._records, [op])
+            self._signature = self._current_signature()
+            if position is not None and op["op"] != "delete":
+                at = len(self._records) - 1 if op["op"] == "add" else op["index"]
+                if at != position:
+                    self._records.insert(position, self._records.pop(at))
+                    self._index = None  # positions in between shifted
+            if self._index is not None:
+                if op["op"] == "add":
+                    self._index[op["task"].get("id")] = len(self._records) - 1
+                elif op["op"] == "delete":
+                    self._index = None  # later positions shift; rebuilt on the next lookup
+
+    def invalidate(self):
+        with store_lock:
+            self._records = None
+            self._signature = None
+            self._index = None
+
+repository = TaskRepository()
+
+class LazyTaskList:
+    """Read-only list of Tasks over decoded task records.
+
+    A Task is only built when an item is read. filter(), count() and
+    records() work on the record dicts themselves, so aggregates and
+    filters over many tasks create no Task objects at all.
+    """
+
+    def __init__(self, records):
+        self._records = records
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return LazyTaskList(self._records[i])
+        return Task(**self._records[i])
+
+    def __iter__(self):
+        return (Task(**t) for t in self._records)
+
+    def records(self):
+        """The raw record dicts; treat them as read-only"""
+        return iter(self._records)
+
+    def filter(self, predicate):
+        return LazyTaskList([t for t in self._records if predicate(t)])
+
+    def count(self, predicate=None):
+        if predicate is None:
+            return len(self._records)
+        return sum(1 for t in self._records if predicate(t))
+
+class StoreConflict(Exception):
+    """The store changed underneath a write in a way that cannot be merged"""
+
+def store_version():
+    try:
+        with open(VERSION_FILE) as f:
+            return int(f.read() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def _bump_version():
+    version = store_version() + 1
+    os.makedirs(os.path.dirname(VERSION_FILE), exist_ok=True)
+    tmp = VERSION_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(str(version))
+    os.replace(tmp, VERSION_FILE)
+    return version
+
+# Accepts any iterable of tasks; in stream mode (with CACHE_TASKS off) a
+# generator is written frame by frame without being collected first.
+# With expected_version (from load_tasks_versioned) the write only happens if
+# nobody else has written since; otherwise StoreConflict is raised.
+def save_tasks(tasks, expected_version=None):
+    with store_lock:
+        if expected_version is not None and store_version() != expected_version:
+            raise StoreConflict("the task store was changed by another writer")
+        index, stats = fire_index.FireIndex(), analytics.stats_builder()
+        if not CACHE_TASKS:
+            _save_records(stats.track(index.track(task_times.stamp(t.to_dict()))) for t in tasks)
+        else:
+            records = [stats.track(index.track(task_times.stamp(dict(t.to_dict())))) for t in tasks]
+            _save_records(records)
+            if STORAGE_MODE == "sharded":
+                repository.invalidate()  # stored in due-month order, not in the order given
+            else:
+                repository.replace(records)
+        version = _bump_version()
+        index.save(version)
+        stats.stats().save(STATS_FILE, version)
+        return version
+
+# Tasks plus the store version they were read at
+def load_tasks_versioned():
+    with store_lock:
+        return load_tasks(), store_version()
+
+# Optimistic read-modify-write: `change(tasks)` edits the list in place (or
+# returns False to abandon). If another writer got in first the change is
+# re-run on fresh data, up to `retries` times.
+def mutate_tasks(change, retries=5):
+    for _ in range(retries):
+        tasks, version = load_tasks_versioned()
+        if change(tasks) is False:
+            return False
         try:
-            return datetime.strptime(time_str, fmt).strftime("%I:%M %p")
-        except ValueError:
+            save_tasks(tasks, expected_version=version)
+            return True
+        except StoreConflict:
             continue
-    raise ValueError("Invalid time format. Try '12:30 PM', '23:30' or '12.30 PM'.")
+    raise StoreConflict(f"gave up after {retries} conflicting writes")
+
+_ids_checked = False
+
+# Decoded records straight from the store, for reads that skip the cache
+def _uncached_records():
+    global _ids_checked
+    if not _ids_checked:
+        _migrate_records(_iter_records())
+        _ids_checked = True
+    return _iter_records()
+
+# Tasks one at a time; with CACHE_TASKS off and in stream mode only one
+# frame is decrypted at a time
+def iter_tasks():
+    records = list(repository.records()) if CACHE_TASKS else _uncached_records()
+    for t in records:
+        yield Task(**t)
+
+# Every task as a LazyTaskList, for reading: Tasks are only built for the
+# items actually looked at. Use load_tasks() to get Tasks to edit and save.
+def view_tasks():
+    if CACHE_TASKS:
+        return LazyTaskList(list(repository.records()))
+    return LazyTaskList(list(_uncached_records()))
+
+def load_tasks():
+    if CACHE_TASKS:
+        return repository.snapshot()
+    return list(iter_tasks())
+
+# All tasks as a columnar TaskTable, whose rows behave like Tasks. For very
+# large stores this takes a fraction of the memory of load_tasks(); with
+# CACHE_TASKS off, stream mode fills it one frame at a time.
+def load_task_table():
+    if CACHE_TASKS:
+        return TaskTable(repository.records())
+    return TaskTable(_uncached_records())
+
+# Identity of a store file (inode, mtime, size), or None if it is missing
+def _file_identity(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+# Fold the journal into a fresh snapshot. The expensive part (replay, JSON,
+# encryption) runs without the lock; records appended meanwhile are kept.
+# If the snapshot was rewritten or the journal replaced in the meantime (a
+# save_tasks(), another process's compaction), the work is thrown away and
+# redone on the new state, up to `retries` times.
+# force=True rewrites the snapshot even when the journal is empty.
+def compact_journal(force=False, retries=3):
+    for _ in range(retries):
+        with store_lock:
+            records = _read_snapshot()
+            ops, offset = journal.read_ops()
+            snapshot = _file_identity(TASK_FILE)
+            log = _file_identity(journal.JOURNAL_FILE)
+        if not ops and not force:
+            return True
+        journal.replay(records, ops)
+        payload = _encode_snapshot(records)
+        with store_lock:
+            current = _file_identity(journal.JOURNAL_FILE)
+            if _file_identity(TASK_FILE) != snapshot or (log is None) != (current is None) or \
+                    (log and (current[0] != log[0] or current[2] < offset)):
+                continue  # appends only grow the journal; anything else means start over
+            tmp = TASK_FILE + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, TASK_FILE)
+            journal.truncate_before(offset)
+            return True
+    return False
+
+# Rewrite the active store under the newest key
+def _reencrypt_store():
+    if STORAGE_MODE == "sqlite":
+        sqlite_store.reencrypt()
+    elif STORAGE_MODE == "records":
+        record_store.reencrypt()
+    elif STORAGE_MODE == "stream":
+        with store_lock:
+            stream_store.save_records(stream_store.iter_records())
+    elif STORAGE_MODE == "sharded":
+        with store_lock:
+            shard_store.reencrypt()
+    else:
+        with store_lock:  # no writer may slip in, so one pass always succeeds
+            compact_journal(force=True)
+    with store_lock:
+        fire_index.reencrypt()
+        task_stats.reencrypt(STATS_FILE)
+    print("\n🔑 Task store re-encrypted with the new key.")
+
+# Switch to a new encryption key; existing data is re-encrypted in the background
+def rotate_encryption_key():
+    return rotate_key(reencrypt=_reencrypt_store)
+
+_compaction = None
+
+def _maybe_compact(journal_size):
+    global _compaction
+    if journal_size < journal.COMPACT_THRESHOLD:
+        return
+    if _compaction and _compaction.is_alive():
+        return
+    _compaction = threading.Thread(target=compact_journal, daemon=True)
+    _compaction.start()
+
+# Update and delete ops name their task by id. SQLite finds the row by it;
+# the other stores are positional, so the op also gets the task's current
+# position here, under the lock, wherever other writers have moved it. With
+# `expected`, the op only goes through if the task still looks that way;
+# both sides are compared as Tasks, so fields a stored record predates
+# (created_at, say) count as their defaults.
+def _resolve(op, expected):
+    if op["op"] == "add":
+        return op
+    index = repository.position(op["id"])
+    if index is None:
+        if expected is not None:
+            raise StoreConflict("that task was removed by another writer")
+        raise KeyError(f"no task with id {op['id']}")
+    if expected is not None and Task(**repository.records()[index]).to_dict() != Task(**expected).to_dict():
+        raise StoreConflict("that task was changed by another writer")
+    return dict(op, index=index)
+
+# The op with due_day/due_ts brought up to date, plus the id of the task it
+# touches and that task's record before and after (None when absent)
+def _prepare(op):
+    if op["op"] == "add":
+        op = dict(op, task=task_times.stamp(dict(op["task"])))
+        return op, op["task"].get("id"), None, op["task"]
+    index = repository.position(op["id"])
+    old = None if index is None else repository.records()[index]
+    if op["op"] == "delete" or old is None:
+        return op, op["id"], old, None
+    record = dict(old, **op["fields"])
+    if "due" in op["fields"] or "time" in op["fields"] or not task_times.is_stamped(record):
+        task_times.stamp(record)
+        op = dict(op, fields=dict(op["fields"], due_day=record["due_day"], due_ts=record["due_ts"]))
+    return op, op["id"], old, record
+
+def _apply(op, expected=None):
+    with store_lock:
+        if expected is not None:
+            expected = dict(expected.to_dict() if hasattr(expected, "to_dict") else expected)
+        op, task_id, old, record = _prepare(op)
+        op = _resolve(op, expected)
+        fresh = CACHE_TASKS and repository.is_fresh()
+        position = None
+        if STORAGE_MODE == "sqlite":
+            sqlite_store.apply(op)
+        elif STORAGE_MODE == "records":
+            record_store.apply(op)
+        elif STORAGE_MODE == "sharded":
+            position = shard_store.apply(op)  # adds and due-date changes can land mid-list
+        elif STORAGE_MODE == "journal":
+            _maybe_compact(journal.append(op))
+        else:
+            _save_records(journal.replay(list(_iter_records()), [op]))
+        if fresh:
+            repository.apply(op, position)
+        else:
+            repository.invalidate()
+        version = _bump_version()
+        fire_index.record_change(version, task_id, record)
+        task_stats.record_change(STATS_FILE, version, old, record)
+
+# Single-task mutations by task id; in journal mode each one is an O(1) append.
+# Pass `expected` (the Task as the caller last saw it) to have the change
+# merged safely with writes made by other threads or processes meanwhile.
+# An unknown id raises KeyError.
+def append_task(task):
+    task.due_day, task.due_ts = task_times.stamps(task.due, task.time)  # so it can serve as `expected` later
+    _apply({"op": "add", "task": task.to_dict()})
+
+def update_task(task_id, expected=None, **fields):
+    _apply({"op": "update", "id": task_id, "fields": fields}, expected)
+
+def remove_task(task_id, expected=None):
+    _apply({"op": "delete", "id": task_id}, expected)
+
+def get_task(task_id):
+    with store_lock:
+        index = repository.position(task_id)
+        return None if index is None else Task(**repository.records()[index])
+
+# The fire-time index (see fire_index) as of the current store version. It
+# is kept up to date by every write made here; only if another writer has
+# left it behind is it rebuilt from the store.
+def fire_schedule():
+    with store_lock:
+        version = store_version()
+        index = fire_index.load()
+        if index is None or index.version != version:
+            index = fire_index.FireIndex.build(view_tasks().records())
+            index.save(version)
+        return index
+
+# Productivity counters (see task_stats) as of the current store version,
+# kept up to date by every write made here and rebuilt from the store only if
+# another writer has left them behind. A caller reading days from `first` on
+# that the saved counters no longer keep (task_stats.KEEP_DAYS) gets counters
+# built from the store instead.
+def productivity_stats(first=None):
+    with store_lock:
+        version = store_version()
+        stats = task_stats.load(STATS_FILE)
+        if stats is None or stats.version != version:
+            stats = analytics.build_stats(view_tasks().records())
+            stats.save(STATS_FILE, version)
+        if first is not None and not stats.holds(first):
+            # the saved counters no longer go back to day `first`
+            return analytics.build_stats(view_tasks().records())
+        return stats
+
+# Predicate for records due between two dates or YYYY-MM-DD strings
+# (inclusive, None = open); it compares due_day integers
+def _in_window(due_from, due_to):
+    first = task_times.parse_day(due_from) if due_from is not None else None
+    last = task_times.parse_day(due_to) if due_to is not None else None
+    def test(record):
+        day = record.get("due_day")
+        if day is None:
+            return due_from is None and due_to is None
+        return (first is None or day >= first) and (last is None or day <= last)
+    return test
+
+# Every task not yet completed, optionally limited to a due-date window, as
+# a LazyTaskList. In records mode the completed ones are never decrypted; in
+# sharded mode only the months overlapping the window are.
+def pending_tasks(due_from=None, due_to=None):
+    cached = CACHE_TASKS and repository.is_fresh()
+    if STORAGE_MODE == "records" and not cached:
+        records = [t for _, t in record_store.iter_records(pending_only=True)]
+    elif STORAGE_MODE == "sharded" and not cached and (due_from or due_to):
+        records = [t for _, t in shard_store.iter_window(due_from, due_to)]
+    else:
+        records = view_tasks().records()
+    in_window = _in_window(due_from, due_to)
+    return LazyTaskList([t for t in records if not t.get("completed") and in_window(t)])
+
+# Filtered read as a LazyTaskList; dates are YYYY-MM-DD strings and bounds
+# are inclusive. The filters run on the records, so only the matches ever
+# become Tasks. In sqlite mode this is an indexed query that only decrypts
+# the matching rows, in sharded mode only the months overlapping the dates
+# are decrypted (unless the cached copy is current, which is cheaper still).
+def query_tasks(category=None, due_from=None, due_to=None, completed=None):
+    cached = CACHE_TASKS and repository.is_fresh()
+    if STORAGE_MODE == "sqlite" and not cached:
+        records = sqlite_store.query_records(category=category, due_from=due_from,
+                                             due_to=due_to, completed=completed)
+        return LazyTaskList(records)
+    if STORAGE_MODE == "sharded" and not cached and (due_from or due_to):
+        records = (t for _, t in shard_store.iter_window(due_from, due_to))
+    else:
+        records = view_tasks().records()
+    if category is not None:
+        category = category.lower()
+        records = (t for t in records if (t.get("category") or "").lower() == category)
+    if due_from is not None or due_to is not None:
+        records = filter(_in_window(due_from, due_to), records)
+    if completed is not None:
+        records = (t for t in records if bool(t.get("completed")) == completed)
+    return LazyTaskList(list(records))
+
+DATE_FORMATS = (
+    "%Y-%m-%d",  # 2025-08-05
+    "%d-%m-%Y",  # 05-08-2025
+    "%d/%m/%Y",  # 05/08/2025
+    "%m-%d-%Y",  # 08-05-2025
+)
+TIME_FORMATS = ("%I:%M %p", "%H:%M", "%I.%M %p")  # 12:30 PM, 23:30, 12.30 PM
+
+# Both go through utils: regex-matched formats and an LRU cache, no strptime
+def parse_task_datetime(date_str):
+    try:
+        return utils.parse_date(date_str, DATE_FORMATS)
+    except ValueError:
+        raise ValueError("❌ Invalid date format. Use YYYY-MM-DD, DD-MM-YYYY, DD/MM/YYYY, or MM-DD-YYYY") from None
+
+def parse_time(time_str):
+    try:
+        return utils.parse_time(time_str, TIME_FORMATS)
+    except ValueError:
+        raise ValueError("Invalid time format. Try '12:30 PM', '23:30' or '12.30 PM'.") from None
 
 def add_task():
     title = input("📝 Task Title: ")
@@ -86,89 +668,100 @@ def add_task():
     else:
         time_str = None
 
-    recurring = input("🔁 Recurring (daily/weekly/monthly/none): ").strip().lower()
-    if recurring not in ["daily", "weekly", "monthly",]:
+    recurring = input("🔁 Recurring (daily/weekly/monthly/yearly, e.g. weekly;interval=2;byday=MO,WE, or none): ").strip().lower()
+    if recurring in ("", "none", "no"):
         recurring = None
+    elif recurring:
+        try:
+            recurring = str(Rule.parse(recurring))
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
 
-    task = Task(title, category, str(due) if due else "", time_str if time_str else "", False, recurring)
-    tasks = load_tasks()
-    tasks.append(task)
-    save_tasks(tasks)
+    task = Task(title, category, str(due) if due else "", time_str if time_str else "", False, recurring,
+                created_at=task_times.now_moment())
+    append_task(task)
     print("✅ Task added successfully.")
 
+# Prints the tasks and returns them, so a number typed afterwards refers to
+# exactly the task that was on screen
 def list_tasks(filter_category=None):
-    tasks = load_tasks()
     if filter_category:
-        tasks = [t for t in tasks if t.category.lower() == filter_category.lower()]
+        tasks = query_tasks(category=filter_category)
+    else:
+        tasks = view_tasks()
 
     for i, task in enumerate(tasks, 1):
         status = "✅" if task.completed else "❌"
-        print(f"{i}. {task.title} [{task.category}] - {task.due or '-'} {task.time or ''} | {status}")
+        print(f"{i}. {task.title} [{task.category}] - {task.due or '-'} {task.time or ''} | {status}  ({task.id})")
+    return tasks
+
+# The task picked by list number or by ID, or None
+def choose_task(prompt):
+    shown = list_tasks()
+    choice = input(prompt).strip()
+    if choice.isdigit():
+        idx = int(choice) - 1
+        return shown[idx] if 0 <= idx < len(shown) else None
+    return get_task(normalize_id(choice))
 
 def complete_task():
-    tasks = load_tasks()
-    list_tasks()
     try:
-        idx = int(input("Enter task number to complete: ")) - 1
-        if 0 <= idx < len(tasks):
-            tasks[idx].completed = True
-            save_tasks(tasks)
-            print("✅ Task marked as completed.")
+        task = choose_task("Enter task number or ID to complete: ")
+        if task is None:
+            print("❗ No such task.")
+            return
+        update_task(task.id, expected=task, completed=True, completed_at=task_times.now_moment())
+        print("✅ Task marked as completed.")
+    except StoreConflict as e:
+        print(f"❗ Not saved: {e}. Please try again.")
     except:
         print("❗ Invalid input.")
 
 def delete_task():
-    tasks = load_tasks()
-    list_tasks()
     try:
-        idx = int(input("Enter task number to delete: ")) - 1
-        if 0 <= idx < len(tasks):
-            tasks.pop(idx)
-            save_tasks(tasks)
-            print("🗑️ Task deleted.")
+        task = choose_task("Enter task number or ID to delete: ")
+        if task is None:
+            print("❗ No such task.")
+            return
+        remove_task(task.id, expected=task)
+        print("🗑️ Task deleted.")
+    except StoreConflict as e:
+        print(f"❗ Not deleted: {e}. Please try again.")
     except:
         print("❗ Invalid input.")
 
+# Alarms in the next hour, straight from the fire-time index
 def show_upcoming():
-    tasks = load_tasks()
     now = datetime.now()
-    for task in tasks:
-        if task.due and task.time:
-            try:
-                task_time = parse_task_datetime(task.due, task.time)
-                remaining = task_time - now
-                if 0 <= remaining.total_seconds() <= 3600:
-                    print(f"⏰ Upcoming: {task.title} at {task_time.strftime('%Y-%m-%d %I:%M %p')} ({remaining})")
-                    if platform.system() == "Windows":
-                        winsound.Beep(1500, 300)
-            except Exception as e:
-                print(f"⚠️ Error with alarm: {e}")
+    for when, task_id in fire_schedule().between(now.timestamp(), now.timestamp() + 3600):
+        task = get_task(task_id)
+        if task is None:
+            continue
+        task_time = datetime.fromtimestamp(when)
+        print(f"⏰ Upcoming: {task.title} at {task_time.strftime('%Y-%m-%d %I:%M %p')} ({task_time - now})")
+        if platform.system() == "Windows":
+            winsound.Beep(1500, 300)
 
+# Completed recurring tasks come back as pending at their next occurrence
+# after now, however many periods they have missed, opened now; a task whose
+# series has ended stays completed
 def handle_recurring_tasks():
-    tasks = load_tasks()
-    updated = False
-    now = datetime.now()
-    for task in tasks:
-        if task.completed and task.recurring:
-            try:
-                due_time = parse_task_datetime(task.due, task.time)
-                if task.recurring == "daily":
-                    next_due = due_time + timedelta(days=1)
-                elif task.recurring == "weekly":
-                    next_due = due_time + timedelta(weeks=1)
-                elif task.recurring == "monthly":
-                    next_due = due_time + timedelta(days=30)
-
-                else:
+    def roll_over(tasks):
+        updated = False
+        now = datetime.now()
+        for task in tasks:
+            if task.completed and task.recurring:
+                changes = advance(task.to_dict(), now)
+                if changes is None:
                     continue
-                task.due = next_due.strftime("%Y-%m-%d")
-                task.time = next_due.strftime("%I:%M %p")
-                task.completed = False
+                for name, value in changes.items():
+                    setattr(task, name, value)
                 updated = True
-            except:
-                continue
-    if updated:
-        save_tasks(tasks)
+        return updated
+
+    if fire_schedule().rollover:  # otherwise there is nothing to roll over and no need to load the store
+        mutate_tasks(roll_over)
 
 def main():
     handle_recurring_tasks()
@@ -0,0 +1,287 @@
+# task_stats.py (incrementally kept productivity counters for TaskPilot)
+#
+# A TaskStats holds [total, completed] task counts per due day (task_times
+# due_day), overall and broken down by category and priority, and the same
+# counts over all tasks whatever their date. Every write takes the old
+# version of a task out and puts the new one in, so a report over any range
+# of days is a sum over that many buckets instead of a pass over every task.
+# Rolling trends and streaks are read from the same per-day table, so a
+# two-year trend costs about 730 lookups however many tasks there are.
+#
+# Completed tasks that record when they were completed also go into latency
+# sketches (see latency) per completion day, overall, by category and by
+# priority, so time-to-complete percentiles for any range merge that range's
+# sketches and never look at a task.
+#
+# The past occurrences a recurring task keeps in its history (see
+# recurrence.advance) are counted like tasks of their own on their due days.
+#
+# It also counts recurring tasks by schedule (due date and rule), so
+# occurrence counts cost one expansion per distinct schedule and need no pass
+# over the store either.
+#
+# Saved as encrypted JSON with the store version it matches, like
+# fire_index; see task_manager.productivity_stats(). Saving drops the per-day
+# counters older than KEEP_DAYS, so the file (rewritten on every task write)
+# stops growing; the overall counts stay exact, and a report reaching further
+# back rebuilds the counters from the store.
+
+import json
+import os
+import task_times
+from encryption import encrypt_data, decrypt_data
+from latency import Sketch, measures
+
+ALL = "*"
+FORMAT = 3  # saved counters in an older format are rebuilt
+KEEP_DAYS = 400  # per-day counters kept up to today: a year-long trend and its 30-day window
+DIMENSIONS = ("category", "priority")
+
+def _keys(record):
+    yield ALL
+    for dimension in DIMENSIONS:
+        value = record.get(dimension)
+        if value is not None:
+            yield f"{dimension}:{value}"
+
+def past_occurrences(record):
+    """Records for the occurrences a recurring task has moved past, with its category and priority"""
+    for past in record.get("history") or ():
+        yield dict(past, category=record.get("category"), priority=record.get("priority"))
+
+class TaskStats:
+    def __init__(self, version=None):
+        self.version = version
+        self.days = {}       # due_day -> {key: [total, completed]}
+        self.overall = {}    # key -> [total, completed], dated or not
+        self.recurring = {}  # "due_day|rule" -> number of recurring tasks with that schedule
+        self.latency = {}    # completion day -> {key: {metric: Sketch}}
+        self.since = None    # first day days/latency still count (see prune); None = every day
+
+    @classmethod
+    def build(cls, records, version=None):
+        stats = cls(version)
+        for record in records:
+            stats.track(record)
+        return stats
+
+    def track(self, record):
+        """Count a task being added; returns the record"""
+        self.add(record)
+        return record
+
+    def add(self, record, sign=1):
+        """Count `record` in (sign=1) or take it back out (sign=-1)"""
+        done = 1 if record.get("completed") is True else 0
+        day = record.get("due_day")
+        dated = day is not None and self.holds(day)
+        buckets = [self.overall]
+        if dated:
+            buckets.append(self.days.setdefault(day, {}))
+        for counts in buckets:
+            for key in _keys(record):
+                pair = counts.setdefault(key, [0, 0])
+                pair[0] += sign
+                pair[1] += sign * done
+                if pair[0] <= 0:
+                    del counts[key]
+        if dated and not self.days[day]:
+            del self.days[day]
+        if day is not None and isinstance(record.get("recurring"), str):
+            schedule = f"{day}|{record['recurring']}"
+            count = self.recurring.get(schedule, 0) + sign
+            if count > 0:
+                self.recurring[schedule] = count
+            else:
+                self.recurring.pop(schedule, None)
+        measured = measures(record)
+        if measured and self.holds(measured[0]):
+            finished, values = measured
+            by_key = self.latency.setdefault(finished, {})
+            for key in _keys(record):
+                sketches = by_key.setdefault(key, {})
+                for metric, seconds in values.items():
+                    sketch = sketches.setdefault(metric, Sketch())
+                    sketch.add(seconds, sign)
+                    if not sketch:
+                        del sketches[metric]
+                if not sketches:
+                    del by_key[key]
+            if not by_key:
+                del self.latency[finished]
+        for past in past_occurrences(record):
+            self.add(past, sign)
+
+    def holds(self, day):
+        """Whether the per-day counters still cover `day` (see prune)"""
+        return self.since is None or day >= self.since
+
+    def prune(self, today):
+        """Drop the per-day counters for days more than KEEP_DAYS before `today`"""
+        since = today - KEEP_DAYS + 1
+        if self.since is not None and self.since >= since:
+            return
+        self.since = since
+        self.days = {day: counts for day, counts in self.days.items() if day >= since}
+        self.latency = {day: by_key for day, by_key in self.latency.items() if day >= since}
+
+    def change(self, old, new):
+        """A task went from `old` to `new` (None for an add or a delete)"""
+        if old is not None:
+            self.add(old, -1)
+        if new is not None:
+            self.add(new)
+
+    # The days of `table` (self.days by default) from first to last
+    # (inclusive, None = open), walking the range when it is the shorter
+    def _days_between(self, first, last, table=None):
+        table = self.days if table is None else table
+        if first is not None and last is not None and last - first < len(table):
+            return (day for day in range(first, last + 1) if day in table)
+        return (day for day in table
+                if (first is None or day >= first) and (last is None or day <= last))
+
+    def totals(self, first=None, last=None, key=ALL):
+        """(total, completed) of tasks due from day `first` to `last`; no bounds = every task"""
+        if first is None and last is None:
+            return tuple(self.overall.get(key, (0, 0)))
+        total = completed = 0
+        for day in self._days_between(first, last):
+            pair = self.days[day].get(key)
+            if pair:
+                total += pair[0]
+                completed += pair[1]
+        return total, completed
+
+    def breakdown(self, dimension, first=None, last=None):
+        """{value: (total, completed)} of `dimension` ("category" or "priority") over a range of days"""
+        prefix = dimension + ":"
+        buckets = [self.overall] if first is None and last is None else \
+            [self.days[day] for day in self._days_between(first, last)]
+        result = {}
+        for counts in buckets:
+            for key, (total, completed) in counts.items():
+                if key.startswith(prefix):
+                    t, c = result.get(key[len(prefix):], (0, 0))
+                    result[key[len(prefix):]] = (t + total, c + completed)
+        return result
+
+    def schedules(self):
+        """(due_day, rule text, number of tasks) for each recurring schedule"""
+        for schedule, count in self.recurring.items():
+            day, _, rule = schedule.partition("|")
+            yield int(day), rule, count
+
+    def per_day(self, first, last, key=ALL):
+        """[(day, total, completed)] for each day with tasks in the range, in order"""
+        return [(day,) + tuple(self.days[day][key])
+                for day in sorted(self._days_between(first, last)) if key in self.days[day]]
+
+    def series(self, first, last, key=ALL):
+        """[(day, total, completed)] for every day from first to last, zeros included"""
+        counts = ((self.days.get(day) or {}).get(key) for day in range(first, last + 1))
+        return [(day, pair[0], pair[1]) if pair else (day, 0, 0)
+                for day, pair in zip(range(first, last + 1), counts)]
+
+    def rolling(self, first, last, window, key=ALL):
+        """[(day, total, completed)] summed over the `window` days ending on each day"""
+        daily = self.series(first - window + 1, last, key)
+        result = []
+        total = completed = 0
+        for i, (day, t, c) in enumerate(daily):
+            total += t
+            completed += c
+            if i >= window:
+                total -= daily[i - window][1]
+                completed -= daily[i - window][2]
+            if day >= first:
+                result.append((day, total, completed))
+        return result
+
+    # Runs of days on which every task due was completed. Days with nothing
+    # due neither extend nor break a run; a day with something left undone
+    # ends it.
+    def streaks(self, first, last, key=ALL):
+        """(current, longest): the run ending on `last`, and the longest run from first to last"""
+        run = longest = 0
+        for day, total, completed in self.per_day(first, last, key):
+            run = run + 1 if total and completed == total else 0
+            longest = max(longest, run)
+        return run, longest
+
+    def latency_sketch(self, metric, first=None, last=None, key=ALL):
+        """Merged Sketch of `metric` ("latency" or "overdue") for tasks completed from day first to last"""
+        merged = Sketch()
+        for day in self._days_between(first, last, self.latency):
+            sketch = self.latency[day].get(key, {}).get(metric)
+            if sketch:
+                merged.merge(sketch)
+        return merged
+
+    def latency_breakdown(self, metric, dimension, first=None, last=None):
+        """{value: Sketch} of `metric` by "category" or "priority" over a range of completion days"""
+        prefix = dimension + ":"
+        result = {}
+        for day in self._days_between(first, last, self.latency):
+            for key, sketches in self.latency[day].items():
+                if key.startswith(prefix) and metric in sketches:
+                    result.setdefault(key[len(prefix):], Sketch()).merge(sketches[metric])
+        return result
+
+    def to_json(self):
+        latency = {str(day): {key: {metric: sketch.to_json() for metric, sketch in sketches.items()}
+                              for key, sketches in by_key.items()}
+                   for day, by_key in self.latency.items()}
+        return json.dumps({"format": FORMAT, "version": self.version, "since": self.since, "overall": self.overall,
+                           "recurring": self.recurring, "latency": latency,
+                           "days": {str(day): counts for day, counts in self.days.items()}},
+                          separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        if data.get("format") != FORMAT:
+            raise ValueError("saved in an older format")
+        stats = cls(data.get("version"))
+        stats.since = data["since"]
+        stats.overall = data["overall"]
+        stats.recurring = data["recurring"]
+        stats.days = {int(day): counts for day, counts in data["days"].items()}
+        stats.latency = {int(day): {key: {metric: Sketch.from_json(sketch) for metric, sketch in sketches.items()}
+                                    for key, sketches in by_key.items()}
+                         for day, by_key in data["latency"].items()}
+        return stats
+
+    def save(self, path, version=None):
+        self.version = version
+        self.prune(task_times.today())
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(encrypt_data(self.to_json()))
+        os.replace(tmp, path)
+
+# The saved counters, or None if there are none (or they cannot be read)
+def load(path):
+    try:
+        with open(path, "rb") as f:
+            return TaskStats.from_json(decrypt_data(f.read()))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Could not read {path} ({str(e) or type(e).__name__}); rebuilding it")
+        return None
+
+# Mirror one task write that took the store from version - 1 to `version`;
+# counters that were already behind are left for the next reader to rebuild
+def record_change(path, version, old, new):
+    stats = load(path)
+    if stats is None or stats.version != version - 1:
+        return
+    stats.change(old, new)
+    stats.save(path, version)
+
+def reencrypt(path):
+    stats = load(path)
+    if stats is not None:
+        stats.save(path, stats.version)
@@ -0,0 +1,262 @@
+# task_table.py (column-oriented task storage for very large task sets)
+#
+# A TaskTable keeps tasks column by column instead of one object per task:
+#   title                                - u64 offset + u32 length into one UTF-8 blob
+#   category, recurring, priority        - u32 codes into one interned string table
+#   due                                  - i32 days since 1970-01-01 (task_codec.NO_DAY = None)
+#   time                                 - i16 minutes after midnight (task_codec.NO_TIME = None)
+#   completed                            - bit 0 of a u8 flags column
+#   id                                   - the 16 raw bytes of the ULID
+#   due_day, due_ts                      - no storage: derived from due and time
+# Any other field gets a plain list column. Values a column cannot hold
+# exactly (odd date strings, non-ULID ids ...) are kept as they are in a
+# per-row overflow dict, as task_codec does with its extras.
+#
+# table[i] is a TaskRow: it has the Task attributes and to_dict() and reads
+# and writes the columns directly. Rows are positional, so a row taken before
+# a pop() refers to whatever task moves into its place.
+
+from array import array
+import task_codec
+from task_codec import NO_DAY, NO_TIME
+from task_ids import id_to_bytes, id_from_bytes
+
+TEXT_FIELDS = ("category", "recurring", "priority")
+FIELDS = ("title", "category", "due", "time", "completed", "recurring", "priority", "id", "due_day", "due_ts")
+STAMP_FIELDS = ("due_day", "due_ts")
+ID_SIZE = 16
+FLAG_COMPLETED = 0x01
+
+_MISSING = object()  # the task has no such field
+NONE_CODE, MISSING_CODE = 0, 1
+NONE_LENGTH, MISSING_LENGTH = 0xFFFFFFFF, 0xFFFFFFFE
+
+class TaskTable:
+    def __init__(self, records=()):
+        self._strings = [None, _MISSING]
+        self._codes = {None: NONE_CODE}
+        self._text = {field: array("I") for field in TEXT_FIELDS}
+        self._title_starts = array("Q")
+        self._title_lengths = array("I")
+        self._titles = bytearray()
+        self._title_garbage = 0  # blob bytes no longer referenced by any row
+        self._days = array("i")
+        self._minutes = array("h")
+        self._flags = bytearray()
+        self._ids = bytearray()
+        self._other = {}     # field -> list, for fields without a column of their own
+        self._overflow = {}  # row -> {field: value} the columns cannot hold
+        self.extend(records)
+
+    def __len__(self):
+        return len(self._flags)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("task table index out of range")
+        return TaskRow(self, row)
+
+    def __iter__(self):
+        return (TaskRow(self, row) for row in range(len(self)))
+
+    def _intern(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    # Add a task (a Task, a TaskRow or a plain dict) at the end
+    def append(self, task):
+        record = task.to_dict() if hasattr(task, "to_dict") else task
+        row = len(self)
+        for column in self._text.values():
+            column.append(MISSING_CODE)
+        self._title_starts.append(0)
+        self._title_lengths.append(MISSING_LENGTH)
+        self._days.append(NO_DAY)
+        self._minutes.append(NO_TIME)
+        self._flags.append(0)
+        self._ids.extend(bytes(ID_SIZE))
+        for column in self._other.values():
+            column.append(_MISSING)
+        for field in ("due", "time", "completed", "id") + STAMP_FIELDS:
+            if field not in record:
+                self._overflow.setdefault(row, {})[field] = _MISSING
+        for field, value in record.items():
+            if field not in STAMP_FIELDS:
+                self.set(row, field, value)
+        for field in STAMP_FIELDS:  # after due and time, which they are checked against
+            if field in record:
+                self.set(row, field, record[field])
+
+    def extend(self, tasks):
+        for task in tasks:
+            self.append(task)
+
+    def get(self, row, field):
+        overflow = self._overflow.get(row)
+        if overflow and field in overflow:
+            return overflow[field]
+        if field in self._text:
+            return self._strings[self._text[field][row]]
+        if field == "title":
+            length = self._title_lengths[row]
+            if length == NONE_LENGTH:
+                return None
+            if length == MISSING_LENGTH:
+                return _MISSING
+            start = self._title_starts[row]
+            return self._titles[start:start + length].decode()
+        if field == "due":
+            return task_codec.day_string(self._days[row])
+        if field == "time":
+            return task_codec.time_string(self._minutes[row])
+        if field == "completed":
+            return bool(self._flags[row] & FLAG_COMPLETED)
+        if field == "id":
+            return id_from_bytes(self._ids[row * ID_SIZE:(row + 1) * ID_SIZE])
+        if field in STAMP_FIELDS:
+            return self._stamps(row)[STAMP_FIELDS.index(field)]
+        column = self._other.get(field)
+        return _MISSING if column is None else column[row]
+
+    def set(self, row, field, value):
+        overflow = self._overflow.get(row)
+        if overflow:
+            overflow.pop(field, None)
+            if field in ("due", "time"):
+                for name in STAMP_FIELDS:  # stamps follow the new due and time
+                    if overflow.get(name, _MISSING) is not _MISSING:
+                        del overflow[name]
+            if not overflow:
+                del self._overflow[row]
+        if field in self._text:
+            if value is None or isinstance(value, str):
+                self._text[field][row] = self._intern(value)
+                return
+            self._text[field][row] = NONE_CODE
+        elif field == "title":
+            self._drop_title(row)
+            if isinstance(value, str):
+                data = value.encode()
+                self._title_starts[row] = len(self._titles)
+                self._title_lengths[row] = len(data)
+                self._titles += data
+                return
+            self._title_lengths[row] = NONE_LENGTH
+            if value is None:
+                return
+        elif field == "due":
+            day = NO_DAY if value is None else task_codec.day_number(value)
+            self._days[row] = NO_DAY if day is None else day
+            if day is not None:
+                return
+        elif field == "time":
+            minute = NO_TIME if value is None else task_codec.minute_of_day(value)
+            self._minutes[row] = NO_TIME if minute is None else minute
+            if minute is not None:
+                return
+        elif field == "completed":
+            self._flags[row] = FLAG_COMPLETED if value is True else 0
+            if isinstance(value, bool):
+                return
+        elif field == "id":
+            raw = id_to_bytes(value)
+            if raw is not None:
+                self._ids[row * ID_SIZE:(row + 1) * ID_SIZE] = raw
+                return
+        elif field in STAMP_FIELDS:
+            derived = self._stamps(row)[STAMP_FIELDS.index(field)]
+            if value == derived and type(value) is type(derived):
+                return
+        else:
+            if field not in self._other:
+                self._other[field] = [_MISSING] * len(self)
+            self._other[field][row] = value
+            return
+        self._overflow.setdefault(row, {})[field] = value
+
+    # (due_day, due_ts) as the due and time columns give them
+    def _stamps(self, row):
+        day, minute = self._days[row], self._minutes[row]
+        if day == NO_DAY:
+            return None, None
+        return day, None if minute == NO_TIME else day * 86400 + minute * 60
+
+    def _drop_title(self, row):
+        length = self._title_lengths[row]
+        if length < MISSING_LENGTH:
+            self._title_garbage += length
+        self._title_lengths[row] = MISSING_LENGTH
+        if self._title_garbage > 4096 and self._title_garbage * 2 > len(self._titles):
+            self._compact_titles()
+
+    # Rewrite the title blob without the bytes of replaced or removed titles
+    def _compact_titles(self):
+        blob = bytearray()
+        for row, length in enumerate(self._title_lengths):
+            if length < MISSING_LENGTH:
+                start = self._title_starts[row]
+                self._title_starts[row] = len(blob)
+                blob += self._titles[start:start + length]
+        self._titles = blob
+        self._title_garbage = 0
+
+    def record(self, row):
+        """The task at `row` as a new dict, the same as Task.to_dict() gives"""
+        fields = ((field, self.get(row, field)) for field in FIELDS + tuple(self._other))
+        return {field: value for field, value in fields if value is not _MISSING}
+
+    def records(self):
+        return (self.record(row) for row in range(len(self)))
+
+    # Remove the task at `row` and return it as a dict
+    def pop(self, row=-1):
+        if row < 0:
+            row += len(self)
+        record = self.record(row)
+        self._drop_title(row)
+        for column in self._text.values():
+            del column[row]
+        del self._title_starts[row]
+        del self._title_lengths[row]
+        del self._days[row]
+        del self._minutes[row]
+        del self._flags[row]
+        del self._ids[row * ID_SIZE:(row + 1) * ID_SIZE]
+        for column in self._other.values():
+            del column[row]
+        self._overflow = {r - (r > row): values for r, values in self._overflow.items() if r != row}
+        return record
+
+class TaskRow:
+    """One row of a TaskTable, with the same attributes as Task"""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self._table._other:
+            raise AttributeError(name)
+        value = self._table.get(self._row, name)
+        return None if value is _MISSING else value
+
+    def to_dict(self):
+        return self._table.record(self._row)
+
+def _column(field):
+    def get(row):
+        value = row._table.get(row._row, field)
+        return None if value is _MISSING else value
+    def set(row, value):
+        row._table.set(row._row, field, value)
+    return property(get, set)
+
+for _field in FIELDS:
+    setattr(TaskRow, _field, _column(_field))
@@ -0,0 +1,114 @@
+# task_times.py (canonical integer due times for TaskPilot)
+#
+# Timezone policy: "due" and "time" are wall-clock values, as the user typed
+# them, in whatever timezone the user happens to be in; they carry no UTC
+# offset. Every record also gets two integers on that same wall clock,
+# filled in whenever the task is written:
+#   due_day - days since 1970-01-01 of the due date (None without a due date)
+#   due_ts  - seconds since 1970-01-01 00:00 of the due date and time
+#             (None unless the task has both)
+# so comparing, sorting and bucketing by due date is plain integer
+# arithmetic, and moving to another timezone or into DST never invalidates a
+# stored value. Only where a wall-clock time meets the real clock (alarms) is
+# it converted, with to_epoch() and local_now().
+#
+# The display strings stay the source of truth: due_day and due_ts are always
+# derived from them, never the other way round.
+#
+# created_at and completed_at follow the same policy: ISO "YYYY-MM-DDTHH:MM:SS"
+# strings on the wall clock (now_moment()), read back as due_ts-style
+# integers with parse_moment() so they can be compared with due times.
+
+import calendar
+import time
+from datetime import date, datetime, timedelta
+
+DAY = 86400
+EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+FIELDS = ("due_day", "due_ts")
+
+# Days since 1970-01-01 of a "YYYY-MM-DD" string (or a date), else None
+def parse_day(due):
+    if isinstance(due, date):
+        return due.toordinal() - EPOCH_ORDINAL
+    if not isinstance(due, str) or len(due) != 10:
+        return None
+    try:
+        return date.fromisoformat(due).toordinal() - EPOCH_ORDINAL
+    except ValueError:
+        return None
+
+# Seconds after midnight of an "HH:MM AM" string (or 24-hour "HH:MM"), else None
+def parse_time(time_str):
+    if not isinstance(time_str, str):
+        return None
+    text = time_str.strip().upper()
+    clock, _, half = text.partition(" ")
+    hours, sep, minutes = clock.partition(":")
+    if not (sep and hours.isdigit() and minutes.isdigit() and len(minutes) == 2):
+        return None
+    h, m = int(hours), int(minutes)
+    if half in ("AM", "PM"):
+        if not 1 <= h <= 12:
+            return None
+        h = h % 12 + (12 if half == "PM" else 0)
+    elif half or h > 23:
+        return None
+    return h * 3600 + m * 60 if m < 60 else None
+
+def stamps(due, time_str):
+    """(due_day, due_ts) for a task's due date and time strings"""
+    day = parse_day(due)
+    if day is None:
+        return None, None
+    seconds = parse_time(time_str)
+    return day, None if seconds is None else day * DAY + seconds
+
+def stamp(record):
+    """Fill in a record's due_day and due_ts from its due and time; returns the record"""
+    record["due_day"], record["due_ts"] = stamps(record.get("due"), record.get("time"))
+    return record
+
+def is_stamped(record):
+    return "due_day" in record and "due_ts" in record
+
+def to_epoch(due_ts):
+    """Epoch seconds (UTC) of a wall-clock due_ts in the current local timezone"""
+    return time.mktime(time.gmtime(due_ts)[:8] + (-1,))
+
+def local_now(now=None):
+    """The current wall-clock time as a due_ts-style integer"""
+    return calendar.timegm(time.localtime(now))
+
+def today():
+    """Today's date as a due_day-style integer"""
+    return local_now() // DAY
+
+def to_datetime(due_ts):
+    """Naive wall-clock datetime of a due_ts"""
+    return EPOCH + timedelta(seconds=due_ts)
+
+def to_date(due_day):
+    return date.fromordinal(due_day + EPOCH_ORDINAL)
+
+# Seconds since 1970-01-01 00:00 (wall clock, like due_ts) of an ISO
+# date-time string, fractions of a second dropped; None if it is not one
+def parse_moment(text):
+    if not isinstance(text, str):
+        return None
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return (moment - EPOCH) // timedelta(seconds=1)
+
+def moment_string(seconds):
+    """ISO "YYYY-MM-DDTHH:MM:SS" string of a parse_moment()-style integer"""
+    return to_datetime(seconds).isoformat(timespec="seconds")
+
+def now_moment():
+    """The current wall-clock time as an ISO string, for created_at / completed_at"""
+    return moment_string(local_now())
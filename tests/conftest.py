@@ -0,0 +1,48 @@
+import importlib
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+GUI = os.path.join(ROOT, "GUI BASED TO DO")
+# GUI modules whose names root modules also use
+GUI_MODULES = ("encryption", "task_manager", "alarm_system", "reports", "task_data", "task_utils", "cli_main")
+
+import encryption
+import sqlite_store
+import task_manager
+
+# A throw-away store (and key) in tmp_path, in the given storage mode
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    encryption.keyring.invalidate()
+    encryption.initialize_encryption()
+    task_manager.repository.invalidate()
+    monkeypatch.setattr(task_manager, "_ids_checked", False)
+    monkeypatch.setattr(sqlite_store, "_local", threading.local())  # connections to the last test's database
+
+    def use(mode="journal"):
+        monkeypatch.setattr(task_manager, "STORAGE_MODE", mode)
+        task_manager.repository.invalidate()
+        return task_manager
+
+    yield use
+    task_manager.repository.invalidate()
+    encryption.keyring.invalidate()
+
+# Imports modules of the GUI app by name (its own encryption, reports ...
+# rather than the root ones) in a throw-away working directory with a key
+@pytest.fixture
+def gui(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(GUI)
+    for name in GUI_MODULES:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    importlib.import_module("encryption").initialize_encryption()
+    yield importlib.import_module
+    for name in GUI_MODULES:
+        sys.modules.pop(name, None)
@@ -0,0 +1,28 @@
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import alarm_system
+import fire_index
+
+class Recorder:
+    def __init__(self):
+        self.fired = []
+
+    def submit(self, title, when):
+        self.fired.append(title)
+
+def test_an_alarm_fires_once_however_often_the_store_changes(store, monkeypatch):
+    tm = store("journal")
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    tm.save_tasks([tm.Task("once", due=tomorrow, time="09:00 AM")])
+    when = fire_index.fire_time(tm.load_tasks()[0].to_dict())
+    monkeypatch.setattr(alarm_system, "time", SimpleNamespace(time=lambda: when + 5))
+
+    dispatcher = Recorder()
+    scheduler = alarm_system.AlarmScheduler(dispatcher)
+    scheduler.refresh()
+    scheduler._fire_due()
+    tm.append_task(tm.Task("unrelated"))
+    scheduler.refresh()
+    scheduler._fire_due()
+    assert dispatcher.fired == ["once"]
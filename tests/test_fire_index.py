@@ -0,0 +1,48 @@
+import os
+from datetime import date, timedelta
+
+import fire_index
+
+def _day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+def _schedule(tm):
+    return [(when, task_id) for when, task_id in tm.fire_schedule().between(0, float("inf"))]
+
+def _rebuilt(tm):
+    index = fire_index.FireIndex.build(t.to_dict() for t in tm.load_tasks())
+    return [(when, task_id) for when, task_id in index.between(0, float("inf"))]
+
+def test_writes_append_to_the_log_and_leave_the_snapshot(store):
+    tm = store("journal")
+    tm.save_tasks([tm.Task(f"t{i}", due=_day(i % 5 + 1), time="09:00 AM") for i in range(50)] +
+                  [tm.Task("past", due=_day(-2), time="09:00 AM")])
+    tm.fire_schedule()
+    snapshot = os.stat(fire_index.INDEX_FILE)
+    tasks = tm.load_tasks()
+    tm.update_task(tasks[0].id, expected=tasks[0], completed=True)
+    tm.update_task(tasks[1].id, expected=tasks[1], due=_day(9))
+    tm.remove_task(tasks[2].id, expected=tasks[2])
+    tm.append_task(tm.Task("new", due=_day(3), time="10:00 AM"))
+
+    assert os.stat(fire_index.INDEX_FILE).st_mtime_ns == snapshot.st_mtime_ns
+    assert fire_index.load().version == tm.store_version()
+    assert sorted(_schedule(tm)) == sorted(_rebuilt(tm)) and len(_schedule(tm)) == 49  # 50 - 2 + 1, none past
+    assert all(len(entry) == 2 for entry in fire_index.load().between(0, float("inf")))  # no titles
+
+def test_the_log_is_folded_into_the_snapshot(store, monkeypatch):
+    tm = store("journal")
+    monkeypatch.setattr(fire_index, "COMPACT_THRESHOLD", 2000)
+    tm.save_tasks([tm.Task("a", due=_day(1), time="09:00 AM")])
+    for i in range(30):
+        tm.append_task(tm.Task(f"t{i}", due=_day(2), time="09:00 AM"))
+    assert os.path.getsize(fire_index.LOG_FILE) < 2000
+    assert len(_schedule(tm)) == 31 and sorted(_schedule(tm)) == sorted(_rebuilt(tm))
+
+def test_a_torn_log_line_means_a_rebuild(store):
+    tm = store("journal")
+    tm.save_tasks([tm.Task("a", due=_day(1), time="09:00 AM")])
+    with open(fire_index.LOG_FILE, "ab") as f:
+        f.write(b"gAAAA")
+    tm.append_task(tm.Task("b", due=_day(2), time="09:00 AM"))
+    assert len(_schedule(tm)) == 2 and fire_index.load().version == tm.store_version()
@@ -0,0 +1,70 @@
+import re
+import subprocess
+import sys
+from datetime import timedelta
+
+import pytest
+
+import task_times
+from analytics import build_stats
+from conftest import GUI, ROOT
+
+def test_reports_run_over_the_gui_task_file(gui, capsys):
+    task_data = gui("task_data")
+    reports = gui("reports")
+    today = task_times.to_date(task_times.today())
+    task_data.save_tasks([
+        task_data.Task("Done", "Work", today.isoformat(), "09:00 AM", True, priority="High",
+                       created_at=f"{today.isoformat()}T08:00:00", completed_at=f"{today.isoformat()}T10:00:00"),
+        task_data.Task("Open", "Work", today.isoformat(), None, False, priority="High"),
+        task_data.Task("Old", "Home", (today - timedelta(days=3)).isoformat(), None, True),
+    ])
+    assert [t.title for t in task_data.load_tasks()] == ["Done", "Open", "Old"]
+
+    reports.show_productivity_report("daily")
+    out = capsys.readouterr().out
+    assert "Completed Tasks: 1" in out and "Total Tasks: 2" in out and "High priority pending: 1" in out
+    reports.show_productivity_report("range", today - timedelta(days=7), today)
+    assert "Total Tasks: 3" in capsys.readouterr().out
+    reports.show_trend_report(7)
+    assert "Current streak" in capsys.readouterr().out
+
+def test_cli_menu_modules_import(gui):
+    cli_main = gui("cli_main")
+    assert cli_main.show_productivity_report is gui("reports").show_productivity_report
+    assert gui("task_utils").parse_task_datetime("2025-03-01", "2:30 PM").isoformat() == "2025-03-01T14:30:00"
+
+# Run from the GUI directory as the app is, its own modules win and the
+# shared ones come from the TaskPilot directory
+def test_gui_imports_the_shared_modules_from_the_root():
+    names = ["encryption", "reports", "sqlite_store", "task_stats", "recurrence", "utils"]
+    code = "import reports, sqlite_store, task_utils, os; " \
+           f"print([os.path.dirname(os.path.abspath(__import__(n).__file__)) for n in {names}])"
+    out = subprocess.run([sys.executable, "-c", code], cwd=GUI, capture_output=True, text=True, check=True).stdout
+    assert eval(out) == [GUI, GUI, ROOT, ROOT, ROOT, ROOT]
+
+def test_dashboard_streak_line(gui):
+    reports = gui("reports")
+    task_data = gui("task_data")
+    today = task_times.today()
+    tasks = [task_data.Task(f"d{i}", due=task_times.to_date(today - i).isoformat(), completed=i != 3)
+             for i in range(6)]
+    stats = build_stats(task_times.stamp(t.to_dict()) for t in tasks)
+    assert reports.streak_line(stats, today) == "🔥 Streak: 3 day(s) (best: 3)"
+
+def test_dashboard_latency_line(gui):
+    reports = gui("reports")
+    task_data = gui("task_data")
+    today = task_times.to_date(task_times.today()).isoformat()
+    tasks = [task_data.Task(f"t{hours}", due=today, completed=True, created_at=f"{today}T00:00:00",
+                            completed_at=f"{today}T{hours:02d}:00:00") for hours in range(1, 11)]
+    tasks.append(task_data.Task("old", due="2000-01-01", completed=True, created_at="2000-01-01T00:00:00",
+                                completed_at="2000-01-02T00:00:00"))
+    stats = build_stats(task_times.stamp(t.to_dict()) for t in tasks)
+    line = reports.latency_line(stats, task_times.today())
+    match = re.fullmatch(r"⏱️ Time to complete \(30 days\): median (\d+)h (\d+)m, p90 (\d+)h (\d+)m", line)
+    assert match, line
+    hours, minutes, p90_hours, p90_minutes = map(int, match.groups())
+    # The sketch is accurate to 1%; the 2000 task falls outside the window
+    assert hours * 60 + minutes == pytest.approx(300, rel=0.01)
+    assert p90_hours * 60 + p90_minutes == pytest.approx(540, rel=0.01)
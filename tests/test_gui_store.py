@@ -0,0 +1,37 @@
+import os
+import sys
+import threading
+
+import pytest
+
+pytest.importorskip("PyQt6")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "GUI BASED TO DO"))
+import taskpilot_gui
+
+def test_reload_during_save_never_sees_a_partial_file(store):
+    store()
+    manager = taskpilot_gui.TaskManager
+    tasks = [taskpilot_gui.Task(f"task {i}") for i in range(20000)]
+    manager.save_tasks(tasks, "alice")
+    seen = []
+    done = threading.Event()
+
+    def reload():
+        while not done.is_set():
+            loaded = manager.load_tasks("alice")
+            seen.append(None if loaded is None else len(loaded))
+
+    reader = threading.Thread(target=reload)
+    reader.start()
+    for _ in range(5):
+        manager.save_tasks(tasks, "alice")
+    done.set()
+    reader.join()
+    assert seen and set(seen) == {20000}
+
+def test_unreadable_file_is_not_an_empty_list(store):
+    store()
+    os.makedirs("storage", exist_ok=True)
+    with open(taskpilot_gui.TASK_FILE_TEMPLATE.format(username="bob"), "wb") as f:
+        f.write(b"not a token")
+    assert taskpilot_gui.TaskManager.load_tasks("bob") is None
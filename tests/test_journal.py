@@ -0,0 +1,46 @@
+import multiprocessing
+import sys
+
+import pytest
+
+import journal
+import task_manager
+
+# Appends from one process, with compactions running in its background
+def _append_many(worker, count, threshold):
+    journal.COMPACT_THRESHOLD = threshold
+    for i in range(count):
+        task_manager.append_task(task_manager.Task(f"worker {worker} task {i}"))
+    if task_manager._compaction:
+        task_manager._compaction.join()
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses fork")
+def test_concurrent_compaction_keeps_every_append(store):
+    store("journal")
+    workers, count = 4, 150
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_append_many, args=(w, count, 3000)) for w in range(workers)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+
+    task_manager.repository.invalidate()
+    titles = sorted(t.title for t in task_manager.load_tasks())
+    assert titles == sorted(f"worker {w} task {i}" for w in range(workers) for i in range(count))
+
+def test_compaction_gives_up_on_a_snapshot_rewritten_meanwhile(store, monkeypatch):
+    tm = store("journal")
+    tm.append_task(tm.Task("first"))
+    encode = tm._encode_snapshot
+
+    def save_during_encode(records):
+        monkeypatch.setattr(tm, "_encode_snapshot", encode)
+        tm.save_tasks([tm.Task("saved"), tm.Task("meanwhile")])
+        return encode(records)
+
+    monkeypatch.setattr(tm, "_encode_snapshot", save_during_encode)
+    assert tm.compact_journal()
+    tm.repository.invalidate()
+    assert [t.title for t in tm.load_tasks()] == ["saved", "meanwhile"]
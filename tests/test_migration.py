@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import encryption
+import task_manager
+
+MODES = ["journal", "json", "sqlite", "records", "stream", "sharded"]
+
+# Tasks as the very first TaskPilot wrote them: no ids, no due_day/due_ts,
+# no created_at/completed_at
+ORIGINAL = [
+    {"title": "Pay rent", "category": "Home", "due": "2025-03-01", "time": "09:00 AM", "completed": False,
+     "recurring": "monthly"},
+    {"title": "Report", "category": "Work", "due": "2025-03-05", "time": None, "completed": False, "recurring": None},
+    {"title": "Old", "category": "Work", "due": None, "time": None, "completed": True, "recurring": None},
+]
+
+def _original_store():
+    with open(task_manager.TASK_FILE, "wb") as f:
+        f.write(encryption.encrypt_data(json.dumps(ORIGINAL)))
+
+def _complete_and_delete(tm):
+    tasks = {t.title: t for t in tm.load_tasks()}
+    tm.update_task(tasks["Report"].id, expected=tasks["Report"], completed=True, completed_at="2025-03-04T10:00:00")
+    tm.remove_task(tasks["Old"].id, expected=tasks["Old"])
+    rent = tasks["Pay rent"]
+    tm.update_task(rent.id, expected=rent, due="2025-04-01")
+
+    tm.repository.invalidate()
+    tasks = {t.title: t for t in tm.load_tasks()}
+    assert sorted(tasks) == ["Pay rent", "Report"]
+    assert tasks["Report"].completed and tasks["Report"].completed_at == "2025-03-04T10:00:00"
+    assert tasks["Pay rent"].due == "2025-04-01" and tasks["Pay rent"].due_day is not None
+
+def test_original_snapshot_migrates_through_complete_and_delete(store):
+    tm = store("journal")
+    _original_store()
+    _complete_and_delete(tm)
+    assert all(t.id for t in tm.load_tasks())
+
+# Records with ids and due stamps but without the timestamps added later,
+# as each backend stored them before created_at/completed_at existed
+@pytest.mark.parametrize("mode", MODES)
+def test_records_without_timestamps_complete_and_delete(store, mode):
+    tm = store(mode)
+    records = []
+    for i, record in enumerate(ORIGINAL):
+        record = dict(record, id=f"0000000000000000000000000{i}")
+        record["due_day"], record["due_ts"] = tm.task_times.stamps(record["due"], record["time"])
+        records.append(record)
+    tm._save_records(records)
+    tm._bump_version()
+    _complete_and_delete(tm)
@@ -0,0 +1,94 @@
+import calendar
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from analytics import build_stats
+from recurrence import HISTORY_DAYS, Rule, advance, occurrences, rule_for
+import task_stats
+import task_times
+from task_stats import KEEP_DAYS, TaskStats
+
+@pytest.mark.parametrize("text", ["daily;interval=7;byday=MO", "daily;interval=14;byday=MO,TU"])
+def test_daily_byday_on_a_whole_number_of_weeks_is_rejected(text):
+    with pytest.raises(ValueError):
+        Rule.parse(text)
+
+@pytest.mark.parametrize("interval", [1, 2, 3, 4, 5, 6, 8, 9, 13])
+def test_daily_byday_always_finds_a_day(interval):
+    rule = Rule("daily", interval=interval, byday=[0])
+    for start in (date(2025, 1, 6) + timedelta(days=k) for k in range(7)):
+        first = next(occurrences(rule, start))
+        assert first.weekday() == 0 and (first - start).days % interval == 0
+
+def test_monthly_series_keeps_its_day_after_a_short_month():
+    record = {"due": "2025-01-31", "time": "09:00 AM", "recurring": "monthly"}
+    dues = []
+    for _ in range(4):
+        record.update(advance(record, datetime(2025, 1, 1)))
+        dues.append(record["due"])
+    assert dues == ["2025-02-28", "2025-03-31", "2025-04-30", "2025-05-31"]
+    assert Rule.parse(record["recurring"]).start == date(2025, 1, 31)
+
+def test_an_edited_due_date_re_anchors_the_series():
+    record = {"due": "2025-06-15", "recurring": "monthly;start=2025-01-31"}
+    changes = advance(record, datetime(2025, 1, 1))
+    assert (changes["due"], changes["recurring"]) == ("2025-07-15", "monthly;start=2025-06-15")
+
+def test_roll_over_keeps_the_anchor(store):
+    tm = store("journal")
+    tm.save_tasks([tm.Task("Rent", due="2025-01-31", completed=True, recurring="monthly")])
+    tm.handle_recurring_tasks()
+    task, = tm.load_tasks()
+    assert task.due > "2025-01-31" and not task.completed
+    assert rule_for(task.recurring).start == date(2025, 1, 31)
+    assert int(task.due[-2:]) == calendar.monthrange(int(task.due[:4]), int(task.due[5:7]))[1]
+
+@pytest.mark.parametrize("mode", ["journal", "sqlite", "records"])
+def test_completed_occurrences_stay_counted_after_roll_over(store, mode):
+    tm = store(mode)
+    due = (date.today() - timedelta(days=3)).isoformat()
+    tm.save_tasks([tm.Task("Standup", due=due, time="09:00 AM", recurring="daily",
+                           created_at=f"{due}T08:00:00")])
+    task, = tm.load_tasks()
+    tm.update_task(task.id, expected=task, completed=True, completed_at=f"{due}T09:30:00")
+    tm.handle_recurring_tasks()
+    task, = tm.load_tasks()
+    assert not task.completed and task.history[0]["completed_at"] == f"{due}T09:30:00"
+
+    day = task.history[0]["due_day"]
+    for stats in (tm.productivity_stats(), TaskStats.build(t.to_dict() for t in tm.load_tasks()),
+                  build_stats(t.to_dict() for t in tm.load_tasks())):
+        assert stats.totals(day, day) == (1, 1)
+        assert stats.latency[day]["*"]["latency"].quantile(0.5) == pytest.approx(5400, rel=0.01)
+
+def test_saved_counters_keep_a_bounded_number_of_days(store):
+    tm = store("journal")
+    today = date.today()
+    old, recent = (today - timedelta(days=KEEP_DAYS + 30)).isoformat(), (today - timedelta(days=5)).isoformat()
+    tm.save_tasks([tm.Task("Old", due=old, completed=True, created_at=f"{old}T08:00:00",
+                           completed_at=f"{old}T09:00:00"),
+                   tm.Task("Recent", due=recent)])
+    stats = tm.productivity_stats()
+    first = task_times.parse_day(old)
+    assert first not in stats.days and first not in stats.latency
+    assert stats.totals() == (2, 1) and stats.totals(first, first + 1) == (0, 0)
+    # a report reaching back past the kept days counts from the store
+    assert tm.productivity_stats(first).totals(first, first) == (1, 1)
+    assert tm.productivity_stats(first).latency_sketch("latency", first, first).quantile(0.5) == pytest.approx(3600, rel=0.01)
+
+    old_task = next(t for t in tm.load_tasks() if t.title == "Old")
+    tm.remove_task(old_task.id, expected=old_task)
+    stats = task_stats.load(tm.STATS_FILE)
+    assert stats.version == tm.store_version() and stats.totals() == (1, 0) and first not in stats.days
+
+def test_history_keeps_recent_completed_occurrences_only():
+    today = date.today()
+    record = {"due": (today - timedelta(days=2)).isoformat(), "time": "09:00 AM", "recurring": "daily"}
+    assert advance(record, datetime.now())["history"] == []  # rolled on by an alarm, never done
+
+    stale = {"due_day": task_times.today() - HISTORY_DAYS, "due_ts": None, "completed": True,
+             "created_at": None, "completed_at": None}
+    record.update(completed=True, history=[stale])
+    history = advance(record, datetime.now())["history"]
+    assert [past["due_day"] for past in history] == [task_times.today() - 2]
@@ -0,0 +1,23 @@
+import shard_store
+
+def test_writes_keep_the_cache_in_shard_order(store, monkeypatch):
+    tm = store("sharded")
+    tm.save_tasks([tm.Task(f"T{m}", due=f"2025-{m:02d}-15") for m in range(1, 13)] + [tm.Task("Someday")])
+    tasks = {t.title: t for t in tm.load_tasks()}
+
+    read = []
+    real = shard_store._read_shards
+    monkeypatch.setattr(shard_store, "_read_shards", lambda entries: read.extend(entries) or real(entries))
+    tm.update_task(tasks["T3"].id, expected=tasks["T3"], completed=True)
+    tm.update_task(tasks["T1"].id, expected=tasks["T1"], due="2025-06-01")
+    tm.update_task(tasks["Someday"].id, expected=tasks["Someday"], due="2025-02-02")
+    tm.update_task(tasks["T12"].id, expected=tasks["T12"], due=None)
+    tm.remove_task(tasks["T7"].id, expected=tasks["T7"])
+    tm.append_task(tm.Task("New", due="2025-04-01"))
+    assert len(read) <= 10  # one or two shards per write, none to reload the cache
+
+    cached = tm.repository.records()
+    assert tm.repository.is_fresh() and cached == shard_store.load_records()
+    assert [t["title"] for t in cached][:3] == ["T2", "Someday", "T3"]
+    for title in ("T1", "Someday", "New"):
+        assert tm.get_task(next(t["id"] for t in cached if t["title"] == title)).title == title
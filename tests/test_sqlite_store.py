@@ -0,0 +1,62 @@
+import multiprocessing
+import sqlite3
+import threading
+
+import sqlite_store
+
+def _tasks(tm):
+    return {t.title: t for t in tm.load_tasks()}
+
+def test_updates_find_their_row_by_id_past_an_unreadable_one(store):
+    tm = store("sqlite")
+    tm.save_tasks([tm.Task("A"), tm.Task("B"), tm.Task("C")])
+    a = _tasks(tm)["A"]
+    conn = sqlite_store.connect()
+    with conn:
+        conn.execute("UPDATE tasks SET data = ? WHERE uid = ?", (b"not a token", a.id))
+    tm.repository.invalidate()
+
+    tasks = _tasks(tm)
+    assert sorted(tasks) == ["B", "C"]
+    tm.update_task(tasks["B"].id, expected=tasks["B"], completed=True)
+    tm.remove_task(tasks["C"].id, expected=tasks["C"])
+
+    tm.repository.invalidate()
+    tasks = _tasks(tm)
+    assert sorted(tasks) == ["B"] and tasks["B"].completed
+    assert conn.execute("SELECT data FROM tasks WHERE uid = ?", (a.id,)).fetchone()[0] == b"not a token"
+
+def test_databases_without_uids_get_them(store):
+    tm = store("sqlite")
+    tm.save_tasks([tm.Task("A"), tm.Task("B")])
+    ids = {t.title: t.id for t in tm.load_tasks()}
+    sqlite_store.connect().close()
+    sqlite_store._local.conn = None  # reconnect, migrating, after the column is gone
+    old = sqlite3.connect(sqlite_store.DB_FILE)
+    with old:
+        old.execute("DROP INDEX idx_tasks_uid")
+        old.execute("ALTER TABLE tasks DROP COLUMN uid")
+    old.close()
+
+    tasks = _tasks(tm)
+    tm.update_task(ids["A"], expected=tasks["A"], title="A2")
+    tm.repository.invalidate()
+    assert sorted(t.title for t in tm.load_tasks()) == ["A2", "B"]
+
+def _open_fresh(barrier, keys):
+    sqlite_store._local = threading.local()
+    barrier.wait()
+    keys.put(sqlite_store._index_key())
+
+def test_processes_opening_a_new_database_share_one_index_key(store):
+    store("sqlite")
+    context = multiprocessing.get_context("fork")
+    barrier, keys = context.Barrier(4), context.Queue()
+    workers = [context.Process(target=_open_fresh, args=(barrier, keys)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    found = {keys.get(timeout=30) for _ in workers}
+    for worker in workers:
+        worker.join()
+    assert len(found) == 1 and all(worker.exitcode == 0 for worker in workers)
+    assert sqlite_store._index_key() in found
@@ -0,0 +1,22 @@
+import pytest
+
+import task_manager
+import utils
+
+@pytest.mark.parametrize("text", ["14.30", "12.30", "12.30pm"])
+def test_cli_takes_no_dotted_times_its_formats_do_not_list(text):
+    with pytest.raises(ValueError):
+        task_manager.parse_time(text)
+
+@pytest.mark.parametrize("text, expected", [("12.30 PM", "12:30 PM"), ("23:30", "11:30 PM"), ("9:05 am", "09:05 AM")])
+def test_cli_times(text, expected):
+    assert task_manager.parse_time(text) == expected
+
+def test_dots_read_as_colons_when_asked():
+    assert utils.parse_time("14.30", dots=True) == "02:30 PM"
+    assert utils.parse_times(["14.30", "12.30pm", "14.30"], utils.TIME_FORMATS + ("%I:%M%p",), dots=True) == \
+        ["02:30 PM", "12:30 PM", "02:30 PM"]
+    assert utils.parse_times(["14.30"]) == [None]
+
+def test_gui_still_reads_dotted_times(gui):
+    assert gui("task_utils").parse_time("12.30pm") == "12:30 PM"
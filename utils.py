@@ -0,0 +1,130 @@
+# utils.py (date and time parsing for TaskPilot)
+#
+# parse_date() and parse_time() accept the same strptime formats as before,
+# tried in the same order, but each format is compiled once into a regex and
+# a miss is just a failed match: no strptime call and no exception per format
+# tried. Results for repeated strings come from a bounded LRU cache.
+# parse_time(dots=True) also reads "." as ":" ("12.30pm"), as the GUI always
+# has; the CLI only takes the dotted times its formats spell out.
+#
+# parse_dates() / parse_times() take a whole column (an import, a migration)
+# in one call, parsing each distinct string in it once, without going through
+# (or flushing) the shared cache.
+
+import re
+from datetime import date
+from functools import lru_cache
+
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d")
+TIME_FORMATS = ("%I:%M %p", "%H:%M", "%I:%M%p")
+CACHE_SIZE = 4096  # distinct strings remembered per parser
+
+_FIELDS = {
+    "Y": r"(?P<Y>\d{4})",
+    "m": r"(?P<m>\d{1,2})",
+    "d": r"(?P<d>\d{1,2})",
+    "H": r"(?P<H>\d{1,2})",
+    "I": r"(?P<I>\d{1,2})",
+    "M": r"(?P<M>\d{1,2})",
+    "p": r"(?P<p>[AP]M)",
+}
+
+# A strptime format as an anchored, case-insensitive regex (as strict as
+# strptime for the directives above; whitespace matches any run of it)
+@lru_cache(maxsize=None)
+def _compile(fmt):
+    pattern = []
+    i = 0
+    while i < len(fmt):
+        if fmt[i] == "%":
+            pattern.append(_FIELDS[fmt[i + 1]])
+            i += 2
+        else:
+            pattern.append(r"\s+" if fmt[i].isspace() else re.escape(fmt[i]))
+            i += 1
+    return re.compile("".join(pattern), re.ASCII | re.IGNORECASE).fullmatch
+
+def _to_date(fields):
+    try:
+        return date(int(fields["Y"]), int(fields["m"]), int(fields["d"]))
+    except ValueError:
+        return None
+
+def _to_time(fields):
+    minute = int(fields["M"])
+    if "H" in fields:
+        hour = int(fields["H"])
+        if hour > 23:
+            return None
+    else:
+        hour = int(fields["I"])
+        if not 1 <= hour <= 12:
+            return None
+        hour %= 12
+        if (fields.get("p") or "").upper() == "PM":
+            hour += 12
+    if minute > 59:
+        return None
+    return f"{(hour % 12) or 12:02d}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+# The value read by the first format that fits `text`, or None
+def _match(text, formats, convert):
+    for fmt in formats:
+        match = _compile(fmt)(text)
+        if match:
+            value = convert(match.groupdict())
+            if value is not None:
+                return value
+    return None
+
+def _clean_time(text, dots=False):
+    text = text.strip().upper()
+    return text.replace(".", ":") if dots else text
+
+def _clean_dotted_time(text):
+    return _clean_time(text, True)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_date(text, formats):
+    return _match(text, formats, _to_date)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_time(text, formats, dots):
+    return _match(_clean_time(text, dots), formats, _to_time)
+
+def parse_date(date_str, formats=DATE_FORMATS):
+    """The date in `date_str`, read with the first of `formats` that fits"""
+    value = _cached_date(date_str, tuple(formats))
+    if value is None:
+        raise ValueError(f"Date format not recognized: {date_str}")
+    return value
+
+def parse_time(time_str, formats=TIME_FORMATS, dots=False):
+    """`time_str` as a canonical "HH:MM AM" string ("23:30" is fine too, and "12.30pm" with dots)"""
+    value = _cached_time(time_str, tuple(formats), dots)
+    if value is None:
+        raise ValueError(f"Time format not recognized: {time_str}")
+    return value
+
+def _parse_column(values, formats, convert, clean=None):
+    formats = tuple(formats)
+    seen = {}
+    results = []
+    for text in values:
+        if text in seen:
+            results.append(seen[text])
+            continue
+        value = None
+        if isinstance(text, str) and text:
+            value = _match(clean(text) if clean else text, formats, convert)
+        seen[text] = value
+        results.append(value)
+    return results
+
+def parse_dates(values, formats=DATE_FORMATS):
+    """Dates for a column of strings, None where one cannot be read (or is empty)"""
+    return _parse_column(values, formats, _to_date)
+
+def parse_times(values, formats=TIME_FORMATS, dots=False):
+    """Canonical "HH:MM AM" strings for a column of times, None where one cannot be read"""
+    return _parse_column(values, formats, _to_time, _clean_dotted_time if dots else _clean_time)
@@ -0,0 +1,143 @@
+# watcher.py (store change notifications for TaskPilot)
+#
+# A StoreWatcher calls on_change() from a background thread whenever one of
+# the watched files has been written, replaced or removed. On Linux it
+# blocks on inotify (through ctypes, no extra dependency) on the files'
+# directories, since the stores are replaced with os.replace rather than
+# written in place. Elsewhere, or if inotify is unavailable, it falls back
+# to comparing stat() results every POLL_INTERVAL seconds.
+#
+# Either way on_change() only runs when the files' (mtime, size, inode)
+# differ from the last ones seen, and acknowledge() marks the current state
+# as seen, so a process can skip the events caused by its own writes.
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+POLL_INTERVAL = 2  # seconds, stat fallback only
+DEBOUNCE = 0.05    # seconds to let a burst of events (tmp write + rename) settle
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+def _inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+class StoreWatcher:
+    def __init__(self, paths, on_change, poll_interval=POLL_INTERVAL):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._seen = self._signature()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._stop_pipe = None
+        self._thread = None
+
+    def _signature(self):
+        stamps = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stamps.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def acknowledge(self):
+        """Treat the files as they are now as already seen (e.g. after our own write)"""
+        with self._lock:
+            self._seen = self._signature()
+
+    def _check(self):
+        with self._lock:
+            signature = self._signature()
+            if signature == self._seen:
+                return
+            self._seen = signature
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"⚠️ Error handling a store change: {e}")
+
+    def start(self):
+        libc = _inotify()
+        fd = self._open_inotify(libc) if libc else None
+        target = (lambda: self._run_inotify(fd)) if fd is not None else self._run_polling
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._stop_pipe:
+            try:
+                os.write(self._stop_pipe[1], b"x")
+            except OSError:
+                pass  # already stopped
+
+    def _open_inotify(self, libc):
+        fd = libc.inotify_init1(IN_CLOEXEC)
+        if fd < 0:
+            return None
+        for directory in {os.path.dirname(p) for p in self.paths}:
+            os.makedirs(directory, exist_ok=True)
+            if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+                os.close(fd)
+                return None
+        self._stop_pipe = os.pipe()
+        return fd
+
+    def _run_inotify(self, fd):
+        names = {os.fsencode(os.path.basename(p)) for p in self.paths}
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd, self._stop_pipe[0]], [], [])
+                if self._stop_pipe[0] in ready:
+                    return
+                if self._relevant(os.read(fd, 64 * 1024), names):
+                    self._stop.wait(DEBOUNCE)
+                    self._drain(fd)
+                    self._check()
+        finally:
+            os.close(fd)
+            for end in self._stop_pipe:
+                os.close(end)
+
+    def _drain(self, fd):
+        while select.select([fd], [], [], 0)[0]:
+            os.read(fd, 64 * 1024)
+
+    def _relevant(self, data, names):
+        offset = 0
+        while offset + EVENT.size <= len(data):
+            _, _, _, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name in names:
+                return True
+        return False
+
+    def _run_polling(self):
+        while not self._stop.wait(self.poll_interval):
+            self._check()